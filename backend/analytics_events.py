@@ -0,0 +1,36 @@
+"""
+Analytics event pipeline.
+
+Request handlers call emit() instead of adding an AnalyticsLog and
+committing a second time; events are bulk-inserted into analytics_logs
+by a BufferedWriter every ANALYTICS_BATCH_SIZE events or
+ANALYTICS_FLUSH_MS milliseconds.  When the queue (ANALYTICS_QUEUE_SIZE)
+is full events are dropped and counted - analytics never slows down or
+fails a citizen's request.  Anything still queued is flushed when the
+process exits.
+"""
+from background_writer import BufferedWriter
+from config import Config
+from models import AnalyticsLog
+
+writer = BufferedWriter(
+    'analytics', AnalyticsLog,
+    max_batch=Config.ANALYTICS_BATCH_SIZE,
+    flush_interval_ms=Config.ANALYTICS_FLUSH_MS,
+    max_queue=Config.ANALYTICS_QUEUE_SIZE
+)
+
+
+def init_analytics(app):
+    writer.init_app(app)
+    return writer
+
+
+def emit(event_type, user_id=None, event_data=None, ip_address=None):
+    """Queue an analytics_logs row; never blocks.  Returns False if it was dropped."""
+    return writer.emit(event_type=event_type, user_id=user_id,
+                       event_data=event_data, ip_address=ip_address)
+
+
+def stats():
+    return writer.stats()
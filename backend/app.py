@@ -1,4 +1,5 @@
 import os
+import atexit
 from flask import Flask
 from config import Config
 from extensions import db, jwt
@@ -14,9 +15,25 @@ def create_app():
     app.config['JWT_ACCESS_TOKEN_EXPIRES'] = Config.JWT_ACCESS_TOKEN_EXPIRES
     app.config['MAX_CONTENT_LENGTH'] = Config.MAX_CONTENT_LENGTH
 
+    if Config.TRUSTED_PROXY_HOPS:
+        from werkzeug.middleware.proxy_fix import ProxyFix
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=Config.TRUSTED_PROXY_HOPS)
+
+    # Refuse to start (DEBUG off) without an explicit certificate signing key
+    from certificate_signing import check_key
+    check_key()
+
     db.init_app(app)
     jwt.init_app(app)
 
+    from query_counter import init_query_counter
+    init_query_counter(app)
+
+    from analytics_events import init_analytics
+    from otp_store import init_otp_audit
+    from chat_logs import init_chat_logs
+    writers = [init_analytics(app), init_otp_audit(app), init_chat_logs(app)]
+
     # Allow all origins (dev mode)
     CORS(app, resources={r"/api/*": {"origins": "*"}}, supports_credentials=False)
 
@@ -45,13 +62,43 @@ def create_app():
     def health():
         return {'status': 'ok', 'message': 'Gram Panchayat API Running', 'version': '2.0'}
 
+    from stats import rebuild_stats_command, ensure_counters
+    from jobs import cert_worker_command
+    app.cli.add_command(rebuild_stats_command)
+    app.cli.add_command(cert_worker_command)
+    from rollups import rollup_analytics_command
+    app.cli.add_command(rollup_analytics_command)
+    from grievance_reclassify import reclassify_grievances_command
+    app.cli.add_command(reclassify_grievances_command)
+    from grievance_clusters import index_grievance_clusters_command
+    app.cli.add_command(index_grievance_clusters_command)
+    from catalogue import bump_catalogue_command
+    app.cli.add_command(bump_catalogue_command)
+    from upload_store import gc_uploads_command, migrate_uploads_command
+    app.cli.add_command(gc_uploads_command)
+    app.cli.add_command(migrate_uploads_command)
+    from document_images import image_worker_command
+    app.cli.add_command(image_worker_command)
+    from reference_numbers import reference_sequences_command
+    app.cli.add_command(reference_sequences_command)
+
     with app.app_context():
         db.create_all()
         _seed_initial_data()
+        ensure_counters()
+
+    # Write out queued analytics / audit / chat log rows on shutdown
+    atexit.register(_flush_writers, app, [w for w in writers if w is not None])
 
     return app
 
 
+def _flush_writers(app, writers):
+    with app.app_context():
+        for writer in writers:
+            writer.flush()
+
+
 def _seed_initial_data():
     from models import Admin, ServiceCategory
     import bcrypt
@@ -0,0 +1,109 @@
+"""
+Buffered, batched background inserts.
+
+emit() puts a row on a bounded in-memory queue and returns immediately;
+a daemon thread drains the queue and bulk-inserts every `max_batch` rows
+or every `flush_interval_ms`, whichever comes first, with a single
+executemany INSERT.  When the queue is full new rows are dropped and
+counted rather than blocking the request.  flush() drains synchronously
+and is called on shutdown.
+"""
+import queue
+import threading
+from datetime import datetime
+from sqlalchemy import insert
+from extensions import db
+
+
+class BufferedWriter:
+    def __init__(self, name, model, max_batch=500, flush_interval_ms=1000, max_queue=10000):
+        self.name = name
+        self.model = model
+        self.max_batch = max_batch
+        self.flush_interval = flush_interval_ms / 1000.0
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+        self._app = None
+        self.emitted = 0
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+        self.batches = 0
+
+    def init_app(self, app):
+        self._app = app
+
+    def _ensure_thread(self):
+        if self._app is None or (self._thread is not None and self._thread.is_alive()):
+            return
+        with self._flush_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name=f"{self.name}-writer", daemon=True)
+                self._thread.start()
+
+    def emit(self, **row):
+        """Queue one row for insertion; never blocks.  Returns False if it was dropped."""
+        if 'created_at' in self.model.__table__.c and 'created_at' not in row:
+            row['created_at'] = datetime.utcnow()
+        try:
+            self._queue.put_nowait(row)
+        except queue.Full:
+            self.dropped += 1
+            return False
+        self.emitted += 1
+        self._ensure_thread()
+        if self._queue.qsize() >= self.max_batch:
+            self._wakeup.set()
+        return True
+
+    def _drain(self, limit):
+        rows = []
+        while len(rows) < limit:
+            try:
+                rows.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return rows
+
+    def _write(self, rows):
+        if not rows:
+            return
+        try:
+            db.session.execute(insert(self.model.__table__), rows)
+            db.session.commit()
+            self.written += len(rows)
+            self.batches += 1
+        except Exception as e:
+            db.session.rollback()
+            self.failed += len(rows)
+            print(f"{self.name} writer error ({len(rows)} rows lost): {e}")
+
+    def flush(self):
+        """Synchronously write everything queued so far (needs an app context)."""
+        with self._flush_lock:
+            while True:
+                rows = self._drain(self.max_batch)
+                if not rows:
+                    break
+                self._write(rows)
+
+    def _run(self):
+        with self._app.app_context():
+            while True:
+                self._wakeup.wait(self.flush_interval)
+                self._wakeup.clear()
+                self.flush()
+                db.session.remove()
+
+    def stats(self):
+        return {
+            'queued': self._queue.qsize(),
+            'capacity': self._queue.maxsize,
+            'emitted': self.emitted,
+            'written': self.written,
+            'dropped': self.dropped,
+            'failed': self.failed,
+            'batches': self.batches
+        }
@@ -0,0 +1,88 @@
+"""
+Benchmark: GET /api/services/categories with and without the catalogue cache.
+
+Runs the app on a SQLite file (seeded categories, --extra more rows) and
+times, through the Flask test client:
+
+  * the previous handler (query + to_dict + jsonify per request)
+  * the cached, pre-serialised body (catalogue.py)
+  * a revalidation with If-None-Match answered with 304
+  * the first request after an admin edit (version bump + rebuild)
+
+    cd backend && python benchmarks/bench_catalogue.py -n 5000
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+DB_PATH = os.path.join(tempfile.mkdtemp(), 'catalogue.db')
+os.environ['DATABASE_URL'] = f'sqlite:///{DB_PATH}'
+
+from flask import jsonify, request
+from app import create_app
+from extensions import db
+from models import ServiceCategory
+from query_counter import count_queries
+import catalogue
+
+
+def timed(label, client, n, path, headers=None, expect=200):
+    latencies = []
+    for _ in range(n):
+        start = time.perf_counter()
+        response = client.get(path, headers=headers or {})
+        latencies.append(time.perf_counter() - start)
+        assert response.status_code == expect, response.status_code
+    latencies.sort()
+    print(f"{label:36s} p50 {latencies[len(latencies) // 2] * 1e6:6.0f} us   "
+          f"p99 {latencies[int(len(latencies) * 0.99)] * 1e6:6.0f} us   body {len(response.data):,} B")
+    return response
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-n', type=int, default=5000, help='requests per scenario')
+    parser.add_argument('--extra', type=int, default=40, help='categories added to the 10 seeded ones')
+    args = parser.parse_args()
+
+    app = create_app()
+    app.config['DEBUG'] = False
+
+    @app.route('/bench/uncached-categories')
+    def uncached_categories():
+        lang = request.args.get('lang', 'en')
+        categories = ServiceCategory.query.filter_by(is_active=True).all()
+        return jsonify({'success': True, 'categories': [c.to_dict(lang) for c in categories]}), 200
+
+    with app.app_context():
+        for i in range(args.extra):
+            db.session.add(ServiceCategory(name_en=f'Service {i}', name_hi=f'सेवा {i}', name_mr=f'सेवा {i}',
+                                           description='Benchmark service', fee=10 + i, processing_days=7,
+                                           required_docs='Aadhaar card, ration card, passport photo'))
+        db.session.commit()
+
+    client = app.test_client()
+    timed('uncached (query + to_dict)', client, args.n, '/bench/uncached-categories?lang=mr')
+    response = timed('cached body', client, args.n, '/api/services/categories?lang=mr')
+    etag = response.headers['ETag']
+    timed('If-None-Match -> 304', client, args.n, '/api/services/categories?lang=mr',
+          headers={'If-None-Match': etag}, expect=304)
+
+    with count_queries() as counter:
+        client.get('/api/services/categories?lang=mr')
+    print(f"queries per cached request: {counter['count']}")
+
+    admin = client.post('/api/auth/admin/login', json={'username': 'admin', 'password': 'Admin@123'}).get_json()
+    start = time.perf_counter()
+    client.put('/api/admin/categories/3', json={'fee': 45}, headers={'Authorization': f"Bearer {admin['token']}"})
+    response = client.get('/api/services/categories?lang=mr', headers={'If-None-Match': etag})
+    print(f"edit + first request after it: {(time.perf_counter() - start) * 1000:.1f} ms   "
+          f"status {response.status_code} (new ETag {response.headers['ETag'] != etag})")
+    print(f"catalogue: {catalogue.stats()}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,118 @@
+"""
+Micro-benchmark: ms/certificate for the legacy render path vs certificate_pdf.
+
+The legacy path is reproduced verbatim from the old routes/certificates.py:
+rebuild getSampleStyleSheet() and the ParagraphStyles on every call, render
+the QR, round-trip it through a qr_<n>.png on disk and let SimpleDocTemplate
+write straight to the output file.
+
+    cd backend && python benchmarks/bench_certificate_render.py -n 200
+"""
+import os
+import sys
+import time
+import base64
+import argparse
+import tempfile
+from datetime import datetime, date, timedelta
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from reportlab.lib.pagesizes import A4
+from reportlab.lib import colors
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, Image as RLImage
+from reportlab.lib.units import cm
+from config import Config
+import certificate_pdf
+
+
+def legacy_generate_certificate_pdf(cert, user, service_req, out_dir):
+    filename = f"cert_{cert.certificate_number}.pdf"
+    filepath = os.path.join(out_dir, filename)
+    doc = SimpleDocTemplate(filepath, pagesize=A4, rightMargin=2*cm, leftMargin=2*cm,
+                            topMargin=2*cm, bottomMargin=2*cm)
+    styles = getSampleStyleSheet()
+    elements = []
+    header_style = ParagraphStyle('header', parent=styles['Title'], fontSize=16, textColor=colors.darkblue, spaceAfter=6)
+    sub_style = ParagraphStyle('sub', parent=styles['Normal'], fontSize=11, textColor=colors.grey, spaceAfter=20, alignment=1)
+    body_style = ParagraphStyle('body', parent=styles['Normal'], fontSize=11, spaceAfter=10)
+    elements.append(Paragraph("GRAM PANCHAYAT / NAGAR PALIKA", header_style))
+    elements.append(Paragraph("Government of Maharashtra", sub_style))
+    elements.append(Paragraph(f"<b>{cert.certificate_type.upper()}</b>", header_style))
+    elements.append(Spacer(1, 0.5*cm))
+    cert_data = [
+        ['Certificate No.', cert.certificate_number], ['Applicant Name', user.full_name],
+        ['Mobile', user.mobile], ['Village/Ward', user.village_ward or 'N/A'],
+        ['District', user.district or 'N/A'], ['Date of Issue', cert.issued_at.strftime('%d/%m/%Y')],
+        ['Valid Until', cert.valid_until.strftime('%d/%m/%Y') if cert.valid_until else 'Permanent'],
+        ['Request No.', service_req.request_number],
+    ]
+    table = Table(cert_data, colWidths=[6*cm, 10*cm])
+    table.setStyle(TableStyle([
+        ('BACKGROUND', (0, 0), (0, -1), colors.lightblue), ('TEXTCOLOR', (0, 0), (-1, -1), colors.black),
+        ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'), ('FONTSIZE', (0, 0), (-1, -1), 10),
+        ('ROWBACKGROUNDS', (0, 0), (-1, -1), [colors.whitesmoke, colors.white]),
+        ('GRID', (0, 0), (-1, -1), 0.5, colors.grey), ('PADDING', (0, 0), (-1, -1), 8),
+    ]))
+    elements.append(table)
+    elements.append(Spacer(1, 0.5*cm))
+    elements.append(Paragraph(f"This is to certify that {user.full_name}, resident of {user.village_ward}, "
+                              f"{user.district}, Maharashtra, has been issued this {cert.certificate_type} "
+                              f"by the competent authority.", body_style))
+    elements.append(Spacer(1, 1*cm))
+    qr_b64 = certificate_pdf.generate_qr_code(f"https://panchayat.gov.in/verify/{cert.certificate_number}")
+    qr_path = os.path.join(out_dir, f"qr_{cert.certificate_number}.png")
+    with open(qr_path, 'wb') as f:
+        f.write(base64.b64decode(qr_b64))
+    qr_img = RLImage(qr_path, width=3*cm, height=3*cm)
+    sign_table = Table([[qr_img, '', Paragraph('<b>Authorized Signatory</b>', body_style)]], colWidths=[4*cm, 6*cm, 6*cm])
+    sign_table.setStyle(TableStyle([('VALIGN', (0, 0), (-1, -1), 'MIDDLE'), ('ALIGN', (2, 0), (2, 0), 'RIGHT')]))
+    elements.append(sign_table)
+    elements.append(Spacer(1, 0.3*cm))
+    footer_style = ParagraphStyle('footer', parent=styles['Normal'], fontSize=8, textColor=colors.grey, alignment=1)
+    elements.append(Paragraph(f"Verify at https://panchayat.gov.in/verify/{cert.certificate_number}", footer_style))
+    doc.build(elements)
+    return filename
+
+
+def make_fixture(i, with_stored_qr):
+    number = f"CERT-2026-{i:08d}"
+    cert = SimpleNamespace(certificate_number=number, certificate_type='Income Certificate',
+                           issued_at=datetime.utcnow(), valid_until=date.today() + timedelta(days=365),
+                           qr_code=None)
+    user = SimpleNamespace(full_name='Sunita Patil', mobile='9876543210', village_ward='Ward 4', district='Pune')
+    if with_stored_qr:
+        cert.qr_code = certificate_pdf.generate_qr_code(certificate_pdf.qr_data(cert, user.full_name))
+    return cert, user, SimpleNamespace(request_number=f"REQ-20260101-{i:06d}")
+
+
+def bench(label, fn, fixtures):
+    fn(*fixtures[0])  # warm-up (font / image caches)
+    start = time.perf_counter()
+    for fx in fixtures:
+        fn(*fx)
+    ms = (time.perf_counter() - start) * 1000 / len(fixtures)
+    print(f"{label:28s} {ms:8.2f} ms/certificate   {1000 / ms:7.1f} certificates/s")
+    return ms
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-n', type=int, default=100, help='certificates per run')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as out_dir:
+        Config.CERTIFICATE_OUTPUT_DIR = out_dir
+        before = bench('legacy (styles+QR on disk)',
+                       lambda c, u, s: legacy_generate_certificate_pdf(c, u, s, out_dir),
+                       [make_fixture(i, False) for i in range(args.n)])
+        after = bench('engine (cached, in-memory)', certificate_pdf.generate_certificate_pdf,
+                      [make_fixture(i, True) for i in range(args.n)])
+        leftovers = len([f for f in os.listdir(out_dir) if f.startswith('qr_')])
+    print(f"speed-up: {before / after:.2f}x   (legacy left {leftovers} qr_*.png files behind)")
+
+
+if __name__ == '__main__':
+    main()
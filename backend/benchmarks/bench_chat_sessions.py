@@ -0,0 +1,99 @@
+"""
+Benchmark: server-side chat sessions vs client-shipped history.
+
+  * request body size over a conversation, when the widget re-sends the
+    last six messages (the old Chatbot.jsx) vs only {message, session_id}
+  * history() + append() latency of the session store from several
+    threads, with more live sessions than --max-sessions so LRU eviction
+    is exercised (--redis-url to measure a Redis store instead)
+  * database commits for the chat_logs rows of those exchanges: one per
+    message (the old synchronous ChatLog insert) vs the write-behind batches
+
+    cd backend && python benchmarks/bench_chat_sessions.py -n 10000 --threads 8
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+os.environ['DATABASE_URL'] = 'sqlite://'
+
+from app import create_app
+import chat_sessions
+import chat_logs
+from bench_chatbot import FAQ
+
+ANSWER = ('To apply, open Services → Apply, choose the certificate and upload your Aadhaar card, ration card and '
+          'a passport photo. The fee is paid online and the certificate is usually issued within 7 days.')
+
+
+def payload_sizes(turns):
+    history, old, new = [], [], []
+    for i in range(turns):
+        message = FAQ[i % len(FAQ)]
+        old.append(len(json.dumps({'message': message, 'session_id': 'sess_1700000000000',
+                                   'history': history[-6:], 'language': 'en'})))
+        new.append(len(json.dumps({'message': message, 'session_id': 'sess_' + 'x' * 22, 'language': 'en'})))
+        history += [{'role': 'user', 'content': message}, {'role': 'assistant', 'content': ANSWER}]
+    return old, new
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-n', type=int, default=10000, help='exchanges to replay')
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--sessions', type=int, default=30000, help='distinct session ids')
+    parser.add_argument('--max-sessions', type=int, default=1000, help='in-process store capacity')
+    parser.add_argument('--turns', type=int, default=20, help='messages per conversation for the payload test')
+    parser.add_argument('--redis-url', help='measure a RedisChatSessionStore instead of the in-process one')
+    args = parser.parse_args()
+
+    old, new = payload_sizes(args.turns)
+    print(f"request body over {args.turns} messages: client history avg {sum(old) / len(old):,.0f} B "
+          f"(last {old[-1]:,} B)   session id avg {sum(new) / len(new):,.0f} B (last {new[-1]:,} B)")
+
+    if args.redis_url:
+        store = chat_sessions.RedisChatSessionStore(args.redis_url, 6, 1800)
+    else:
+        store = chat_sessions.MemoryChatSessionStore(6, 1800, max_sessions=args.max_sessions)
+    chat_sessions.store = store
+
+    app = create_app()
+    rng = random.Random(3)
+    ids = [chat_sessions.new_session_id() for _ in range(args.sessions)]
+    # a few active conversations get most of the traffic
+    workload = [(rng.choice(ids[:500]) if rng.random() < 0.8 else rng.choice(ids), rng.choice(FAQ))
+                for _ in range(args.n)]
+    latencies = []
+
+    def one(item):
+        session_id, message = item
+        start = time.perf_counter()
+        chat_sessions.history(session_id)
+        chat_sessions.append(session_id, None, message, ANSWER)
+        latencies.append(time.perf_counter() - start)
+
+    with app.app_context():
+        chat_logs.writer.flush()
+        batches_before = chat_logs.writer.batches
+        start = time.perf_counter()
+        with ThreadPoolExecutor(args.threads) as pool:
+            list(pool.map(one, workload))
+        elapsed = time.perf_counter() - start
+        chat_logs.writer.flush()
+
+    latencies.sort()
+    print(f"history()+append(): p50 {latencies[len(latencies) // 2] * 1e6:.0f} us   "
+          f"p99 {latencies[int(len(latencies) * 0.99)] * 1e6:.0f} us   {args.n / elapsed:,.0f} exchanges/s")
+    print(f"  store: {store.stats()}")
+    print(f"chat_logs commits: {args.n:,} synchronous (one per message) -> "
+          f"{chat_logs.writer.batches - batches_before:,} batches   {chat_logs.stats()}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,133 @@
+"""
+Benchmark: chatbot answer latency against a local Cohere stub.
+
+Replays a repetitive FAQ-style workload (a few dozen questions in
+English / Hindi / Marathi with a Zipf-like distribution, plus a share of
+one-off questions) from several threads through
+routes.chatbot.get_cohere_response, with the stub answering after
+--delay-ms.  Scenarios:
+
+  * new session per message (what constructing a client per call costs)
+  * shared pooled client, cache disabled
+  * shared pooled client + response cache
+  * streaming: time to the first text vs the full answer
+  * upstream hanging past COHERE_READ_TIMEOUT (circuit breaker)
+
+    cd backend && python benchmarks/bench_chatbot.py -n 2000 --threads 8 --delay-ms 150
+"""
+import os
+import sys
+import time
+import random
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import requests
+from config import Config
+import cohere_client
+from routes import chatbot
+import cohere_stub
+
+FAQ = [
+    'How do I apply for a birth certificate?', 'birth certificate fee', 'What documents are needed for income certificate?',
+    'How long does caste certificate take?', 'How to track my application', 'How do I pay the fee?',
+    'marriage certificate documents', 'How to submit a complaint?', 'water connection charges', 'death certificate process',
+    'जन्म प्रमाणपत्र कसे मिळवायचे?', 'उत्पन्न दाखला शुल्क किती आहे?', 'तक्रार कशी नोंदवायची?', 'विवाह प्रमाणपत्र कागदपत्रे',
+    'जन्म प्रमाण पत्र कैसे बनवाएं?', 'आय प्रमाण पत्र की फीस कितनी है?', 'शिकायत कैसे दर्ज करें?', 'पानी कनेक्शन शुल्क',
+    'office timings', 'what services are available online', 'hello', 'help',
+]
+
+
+def make_workload(n, unique_share=0.2, seed=7):
+    rng = random.Random(seed)
+    weights = [1 / (i + 1) for i in range(len(FAQ))]
+    items = []
+    for i in range(n):
+        if rng.random() < unique_share:
+            items.append((f"My application REQ-{rng.randrange(10 ** 9):09d} is pending, why?", 'en'))
+        else:
+            question = rng.choices(FAQ, weights)[0]
+            # the same question typed slightly differently
+            question = rng.choice([question, question.lower(), question.rstrip('?') + ' ?', '  ' + question])
+            items.append((question, 'en' if question.isascii() else 'mr'))
+    return items
+
+
+def new_session_per_message(message, history=None, language='en'):
+    """Baseline: a fresh HTTP session (new TCP connection) for every message, no cache."""
+    with requests.Session() as session:
+        r = session.post(f"{Config.COHERE_API_URL}/v1/chat", timeout=(3.05, Config.COHERE_READ_TIMEOUT),
+                         json={'message': message, 'preamble': chatbot.SYSTEM_CONTEXT, 'model': 'command-r'},
+                         headers={'Authorization': f"Bearer {Config.COHERE_API_KEY}"})
+        return r.json()['text']
+
+
+def run(label, fn, workload, threads, stub):
+    cohere_client._client = None
+    chatbot.response_cache.clear()
+    chatbot.response_cache.hits = chatbot.response_cache.misses = 0
+    before = stub.requests
+    latencies = []
+
+    def one(item):
+        start = time.perf_counter()
+        fn(item[0], None, item[1])
+        latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(threads) as pool:
+        list(pool.map(one, workload))
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    p95 = latencies[int(0.95 * (len(latencies) - 1))] * 1000
+    print(f"{label:34s} mean {sum(latencies) * 1000 / len(latencies):7.1f} ms   p95 {p95:7.1f} ms   "
+          f"{len(workload) / elapsed:7.0f} msg/s   upstream calls {stub.requests - before}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-n', type=int, default=2000, help='messages to replay')
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--delay-ms', type=int, default=150, help='stub answer latency')
+    args = parser.parse_args()
+
+    stub = cohere_stub.serve(delay_ms=args.delay_ms)
+    Config.COHERE_API_KEY = 'stub'
+    Config.COHERE_API_URL = f"http://127.0.0.1:{stub.server_address[1]}"
+    Config.COHERE_READ_TIMEOUT = 1.0
+    workload = make_workload(args.n)
+
+    run('new session per message', new_session_per_message, workload, args.threads, stub)
+    size = Config.CHATBOT_CACHE_SIZE
+    chatbot.response_cache.maxsize = 0
+    run('pooled client, no cache', chatbot.get_cohere_response, workload, args.threads, stub)
+    chatbot.response_cache.maxsize = size
+    run('pooled client + cache', chatbot.get_cohere_response, workload, args.threads, stub)
+    print(f"  cache: {chatbot.response_cache.stats()}")
+    print(f"  upstream: {cohere_client.stats()}")
+
+    # /stream: time until the first text reaches the client vs the whole answer
+    cohere_client._client = None
+    chatbot.response_cache.clear()
+    first, full = [], []
+    for i in range(50):
+        start = time.perf_counter()
+        for n, _ in enumerate(chatbot.stream_response(f"streamed question {i}")):
+            if n == 0:
+                first.append(time.perf_counter() - start)
+        full.append(time.perf_counter() - start)
+    print(f"{'streamed (stub ' + str(stub.behaviour['token_ms']) + ' ms/token)':34s} first text "
+          f"{sum(first) * 1000 / len(first):7.1f} ms   full answer {sum(full) * 1000 / len(full):7.1f} ms")
+
+    stub.behaviour['delay_ms'] = 5000
+    outage = [(f"unique question {i}", 'en') for i in range(200)]
+    run('upstream hanging (breaker)', chatbot.get_cohere_response, outage, args.threads, stub)
+    print(f"  upstream: {cohere_client.stats()}")
+    stub.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+"""
+Benchmark: how long a download keeps an API worker thread busy.
+
+Uploads one --size-mb document and times, through the Flask test client
+(so the body is read completely, as a client would):
+
+  * send_file: Flask streams the file (X_ACCEL_REDIRECT off, the old path)
+  * X-Accel-Redirect: Flask only authorises and returns headers; nginx
+    would send the bytes
+  * resuming the last quarter of the file with a Range request
+
+    cd backend && python benchmarks/bench_file_delivery.py -n 50 --size-mb 8
+"""
+import io
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+WORK = tempfile.mkdtemp()
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(WORK, 'delivery.db')}"
+
+from config import Config
+from app import create_app
+
+
+def timed(label, client, n, path, headers, expect):
+    latencies = []
+    for _ in range(n):
+        start = time.perf_counter()
+        response = client.get(path, headers=headers)
+        body = response.get_data()
+        latencies.append(time.perf_counter() - start)
+        assert response.status_code == expect, response.status_code
+    latencies.sort()
+    print(f"{label:34s} p50 {latencies[len(latencies) // 2] * 1000:7.2f} ms   "
+          f"p99 {latencies[int(len(latencies) * 0.99)] * 1000:7.2f} ms   body through Flask {len(body):,} B")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-n', type=int, default=50, help='downloads per scenario')
+    parser.add_argument('--size-mb', type=int, default=8)
+    args = parser.parse_args()
+
+    Config.UPLOAD_FOLDER = os.path.join(WORK, 'store')
+    Config.DOCUMENT_WORKER_THREADS = 0
+    app = create_app()
+    app.config['DEBUG'] = False
+    client = app.test_client()
+
+    client.post('/api/auth/send-otp', json={'mobile': '9876543210'})
+    token = client.post('/api/auth/verify-otp', json={'mobile': '9876543210', 'otp': '123456',
+                                                      'full_name': 'Bench'}).get_json()['token']
+    headers = {'Authorization': f'Bearer {token}'}
+    request_id = client.post('/api/services/apply', json={'category_id': 1}, headers=headers).get_json()['request']['id']
+    size = args.size_mb * 1024 * 1024
+    doc = client.post(f'/api/services/{request_id}/upload', headers=headers, content_type='multipart/form-data',
+                      data={'file': (io.BytesIO(os.urandom(size)), 'ration_card.pdf')}).get_json()['document']
+    path = f"/api/services/{request_id}/documents/{doc['id']}"
+
+    Config.X_ACCEL_REDIRECT = False
+    timed(f'send_file ({args.size_mb} MB)', client, args.n, path, headers, 200)
+    timed('send_file, Range: last quarter', client, args.n, path,
+          {**headers, 'Range': f'bytes={size * 3 // 4}-'}, 206)
+    Config.X_ACCEL_REDIRECT = True
+    timed('X-Accel-Redirect handoff', client, args.n, path, headers, 200)
+    shutil.rmtree(WORK, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,116 @@
+"""
+Micro-benchmark: grievance classification latency and throughput.
+
+Compares the old routes/grievances.ai_categorize_grievance (reproduced
+verbatim: keyword dict rebuilt per call, substring `in` per keyword), the
+same substring scan over the full multilingual lexicon, and
+grievance_classifier, on a synthetic corpus mixing English,
+transliterated, Marathi and Hindi grievances of realistic length.
+
+    cd backend && python benchmarks/bench_grievance_classifier.py -n 20000
+"""
+import os
+import sys
+import time
+import random
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import grievance_classifier
+
+
+def legacy_ai_categorize_grievance(subject, description):
+    text = (subject + ' ' + description).lower()
+    keywords = {
+        'Water Supply': ['water', 'pipe', 'tap', 'pani', 'jal', 'leakage'],
+        'Roads & Infrastructure': ['road', 'pothole', 'bridge', 'rasta', 'street'],
+        'Sanitation & Waste': ['garbage', 'waste', 'toilet', 'sewage', 'clean'],
+        'Electricity': ['light', 'electricity', 'bijli', 'power', 'transformer'],
+        'Healthcare': ['hospital', 'doctor', 'health', 'medicine', 'clinic'],
+        'Education': ['school', 'teacher', 'education', 'student'],
+        'Land Records': ['land', 'record', 'property', 'jamin'],
+        'Corruption': ['bribe', 'corrupt', 'bhrashtachar', 'fraud'],
+        'Public Safety': ['crime', 'safety', 'police', 'accident']
+    }
+    scores = {cat: sum(1 for w in words if w in text) for cat, words in keywords.items()}
+    best = max(scores, key=scores.get)
+    category = best if scores[best] > 0 else 'Other'
+    high_priority = ['urgent', 'emergency', 'death', 'accident', 'serious', 'critical']
+    priority = 'high' if any(w in text for w in high_priority) else 'normal'
+    return {'category': category, 'priority': priority}
+
+
+def naive_full_lexicon(subject, description):
+    """The legacy algorithm (substring `in` per keyword) over the new, full lexicon."""
+    text = (subject + ' ' + description).lower()
+    scores = {cat: sum(1 for w in words if w.rstrip('*') in text)
+              for cat, words in grievance_classifier.CATEGORIES.items()}
+    best = max(scores, key=scores.get)
+    category = best if scores[best] > 0 else 'Other'
+    priority = 'high' if any(w.rstrip('*') in text for w in grievance_classifier.HIGH_PRIORITY) else 'normal'
+    return {'category': category, 'priority': priority}
+
+
+FILLER = {
+    'en': ('please look into this matter since last two weeks nobody from the office has come to our '
+           'ward and people are facing a lot of problems every day near the temple').split(),
+    'mr': ('कृपया या प्रकरणाकडे लक्ष द्यावे गेल्या दोन आठवड्यांपासून कार्यालयातून कोणीही आमच्या प्रभागात '
+           'आलेले नाही आणि लोकांना रोज खूप त्रास होत आहे मंदिराजवळ').split(),
+    'hi': ('कृपया इस मामले को देखें पिछले दो हफ्तों से कार्यालय से कोई भी हमारे वार्ड में नहीं आया है '
+           'और लोगों को रोज बहुत परेशानी हो रही है मंदिर के पास').split(),
+}
+
+
+def make_corpus(n, seed=42):
+    rng = random.Random(seed)
+    terms = {'en': [], 'mr': [], 'hi': []}
+    for words in list(grievance_classifier.CATEGORIES.values()) + [grievance_classifier.HIGH_PRIORITY]:
+        for w in words:
+            w = w.rstrip('*')
+            lang = 'en' if w.isascii() else rng.choice(['mr', 'hi'])
+            terms[lang].append(w)
+    corpus = []
+    for _ in range(n):
+        lang = rng.choice(['en', 'en', 'mr', 'hi'])
+        words = rng.choices(FILLER[lang], k=rng.randint(20, 60))
+        for _ in range(rng.randint(0, 3)):
+            words.insert(rng.randrange(len(words) + 1), rng.choice(terms[lang]))
+        corpus.append((' '.join(words[:6]), ' '.join(words[6:])))
+    return corpus
+
+
+def bench(label, fn, corpus):
+    fn(corpus[:100])  # warm-up
+    start = time.perf_counter()
+    fn(corpus)
+    elapsed = time.perf_counter() - start
+    us = elapsed * 1e6 / len(corpus)
+    print(f"{label:34s} {us:8.1f} us/grievance   {len(corpus) / elapsed:10.0f} grievances/s")
+    return us
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-n', type=int, default=20000, help='grievances in the synthetic corpus')
+    args = parser.parse_args()
+
+    corpus = make_corpus(args.n)
+    before = bench('legacy (36 keywords, substring)',
+                   lambda items: [legacy_ai_categorize_grievance(s, d) for s, d in items], corpus)
+    naive = bench('substring scan, full lexicon',
+                  lambda items: [naive_full_lexicon(s, d) for s, d in items], corpus)
+    single = bench('compiled, one call per grievance',
+                   lambda items: [grievance_classifier.classify(s, d) for s, d in items], corpus)
+    batch = bench('compiled, classify_batch()', grievance_classifier.classify_batch, corpus)
+
+    results = grievance_classifier.classify_batch(corpus)
+    other = sum(1 for r in results if r['category'] == 'Other')
+    legacy_other = sum(1 for s, d in corpus if legacy_ai_categorize_grievance(s, d)['category'] == 'Other')
+    print(f"compiled vs substring scan of the same lexicon: {naive / batch:.2f}x   "
+          f"(vs the old 36-keyword scan: {before / batch:.2f}x)")
+    print(f"left as 'Other': compiled {other / len(corpus):.1%}, legacy {legacy_other / len(corpus):.1%}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,123 @@
+"""
+Benchmark: preview / thumbnail pipeline for photographed documents.
+
+Generates --n phone-camera-like photos of an ID card (4000x3000 JPEG at
+quality 95 with sensor noise and an EXIF rotation, 3-10 MB each),
+uploads them through upload_store + document_images.enqueue as the
+handler does, runs the queue and reports:
+
+  * bytes stored for originals vs previews vs thumbnails
+  * what an officer downloads to review one application of --per-request
+    documents: every original (before) vs every thumbnail plus the one
+    preview they open (after)
+  * render throughput with 1..--threads worker threads, with and without
+    the JPEG draft-mode decode
+
+    cd backend && python benchmarks/bench_image_pipeline.py -n 24 --threads 4
+"""
+import io
+import os
+import sys
+import time
+import random
+import shutil
+import argparse
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+WORK = tempfile.mkdtemp()
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(WORK, 'images.db')}"
+
+from PIL import Image, ImageDraw
+from config import Config
+from app import create_app
+from extensions import db
+from models import Document
+import document_images
+import upload_store
+
+
+def photo(rng, width=4000, height=3000):
+    """A card on a table, shot by a phone: gradients, text, noise, EXIF orientation."""
+    img = Image.linear_gradient('L').resize((width, height)).convert('RGB')
+    draw = ImageDraw.Draw(img)
+    x0, y0 = rng.randrange(200, 600), rng.randrange(200, 500)
+    draw.rounded_rectangle((x0, y0, x0 + 3000, y0 + 1900), radius=60, fill=(236, 232, 220))
+    for line in range(14):
+        y = y0 + 200 + line * 110
+        draw.rectangle((x0 + 150, y, x0 + 150 + rng.randrange(800, 2600), y + 50), fill=(40, 40, 60))
+    noise = Image.effect_noise((width, height), rng.randrange(10, 30)).convert('RGB')
+    img = Image.blend(img, noise, 0.25)
+    out = io.BytesIO()
+    exif = Image.Exif()
+    exif[0x0112] = rng.choice([1, 6, 8])
+    img.save(out, 'JPEG', quality=95, exif=exif)
+    return out.getvalue()
+
+
+def render_all(docs, threads, draft=True):
+    shutil.rmtree(os.path.join(Config.UPLOAD_FOLDER, upload_store.DERIVED_DIR), ignore_errors=True)
+    original_draft = Image.Image.draft
+    if not draft:
+        Image.Image.draft = lambda self, mode, size: None
+    try:
+        start = time.perf_counter()
+        with ThreadPoolExecutor(threads) as pool:
+            list(pool.map(lambda d: document_images.render(upload_store.absolute_path(d[0]), d[1]), docs))
+        return time.perf_counter() - start
+    finally:
+        Image.Image.draft = original_draft
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-n', type=int, default=24, help='photos')
+    parser.add_argument('--threads', type=int, default=4)
+    parser.add_argument('--per-request', type=int, default=3, help='documents per application')
+    args = parser.parse_args()
+
+    rng = random.Random(22)
+    Config.UPLOAD_FOLDER = os.path.join(WORK, 'store')
+    Config.DOCUMENT_WORKER_THREADS = 0
+    app = create_app()
+    with app.app_context():
+        for i in range(args.n):
+            staged = upload_store.stage(io.BytesIO(photo(rng)))
+            upload_store.reference(staged)
+            doc = Document(file_name=f'scan_{i}.jpg', file_type='image/jpeg', file_size=staged.size,
+                           file_path=upload_store.relative_path(staged.sha256), sha256=staged.sha256)
+            db.session.add(doc)
+            db.session.flush()
+            document_images.enqueue(doc)
+            db.session.commit()
+            upload_store.place(staged)
+
+        start = time.perf_counter()
+        processed = document_images.run_pending()
+        elapsed = time.perf_counter() - start
+        print(f"queue: {processed} jobs in {elapsed:.1f} s on one worker ({processed / elapsed:.1f} photos/s)")
+
+        s = document_images.stats()
+        n = max(processed, 1)
+        print(f"stored per photo: original {s['original_bytes'] / n / 2 ** 20:5.2f} MB   "
+              f"preview {s['preview_bytes'] / n / 1024:6.0f} kB   thumbnail {s['thumbnail_bytes'] / n / 1024:4.1f} kB")
+
+        docs = Document.query.all()
+        k = args.per_request
+        before = sum(d.file_size for d in docs[:k])
+        after = sum(d.thumbnail_size for d in docs[:k]) + (docs[0].preview_size or docs[0].file_size)
+        print(f"officer review of {k} documents: {before / 2 ** 20:.1f} MB of originals -> "
+              f"{after / 1024:.0f} kB (thumbnails + one preview), {before / after:.0f}x less")
+
+        pairs = [(d.file_path, d.sha256) for d in docs]
+        for draft in (False, True):
+            for threads in sorted({1, args.threads}):
+                elapsed = render_all(pairs, threads, draft)
+                print(f"render {'draft decode' if draft else 'full decode '}  {threads} thread(s): "
+                      f"{len(pairs) / elapsed:5.1f} photos/s")
+    shutil.rmtree(WORK, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,120 @@
+"""
+Benchmark: reference numbers under concurrent inserts.
+
+--threads workers insert --rows service requests each (one commit per
+row, as /api/services/apply does) into a fresh database, numbering them
+with
+
+  * random:    the previous generator, 6 random digits per day
+  * allocator: reference_numbers.allocate('REQ'), hi/lo blocks of
+               REFERENCE_BLOCK_SIZE (and of 1, i.e. a round trip per number)
+
+and reports rows/s, rows lost to a UNIQUE violation (a 500 for the
+citizen) and counter round trips.  Also prints the birthday-paradox odds
+for --per-day random numbers.
+
+    cd backend && python benchmarks/bench_reference_numbers.py --threads 8 --rows 2500
+    cd backend && DATABASE_URL=postgresql://... python benchmarks/bench_reference_numbers.py
+"""
+import os
+import sys
+import math
+import time
+import random
+import string
+import argparse
+import tempfile
+import threading
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DATABASE_URL', f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'refs.db')}")
+
+from sqlalchemy import text
+from sqlalchemy.exc import IntegrityError
+from config import Config
+from app import create_app
+from extensions import db
+from models import ServiceRequest, User, ReferenceCounter
+import reference_numbers
+
+
+def random_number():
+    ts = datetime.utcnow().strftime('%Y%m%d')
+    return f"REQ-{ts}-{''.join(random.choices(string.digits, k=6))}"
+
+
+def reset_counter(app, block_size):
+    """Start today's REQ counter afresh with INCREMENT BY block_size (the bench may run DDL)."""
+    name = reference_numbers._counter_name('REQ', datetime.utcnow().strftime('%Y%m%d'))
+    with app.app_context(), db.engine.begin() as conn:
+        conn.execute(ReferenceCounter.__table__.delete().where(ReferenceCounter.name == name))
+        if conn.dialect.name == 'postgresql':
+            conn.execute(text(f'DROP SEQUENCE IF EXISTS "{name}"'))
+            conn.execute(text(f'CREATE SEQUENCE "{name}" START WITH 0 MINVALUE 0 INCREMENT BY {block_size}'))
+    reference_numbers._blocks.clear()
+    reference_numbers._increments.clear()
+
+
+def run(app, label, number, threads, rows, user_id):
+    failures = []
+
+    def worker():
+        lost = 0
+        with app.app_context():
+            for _ in range(rows):
+                db.session.add(ServiceRequest(user_id=user_id, category_id=1, request_number=number(),
+                                              description='bench', status='pending'))
+                try:
+                    db.session.commit()
+                except IntegrityError:
+                    db.session.rollback()
+                    lost += 1
+            db.session.remove()
+        failures.append(lost)
+
+    with app.app_context():
+        ServiceRequest.query.delete()
+        db.session.commit()
+    blocks = reference_numbers.stats()['blocks']
+    pool = [threading.Thread(target=worker) for _ in range(threads)]
+    start = time.perf_counter()
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+    elapsed = time.perf_counter() - start
+    total = threads * rows
+    print(f"{label:28s} {total / elapsed:7.0f} rows/s   duplicates (500s) {sum(failures):5d}   "
+          f"counter round trips {reference_numbers.stats()['blocks'] - blocks:6d}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--rows', type=int, default=2500, help='inserts per thread')
+    parser.add_argument('--per-day', type=int, default=10000, help='requests per day for the collision odds')
+    args = parser.parse_args()
+
+    n, space = args.per_day, 10 ** 6
+    print(f"random 6-digit suffix, {n:,} requests/day: P(at least one collision) = "
+          f"{1 - math.exp(-n * (n - 1) / (2 * space)):.4f}, expected duplicates/day = {n * n / (2 * space):.0f}")
+
+    app = create_app()
+    with app.app_context():
+        user = User(full_name='Bench', mobile='9000000000')
+        db.session.add(user)
+        db.session.commit()
+        user_id = user.id
+
+    run(app, 'random', random_number, args.threads, args.rows, user_id)
+    block_size = Config.REFERENCE_BLOCK_SIZE
+    for size in sorted({1, block_size}):
+        Config.REFERENCE_BLOCK_SIZE = size
+        reset_counter(app, size)
+        run(app, f'allocator (block {size})', lambda: reference_numbers.allocate('REQ'),
+            args.threads, args.rows, user_id)
+
+
+if __name__ == '__main__':
+    main()
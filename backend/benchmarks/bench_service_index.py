@@ -0,0 +1,64 @@
+"""
+Benchmark: local service-catalogue answers for the chatbot.
+
+Creates the app on an in-memory SQLite database (seeded service
+categories), builds the BM25 index, replays the FAQ workload from
+bench_chatbot.py through service_index.answer() and reports latency and
+the share answered without Cohere.  Then edits one category's fee and
+shows that the next refresh re-tokenises only that row.
+
+    cd backend && python benchmarks/bench_service_index.py -n 20000
+"""
+import os
+import sys
+import time
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+os.environ['DATABASE_URL'] = 'sqlite://'
+
+from app import create_app
+from extensions import db
+from models import ServiceCategory
+import service_index
+from bench_chatbot import make_workload
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-n', type=int, default=20000, help='questions to replay')
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        start = time.perf_counter()
+        service_index.refresh_if_stale()
+        print(f"initial build: {(time.perf_counter() - start) * 1000:.1f} ms   {service_index.index.stats()}")
+
+        workload = make_workload(args.n)
+        latencies, local = [], 0
+        for question, language in workload:
+            start = time.perf_counter()
+            reply = service_index.answer(question, language)
+            latencies.append(time.perf_counter() - start)
+            local += reply is not None
+        latencies.sort()
+        print(f"answer(): p50 {latencies[len(latencies) // 2] * 1e6:.0f} us   "
+              f"p99 {latencies[int(len(latencies) * 0.99)] * 1e6:.0f} us   "
+              f"max {latencies[-1] * 1e3:.2f} ms   answered locally {local / len(workload):.1%}")
+
+        category = ServiceCategory.query.filter_by(name_en='Income Certificate').first()
+        category.fee = 35
+        db.session.commit()
+        before = service_index.index.reindexed
+        service_index.invalidate()
+        start = time.perf_counter()
+        service_index.refresh_if_stale()
+        print(f"refresh after one fee change: {(time.perf_counter() - start) * 1000:.1f} ms, "
+              f"{service_index.index.reindexed - before} row re-tokenised")
+        print(service_index.answer('income certificate fee'))
+
+
+if __name__ == '__main__':
+    main()
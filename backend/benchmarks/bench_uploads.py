@@ -0,0 +1,103 @@
+"""
+Benchmark: content-addressed upload storage.
+
+Simulates citizens attaching documents to applications, where the same
+person re-uploads the same Aadhaar / ration card scan for every request
+(--repeat-share of uploads are such repeats), and compares:
+
+  * flat: file.save() into one directory + os.path.getsize (old handler)
+  * content-addressed: upload_store.stage / reference / place
+
+Both also insert and commit the Document row, as the handler does.
+Reports upload throughput, bytes and files on disk and the largest
+directory.
+
+    cd backend && python benchmarks/bench_uploads.py -n 2000 --size-kb 300
+"""
+import io
+import os
+import sys
+import time
+import random
+import shutil
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+WORK = tempfile.mkdtemp()
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(WORK, 'uploads.db')}"
+
+from werkzeug.datastructures import FileStorage
+from config import Config
+from app import create_app
+from extensions import db
+from models import Document
+import upload_store
+
+
+def disk_usage(root):
+    files = size = widest = 0
+    for dirpath, dirnames, filenames in os.walk(root):
+        widest = max(widest, len(filenames) + len(dirnames))
+        files += len(filenames)
+        size += sum(os.path.getsize(os.path.join(dirpath, f)) for f in filenames)
+    return files, size, widest
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-n', type=int, default=2000, help='uploads')
+    parser.add_argument('--size-kb', type=int, default=300, help='size of each scan')
+    parser.add_argument('--citizens', type=int, default=300)
+    parser.add_argument('--repeat-share', type=float, default=0.6, help='share of uploads re-sending a known scan')
+    args = parser.parse_args()
+
+    rng = random.Random(5)
+    scans = {}
+    workload = []
+    for i in range(args.n):
+        citizen = rng.randrange(args.citizens)
+        if citizen in scans and rng.random() < args.repeat_share:
+            workload.append(scans[citizen])
+        else:
+            scans[citizen] = rng.randbytes(args.size_kb * 1024)
+            workload.append(scans[citizen])
+
+    flat = os.path.join(WORK, 'flat')
+    os.makedirs(flat)
+    Config.UPLOAD_FOLDER = os.path.join(WORK, 'store')
+    app = create_app()
+    with app.app_context():
+        start = time.perf_counter()
+        for i, data in enumerate(workload):
+            storage = FileStorage(io.BytesIO(data), filename='aadhar.pdf')
+            name = f"{i:08d}_20260101000000_aadhar.pdf"
+            storage.save(os.path.join(flat, name))
+            db.session.add(Document(file_name='aadhar.pdf', file_path=name,
+                                    file_size=os.path.getsize(os.path.join(flat, name))))
+            db.session.commit()
+        elapsed = time.perf_counter() - start
+    files, size, widest = disk_usage(flat)
+    print(f"flat:               {args.n / elapsed:7.0f} uploads/s   {files:,} files   {size / 2 ** 20:8.1f} MB   "
+          f"largest directory {widest:,} entries")
+
+    with app.app_context():
+        start = time.perf_counter()
+        duplicates = 0
+        for data in workload:
+            staged = upload_store.stage(io.BytesIO(data))
+            duplicates += upload_store.reference(staged)
+            db.session.add(Document(file_name='aadhar.pdf', file_path=upload_store.relative_path(staged.sha256),
+                                    file_size=staged.size, sha256=staged.sha256))
+            db.session.commit()
+            upload_store.place(staged)
+        elapsed = time.perf_counter() - start
+        files, size, widest = disk_usage(Config.UPLOAD_FOLDER)
+        print(f"content-addressed:  {args.n / elapsed:7.0f} uploads/s   {files:,} files   {size / 2 ** 20:8.1f} MB   "
+              f"largest directory {widest:,} entries   ({duplicates:,} uploads deduplicated)")
+        print(f"  {upload_store.stats()}")
+    shutil.rmtree(WORK, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,120 @@
+"""
+Local stand-in for the Cohere v1 /chat endpoint.
+
+Answers every POST /v1/chat with {"text": ...} (or, with "stream": true,
+a chunked stream of JSON events, one token at a time) after an optional
+delay, or with an HTTP error, so the chatbot's pooled client, timeouts,
+circuit breaker and cache can be exercised without the real API:
+
+    cd backend && python benchmarks/cohere_stub.py --port 8090 --delay-ms 400
+    COHERE_API_KEY=stub COHERE_API_URL=http://127.0.0.1:8090 python app.py
+
+serve() starts the same server on a background thread for in-process use;
+its `behaviour` dict can be changed while it runs.
+"""
+import re
+import json
+import time
+import argparse
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+
+STREAM_FILLER = ('Please visit the Services page, choose the certificate you need and keep your Aadhaar card '
+                 'and supporting documents ready before you apply.')
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'   # keep-alive, so client connection reuse is visible
+    wbufsize = 1 << 16              # send headers and body in one write (no Nagle / delayed-ACK stall)
+    disable_nagle_algorithm = True
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get('Content-Length') or 0))
+        behaviour = self.server.behaviour
+        self.server.requests += 1
+        if behaviour['delay_ms']:
+            time.sleep(behaviour['delay_ms'] / 1000)
+
+        request = json.loads(body or b'{}')
+        if self.path != '/v1/chat':
+            status, payload = 404, {'message': 'not found'}
+        elif behaviour['status'] != 200:
+            status, payload = behaviour['status'], {'message': 'stub error'}
+        elif request.get('stream'):
+            return self._stream(request.get('message', ''))
+        else:
+            status, payload = 200, {'text': f"[stub] {request.get('message', '')}",
+                                    'generation_id': str(self.server.requests)}
+
+        raw = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(raw)))
+        self.end_headers()
+        self.wfile.write(raw)
+
+    def _stream(self, message):
+        """Streaming /chat: one JSON event per line, chunked, a token every `token_ms`."""
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/stream+json')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+
+        def send(event):
+            raw = (json.dumps(event) + '\n').encode()
+            self.wfile.write(f"{len(raw):x}\r\n".encode() + raw + b"\r\n")
+            self.wfile.flush()
+
+        text = f"[stub] {message} " + STREAM_FILLER
+        try:
+            send({'is_finished': False, 'event_type': 'stream-start', 'generation_id': str(self.server.requests)})
+            for token in re.findall(r'\S+\s*', text):
+                if self.server.behaviour['token_ms']:
+                    time.sleep(self.server.behaviour['token_ms'] / 1000)
+                send({'is_finished': False, 'event_type': 'text-generation', 'text': token})
+            send({'is_finished': True, 'event_type': 'stream-end', 'finish_reason': 'COMPLETE',
+                  'response': {'text': text}})
+            self.wfile.write(b"0\r\n\r\n")
+            self.wfile.flush()
+        except ConnectionError:
+            self.close_connection = True
+
+    def log_message(self, *args):
+        pass
+
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        pass   # clients hanging up mid-stream are expected
+
+
+def serve(port=0, delay_ms=0, status=200, token_ms=20):
+    """Start the stub on a daemon thread; returns the server (server.server_address, server.shutdown())."""
+    server = StubServer(('127.0.0.1', port), StubHandler)
+    server.behaviour = {'delay_ms': delay_ms, 'status': status, 'token_ms': token_ms}
+    server.requests = 0
+    threading.Thread(target=server.serve_forever, name='cohere-stub', daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--port', type=int, default=8090)
+    parser.add_argument('--delay-ms', type=int, default=0, help='delay before every answer')
+    parser.add_argument('--status', type=int, default=200, help='HTTP status to answer with')
+    parser.add_argument('--token-ms', type=int, default=20, help='delay between streamed tokens')
+    args = parser.parse_args()
+    server = serve(args.port, args.delay_ms, args.status, args.token_ms)
+    print(f"Cohere stub on http://127.0.0.1:{server.server_address[1]}  (Ctrl+C to stop)")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
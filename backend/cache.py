@@ -0,0 +1,105 @@
+"""
+Small thread-safe in-process LRU cache with per-entry TTL.
+
+Each gunicorn worker holds its own instance, so anything cached here must
+be safe to serve for up to `ttl` seconds after it changes in another
+process.  Invalidate explicitly with pop()/clear() in the process that
+made the change; SharedVersion tells the other processes when to clear.
+"""
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+
+MISSING = object()
+
+
+class TTLCache:
+    def __init__(self, maxsize=1024, ttl=300):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, default=MISSING):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or entry[0] < now:
+                if entry is not None:
+                    del self._data[key]
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key, value, ttl=None):
+        expires = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data[key] = (expires, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def pop(self, key):
+        with self._lock:
+            entry = self._data.pop(key, None)
+        return entry[1] if entry is not None else None
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            'size': len(self._data),
+            'maxsize': self.maxsize,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / total, 4) if total else 0.0
+        }
+
+
+class SharedVersion:
+    """
+    A cache_versions row shared by every process.  Whoever changes the
+    cached data calls bump() in the same transaction; readers call
+    changed() before using their cache and clear it when it returns True.
+    The row is read at most once every `check_seconds` per process.
+    """
+    def __init__(self, name, check_seconds):
+        self.name = name
+        self.check_seconds = check_seconds
+        self._version = None
+        self._last_check = float('-inf')
+        self._lock = threading.Lock()
+
+    def bump(self):
+        """Increment the version inside the caller's transaction."""
+        from extensions import db
+        from models import CacheVersion
+        updated = CacheVersion.query.filter_by(name=self.name).update(
+            {'version': CacheVersion.version + 1, 'updated_at': datetime.utcnow()}, synchronize_session=False)
+        if not updated:
+            db.session.add(CacheVersion(name=self.name, version=1))
+
+    def changed(self):
+        """True when another process bumped the version since the last check (needs an app context)."""
+        from extensions import db
+        from models import CacheVersion
+        now = time.monotonic()
+        with self._lock:
+            if now - self._last_check < self.check_seconds:
+                return False
+            self._last_check = now
+        version = db.session.query(CacheVersion.version).filter_by(name=self.name).scalar() or 0
+        with self._lock:
+            moved, self._version = version != self._version, version
+        return moved
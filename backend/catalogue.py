@@ -0,0 +1,102 @@
+"""
+Pre-serialised service catalogue for GET /api/services/categories.
+
+The response body for each language (en / hi / mr) is built once, kept
+as bytes together with a strong ETag (a hash of those bytes), and served
+as-is; clients and nginx revalidate with If-None-Match and get a 304.
+
+Invalidation is by version bump: every change to service_categories
+calls bump() in the same transaction, which increments the
+'service_categories' row of cache_versions.  Each process compares that
+version (one primary-key lookup) at most every CATALOGUE_CHECK_SECONDS
+and rebuilds when it moved; invalidate() makes the process that made
+the change rebuild on the next request.  Edits made directly in the
+database are published with `flask bump-catalogue`.
+"""
+import hashlib
+import threading
+import time
+from datetime import datetime
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from extensions import db
+from models import ServiceCategory, CacheVersion
+from config import Config
+import service_index
+
+NAME = 'service_categories'
+LANGUAGES = ('en', 'hi', 'mr')
+
+_lock = threading.Lock()
+_version = None
+_last_check = float('-inf')
+_bodies = {}        # lang -> (etag, body bytes)
+_stats = {'hits': 0, 'builds': 0, 'version_checks': 0}
+
+
+def bump():
+    """Increment the catalogue version inside the caller's transaction."""
+    updated = CacheVersion.query.filter_by(name=NAME).update(
+        {'version': CacheVersion.version + 1, 'updated_at': datetime.utcnow()}, synchronize_session=False)
+    if not updated:
+        db.session.add(CacheVersion(name=NAME, version=1))
+
+
+def invalidate():
+    """Drop this process's copy now (call after committing a bump())."""
+    global _last_check
+    with _lock:
+        _last_check = float('-inf')
+        _bodies.clear()
+    service_index.invalidate()
+
+
+def _current_version():
+    global _version, _last_check
+    now = time.monotonic()
+    if now - _last_check < Config.CATALOGUE_CHECK_SECONDS:
+        return
+    version = db.session.query(CacheVersion.version).filter_by(name=NAME).scalar() or 0
+    _stats['version_checks'] += 1
+    _last_check = now
+    if version != _version:
+        _version = version
+        _bodies.clear()
+        service_index.invalidate()
+
+
+def _build(lang):
+    categories = ServiceCategory.query.filter_by(is_active=True).order_by(ServiceCategory.id).all()
+    # same bytes jsonify() would produce for the uncached endpoint
+    body = current_app.json.response({'success': True, 'categories': [c.to_dict(lang) for c in categories]}).get_data()
+    _stats['builds'] += 1
+    return hashlib.blake2b(body, digest_size=16).hexdigest(), body
+
+
+def get(lang='en'):
+    """(etag, body) of the active categories in `lang` (needs an app context)."""
+    lang = lang if lang in LANGUAGES else 'en'
+    with _lock:
+        _current_version()
+        entry = _bodies.get(lang)
+        if entry is None:
+            entry = _bodies[lang] = _build(lang)
+        else:
+            _stats['hits'] += 1
+        return entry
+
+
+def stats():
+    return {**_stats, 'version': _version, 'languages_cached': sorted(_bodies)}
+
+
+@click.command('bump-catalogue')
+@with_appcontext
+def bump_catalogue_command():
+    """Publish service_categories edits made outside the API to every worker."""
+    bump()
+    db.session.commit()
+    invalidate()
+    version = db.session.query(CacheVersion.version).filter_by(name=NAME).scalar()
+    click.echo(f"✅ Service catalogue version is now {version}")
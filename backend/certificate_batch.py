@@ -0,0 +1,216 @@
+"""
+Bulk certificate issuance.
+
+issue_bulk() allocates certificate rows for a batch of approved service
+requests and commits, renders the PDFs in parallel on a process-wide
+ProcessPoolExecutor (CERTIFICATE_RENDER_PROCESSES, defaults to the number
+of cores) with no transaction open, using the same
+generate_certificate_pdf() as the single-certificate path, then records
+the results in a second transaction.  Renders that fail are handed to the
+background job queue (jobs.py) so they are retried with backoff like any
+other certificate.  Download ZIPs are kept for BULK_ZIP_RETENTION_HOURS.
+"""
+import os
+import time
+import base64
+import uuid
+import zipfile
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, date, timedelta
+from types import SimpleNamespace
+from extensions import db
+from models import Certificate, CertificateJob, ServiceRequest
+from config import Config
+import jobs
+import stats
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(
+                max_workers=Config.CERTIFICATE_RENDER_PROCESSES,
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=_init_worker,
+                initargs=(Config.CERTIFICATE_OUTPUT_DIR,)
+            )
+        return _executor
+
+
+def _init_worker(output_dir):
+    # spawn children re-import config; keep the parent's (possibly overridden) output dir
+    Config.CERTIFICATE_OUTPUT_DIR = output_dir
+
+
+def _render_one(spec):
+    """Runs in a pool process: render one certificate from plain data, never raises."""
+    from certificate_pdf import generate_certificate_pdf, qr_png_bytes
+    from certificate_signing import qr_data
+    try:
+        cert = SimpleNamespace(**spec['cert'])
+        user = SimpleNamespace(**spec['user'])
+        qr_png = qr_png_bytes(qr_data(cert, user.full_name))
+        filename = generate_certificate_pdf(cert, user, SimpleNamespace(**spec['service_req']), qr_png=qr_png)
+        return {'cert_id': spec['cert_id'], 'pdf_path': filename,
+                'qr_code': base64.b64encode(qr_png).decode('utf-8')}
+    except Exception as e:
+        return {'cert_id': spec['cert_id'], 'error': f"{type(e).__name__}: {e}"}
+
+
+def _render_spec(cert, service_req):
+    user = service_req.user
+    return {
+        'cert_id': cert.id,
+        'cert': {
+            'certificate_number': cert.certificate_number,
+            'certificate_type': cert.certificate_type,
+            'issued_at': cert.issued_at,
+            'valid_until': cert.valid_until,
+        },
+        'user': {
+            'full_name': user.full_name,
+            'mobile': user.mobile,
+            'village_ward': user.village_ward,
+            'district': user.district,
+        },
+        'service_req': {'request_number': service_req.request_number},
+    }
+
+
+def render_many(specs):
+    if not specs:
+        return []
+    chunksize = max(1, len(specs) // (Config.CERTIFICATE_RENDER_PROCESSES * 4))
+    return list(get_executor().map(_render_one, specs, chunksize=chunksize))
+
+
+def issue_bulk(service_requests, admin_id):
+    """
+    Issue certificates for `service_requests` (approved, with category and
+    user loaded, claimed by the caller's transaction).  Returns a list of
+    per-request result dicts and the elapsed seconds.
+
+    1. Allocate the certificate rows, each with a certificate_jobs row
+       already 'running' under this process, and commit: the requests now
+       count as issued for any concurrent batch and their locks are gone.
+    2. Close the session and render on the process pool.
+    3. Record pdf_path / qr_code / status in a second transaction; failed
+       renders go back to 'queued' for the job workers.  Should this
+       process die during the render, the workers reclaim the 'running'
+       jobs after CERTIFICATE_JOB_LOCK_TIMEOUT_SECONDS.
+    """
+    from routes.certificates import generate_certificate_number
+
+    started = time.perf_counter()
+    worker = jobs.worker_name()
+    now = datetime.utcnow()
+    pairs = []
+    for service_req in service_requests:
+        cert = Certificate(
+            request_id=service_req.id,
+            user_id=service_req.user_id,
+            certificate_type=service_req.category.name_en if service_req.category else 'Certificate',
+            certificate_number=generate_certificate_number(),
+            issued_by=admin_id,
+            issued_at=now,
+            valid_until=date.today() + timedelta(days=365)
+        )
+        db.session.add(cert)
+        pairs.append((cert, service_req))
+    db.session.flush()
+
+    items, specs = [], []
+    for cert, service_req in pairs:
+        job = jobs.enqueue_certificate(cert)
+        job.status, job.attempts, job.locked_by, job.locked_at = 'running', 1, worker[:100], now
+        specs.append(_render_spec(cert, service_req))
+        items.append({
+            'request_id': service_req.id,
+            'request_number': service_req.request_number,
+            'certificate_id': cert.id,
+            'certificate_number': cert.certificate_number,
+            'job': job,
+        })
+    db.session.flush()
+    for item in items:
+        item['job_id'] = item.pop('job').id
+    db.session.commit()
+    db.session.close()
+
+    by_cert = {r['cert_id']: r for r in render_many(specs)}
+
+    results = []
+    try:
+        for item in items:
+            rendered = by_cert.get(item['certificate_id'], {'error': 'not rendered'})
+            cert = db.session.get(Certificate, item['certificate_id'])
+            job = db.session.get(CertificateJob, item['job_id'])
+            job.locked_by = None
+            job.locked_at = None
+            if 'error' in rendered:
+                job.status = 'queued'
+                job.run_after = datetime.utcnow()
+                job.last_error = rendered['error'][:2000]
+                item.update(status='queued', error=rendered['error'])
+            else:
+                cert.pdf_path = rendered['pdf_path']
+                cert.qr_code = rendered['qr_code']
+                service_req = db.session.get(ServiceRequest, cert.request_id)
+                if service_req.status != 'completed':
+                    stats.record_transition('service_requests', service_req.status, 'completed')
+                    service_req.status = 'completed'
+                    service_req.resolved_at = datetime.utcnow()
+                job.status = 'done'
+                job.finished_at = datetime.utcnow()
+                del item['job_id']
+                item.update(status='issued', pdf_path=cert.pdf_path,
+                            download_url=f"/api/certificates/download/{cert.id}")
+            results.append(item)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+    if any(r['status'] == 'queued' for r in results):
+        jobs.ensure_inprocess_workers()
+
+    elapsed = time.perf_counter() - started
+    return results, elapsed
+
+
+def bulk_zip_path(batch_id):
+    return os.path.join(Config.CERTIFICATE_OUTPUT_DIR, f"bulk_{batch_id}.zip")
+
+
+def purge_zips(max_age_seconds=None):
+    """Delete bulk ZIPs older than BULK_ZIP_RETENTION_HOURS; returns the number removed."""
+    if max_age_seconds is None:
+        max_age_seconds = Config.BULK_ZIP_RETENTION_HOURS * 3600
+    cutoff = time.time() - max_age_seconds
+    removed = 0
+    for entry in os.scandir(Config.CERTIFICATE_OUTPUT_DIR):
+        if entry.name.startswith('bulk_') and entry.name.endswith('.zip') and entry.stat().st_mtime < cutoff:
+            try:
+                os.remove(entry.path)
+                removed += 1
+            except FileNotFoundError:
+                pass
+    return removed
+
+
+def write_zip(results):
+    """Bundle every issued PDF of a batch into one ZIP; returns the batch id."""
+    purge_zips()
+    batch_id = str(uuid.uuid4())
+    with zipfile.ZipFile(bulk_zip_path(batch_id), 'w', zipfile.ZIP_DEFLATED) as zf:
+        for r in results:
+            if r['status'] == 'issued':
+                zf.write(os.path.join(Config.CERTIFICATE_OUTPUT_DIR, r['pdf_path']),
+                         arcname=f"{r['certificate_number']}.pdf")
+    return batch_id
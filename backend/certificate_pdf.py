@@ -0,0 +1,200 @@
+"""
+Certificate PDF rendering engine.
+
+Paragraph/table styles are built once per process and reused for every
+certificate.  The QR code is handed to ReportLab as an in-memory PNG
+(taken from Certificate.qr_code when it is already set, otherwise
+rendered once from the signed payload, see certificate_signing.py) so nothing but the final PDF touches the disk, and the PDF
+itself is written to a temporary file and renamed into place so a
+half-written file is never served.
+
+Each certificate type can override the title, statement and accent colour
+through LAYOUTS; unknown types use the default layout.
+"""
+import os
+import base64
+import threading
+from io import BytesIO
+import qrcode
+from reportlab.lib.pagesizes import A4
+from reportlab.lib import colors
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, Image as RLImage
+from reportlab.lib.units import cm
+from config import Config
+from certificate_signing import VERIFY_URL, qr_data
+
+DEFAULT_STATEMENT = ("This is to certify that {name}, resident of {village}, {district}, Maharashtra, "
+                     "has been issued this {type} by the competent authority.")
+
+LAYOUTS = {
+    'default': {'accent': colors.darkblue, 'statement': DEFAULT_STATEMENT},
+    'Birth Certificate': {
+        'accent': colors.darkgreen,
+        'statement': ("This is to certify that the birth registered on the application of {name}, "
+                      "resident of {village}, {district}, Maharashtra, has been entered in the register "
+                      "of births maintained by this Gram Panchayat / Nagar Palika."),
+    },
+    'Death Certificate': {
+        'accent': colors.black,
+        'statement': ("This is to certify that the death reported on the application of {name}, "
+                      "resident of {village}, {district}, Maharashtra, has been entered in the register "
+                      "of deaths maintained by this Gram Panchayat / Nagar Palika."),
+    },
+    'Income Certificate': {
+        'accent': colors.darkorange,
+        'statement': ("This is to certify that the annual family income declared by {name}, "
+                      "resident of {village}, {district}, Maharashtra, has been verified by the "
+                      "competent authority on the basis of the documents submitted."),
+    },
+    'Caste Certificate': {
+        'accent': colors.purple,
+        'statement': ("This is to certify that {name}, resident of {village}, {district}, Maharashtra, "
+                      "belongs to the caste stated in the application, as verified from the records "
+                      "submitted to the competent authority."),
+    },
+    'Domicile Certificate': {
+        'accent': colors.darkcyan,
+        'statement': ("This is to certify that {name} is a permanent resident of {village}, "
+                      "{district}, Maharashtra, as verified by the competent authority."),
+    },
+    'Marriage Certificate': {
+        'accent': colors.darkred,
+        'statement': ("This is to certify that the marriage registered on the application of {name}, "
+                      "resident of {village}, {district}, Maharashtra, has been entered in the register "
+                      "of marriages maintained by this Gram Panchayat / Nagar Palika."),
+    },
+}
+
+_styles_lock = threading.Lock()
+_styles = {}
+
+
+def get_styles(accent):
+    """Paragraph styles for one accent colour, built once per process."""
+    key = accent.hexval()
+    styles = _styles.get(key)
+    if styles is None:
+        with _styles_lock:
+            styles = _styles.get(key)
+            if styles is None:
+                base = getSampleStyleSheet()
+                styles = {
+                    'header': ParagraphStyle(f'header_{key}', parent=base['Title'],
+                                             fontSize=16, textColor=accent, spaceAfter=6),
+                    'sub': ParagraphStyle(f'sub_{key}', parent=base['Normal'],
+                                          fontSize=11, textColor=colors.grey, spaceAfter=20, alignment=1),
+                    'body': ParagraphStyle(f'body_{key}', parent=base['Normal'], fontSize=11, spaceAfter=10),
+                    'footer': ParagraphStyle(f'footer_{key}', parent=base['Normal'],
+                                             fontSize=8, textColor=colors.grey, alignment=1),
+                }
+                _styles[key] = styles
+    return styles
+
+
+DETAILS_TABLE_STYLE = TableStyle([
+    ('BACKGROUND', (0, 0), (0, -1), colors.lightblue),
+    ('TEXTCOLOR', (0, 0), (-1, -1), colors.black),
+    ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
+    ('FONTSIZE', (0, 0), (-1, -1), 10),
+    ('ROWBACKGROUNDS', (0, 0), (-1, -1), [colors.whitesmoke, colors.white]),
+    ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
+    ('PADDING', (0, 0), (-1, -1), 8),
+])
+
+SIGN_TABLE_STYLE = TableStyle([
+    ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+    ('ALIGN', (2, 0), (2, 0), 'RIGHT'),
+])
+
+
+def qr_png_bytes(data: str) -> bytes:
+    qr = qrcode.QRCode(version=1, box_size=6, border=2)
+    qr.add_data(data)
+    qr.make(fit=True)
+    img = qr.make_image(fill_color="black", back_color="white")
+    buffer = BytesIO()
+    img.save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+def generate_qr_code(data: str) -> str:
+    return base64.b64encode(qr_png_bytes(data)).decode('utf-8')
+
+
+def get_layout(certificate_type):
+    return LAYOUTS.get(certificate_type, LAYOUTS['default'])
+
+
+def render_certificate(cert, user, service_req, qr_png=None) -> bytes:
+    """Render a certificate to PDF bytes."""
+    layout = get_layout(cert.certificate_type)
+    styles = get_styles(layout['accent'])
+    verify_url = VERIFY_URL.format(number=cert.certificate_number)
+
+    if qr_png is None:
+        stored = getattr(cert, 'qr_code', None)
+        qr_png = base64.b64decode(stored) if stored else qr_png_bytes(qr_data(cert, user.full_name))
+
+    elements = [
+        Paragraph("GRAM PANCHAYAT / NAGAR PALIKA", styles['header']),
+        Paragraph("Government of Maharashtra", styles['sub']),
+        Paragraph(f"<b>{layout.get('title', cert.certificate_type).upper()}</b>", styles['header']),
+        Spacer(1, 0.5*cm),
+    ]
+
+    cert_data = [
+        ['Certificate No.', cert.certificate_number],
+        ['Applicant Name', user.full_name],
+        ['Mobile', user.mobile],
+        ['Village/Ward', user.village_ward or 'N/A'],
+        ['District', user.district or 'N/A'],
+        ['Date of Issue', cert.issued_at.strftime('%d/%m/%Y')],
+        ['Valid Until', cert.valid_until.strftime('%d/%m/%Y') if cert.valid_until else 'Permanent'],
+        ['Request No.', service_req.request_number],
+    ]
+    table = Table(cert_data, colWidths=[6*cm, 10*cm])
+    table.setStyle(DETAILS_TABLE_STYLE)
+    elements.append(table)
+    elements.append(Spacer(1, 0.5*cm))
+
+    statement = layout['statement'].format(
+        name=user.full_name,
+        village=user.village_ward or 'the mentioned locality',
+        district=user.district or '',
+        type=cert.certificate_type
+    )
+    elements.append(Paragraph(statement, styles['body']))
+    elements.append(Spacer(1, 1*cm))
+
+    qr_img = RLImage(BytesIO(qr_png), width=3*cm, height=3*cm)
+    sign_data = [[qr_img, '', Paragraph('<b>Authorized Signatory</b><br/>Gram Panchayat / Nagar Palika<br/>Government of Maharashtra', styles['body'])]]
+    sign_table = Table(sign_data, colWidths=[4*cm, 6*cm, 6*cm])
+    sign_table.setStyle(SIGN_TABLE_STYLE)
+    elements.append(sign_table)
+    elements.append(Spacer(1, 0.3*cm))
+
+    elements.append(Paragraph(
+        f"This is a computer-generated certificate. Verify at {verify_url}",
+        styles['footer']
+    ))
+
+    out = BytesIO()
+    doc = SimpleDocTemplate(out, pagesize=A4,
+                            rightMargin=2*cm, leftMargin=2*cm,
+                            topMargin=2*cm, bottomMargin=2*cm)
+    doc.build(elements)
+    return out.getvalue()
+
+
+def generate_certificate_pdf(cert, user, service_req, qr_png=None):
+    """Render a certificate into CERTIFICATE_OUTPUT_DIR and return its file name."""
+    filename = f"cert_{cert.certificate_number}.pdf"
+    filepath = os.path.join(Config.CERTIFICATE_OUTPUT_DIR, filename)
+    pdf = render_certificate(cert, user, service_req, qr_png)
+
+    tmp_path = f"{filepath}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(pdf)
+    os.replace(tmp_path, filepath)
+    return filename
@@ -0,0 +1,139 @@
+"""
+Signed, offline-verifiable certificate payloads.
+
+The QR on every certificate carries the verify URL plus a compact token:
+
+    GP1.<base64url(payload)>.<base64url(ed25519 signature)>
+
+where payload is "certificate_number|holder_hash|type|issued|valid_until"
+(dates as YYYYMMDD, '-' for a permanent certificate) and holder_hash is
+the first 8 bytes of SHA-256 over the normalised holder name.  '%' and
+'|' inside a field are written as %25 / %7C, since the type comes from
+the editable service category name.  A verifier
+holding the public key from /api/certificates/public-key can check the
+signature, the validity date and the holder's name against their ID card
+without calling the API.
+
+The signing key comes from CERTIFICATE_SIGNING_KEY (base64 of a 32-byte
+Ed25519 seed) and must be set unless DEBUG is on: create_app() refuses to
+start without it.  With DEBUG a key is derived from SECRET_KEY so
+development setups work without configuration.
+"""
+import base64
+import hashlib
+import binascii
+from datetime import date, datetime
+from functools import lru_cache
+from urllib.parse import unquote
+from cryptography.exceptions import InvalidSignature
+from cryptography.hazmat.primitives.asymmetric.ed25519 import Ed25519PrivateKey
+from cryptography.hazmat.primitives import serialization
+from config import Config
+
+TOKEN_PREFIX = 'GP1'
+VERIFY_URL = "https://panchayat.gov.in/verify/{number}"
+
+
+def _b64e(raw: bytes) -> str:
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def _b64d(text: str) -> bytes:
+    return base64.urlsafe_b64decode(text + '=' * (-len(text) % 4))
+
+
+@lru_cache(maxsize=1)
+def _private_key():
+    if Config.CERTIFICATE_SIGNING_KEY:
+        seed = base64.b64decode(Config.CERTIFICATE_SIGNING_KEY)
+    elif Config.DEBUG:
+        seed = hashlib.sha256(b'certificate-signing:' + Config.SECRET_KEY.encode()).digest()
+    else:
+        # the default SECRET_KEYs are public, so a derived key would let anyone sign
+        raise RuntimeError("CERTIFICATE_SIGNING_KEY must be set when DEBUG is off")
+    return Ed25519PrivateKey.from_private_bytes(seed)
+
+
+def check_key():
+    """Fail at startup, not on the first certificate, when the signing key is missing or malformed."""
+    _private_key()
+
+
+def public_key_b64():
+    raw = _private_key().public_key().public_bytes(
+        encoding=serialization.Encoding.Raw, format=serialization.PublicFormat.Raw
+    )
+    return base64.b64encode(raw).decode()
+
+
+def holder_hash(name):
+    normalised = ' '.join((name or '').split()).casefold()
+    return _b64e(hashlib.sha256(normalised.encode()).digest()[:8])
+
+
+def _fmt_date(value):
+    if value is None:
+        return '-'
+    return value.strftime('%Y%m%d')
+
+
+def _escape(field):
+    return field.replace('%', '%25').replace('|', '%7C')
+
+
+def sign_payload(certificate_number, holder_name, certificate_type, issued_at, valid_until):
+    payload = '|'.join(_escape(field) for field in [
+        certificate_number,
+        holder_hash(holder_name),
+        certificate_type or '',
+        _fmt_date(issued_at),
+        _fmt_date(valid_until),
+    ]).encode()
+    signature = _private_key().sign(payload)
+    return f"{TOKEN_PREFIX}.{_b64e(payload)}.{_b64e(signature)}"
+
+
+def sign_certificate(cert, holder_name):
+    return sign_payload(cert.certificate_number, holder_name, cert.certificate_type,
+                        cert.issued_at or datetime.utcnow(), cert.valid_until)
+
+
+def qr_data(cert, holder_name):
+    """Text encoded in the certificate QR: the verify URL carrying the signed token."""
+    token = sign_certificate(cert, holder_name)
+    return f"{VERIFY_URL.format(number=cert.certificate_number)}?sig={token}"
+
+
+def verify_token(token, holder_name=None, today=None):
+    """
+    Check a token's signature (and optionally the holder name).  Returns
+    a dict describing the payload with 'signature_valid' and 'valid'.
+    """
+    try:
+        prefix, payload_b64, sig_b64 = token.split('.')
+        if prefix != TOKEN_PREFIX:
+            raise ValueError
+        payload, signature = _b64d(payload_b64), _b64d(sig_b64)
+        number, name_hash, cert_type, issued, valid_until = map(unquote, payload.decode().split('|'))
+    except (ValueError, binascii.Error, UnicodeDecodeError):
+        return {'signature_valid': False, 'valid': False, 'reason': 'Malformed token'}
+
+    try:
+        _private_key().public_key().verify(signature, payload)
+        signature_valid = True
+    except InvalidSignature:
+        signature_valid = False
+
+    today = today or date.today()
+    not_expired = valid_until == '-' or valid_until >= today.strftime('%Y%m%d')
+    result = {
+        'signature_valid': signature_valid,
+        'certificate_number': number,
+        'certificate_type': cert_type,
+        'issued': issued,
+        'valid_until': None if valid_until == '-' else valid_until,
+        'valid': signature_valid and not_expired,
+    }
+    if holder_name is not None:
+        result['holder_match'] = holder_hash(holder_name) == name_hash
+    return result
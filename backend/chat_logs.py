@@ -0,0 +1,34 @@
+"""
+Asynchronous chat_logs writes.
+
+The chatbot endpoints call record() (through chat_sessions.append) once
+the answer is complete (for /api/chatbot/stream, after the last event
+has been sent) instead of committing inside the request; rows are bulk-inserted by a
+BufferedWriter every CHAT_LOG_BATCH_SIZE rows or CHAT_LOG_FLUSH_MS
+milliseconds, so a slow database never holds up an answer.
+"""
+from background_writer import BufferedWriter
+from config import Config
+from models import ChatLog
+
+writer = BufferedWriter(
+    'chat_logs', ChatLog,
+    max_batch=Config.CHAT_LOG_BATCH_SIZE,
+    flush_interval_ms=Config.CHAT_LOG_FLUSH_MS,
+    max_queue=Config.CHAT_LOG_QUEUE_SIZE
+)
+
+
+def init_chat_logs(app):
+    writer.init_app(app)
+    return writer
+
+
+def record(user_id, session_id, user_message, bot_response, language='en'):
+    """Queue a chat_logs row; never blocks.  Returns False if it was dropped."""
+    return writer.emit(user_id=user_id, session_id=session_id, user_message=user_message,
+                       bot_response=bot_response, language=language)
+
+
+def stats():
+    return writer.stats()
@@ -0,0 +1,264 @@
+"""
+Server-side chatbot conversation memory.
+
+The chat widget sends only {message, session_id}; the last
+CHAT_SESSION_MAX_MESSAGES messages of each session are kept here and
+handed to Cohere as chat history, instead of the client re-sending the
+whole conversation on every call.
+
+  * DatabaseChatSessionStore - one chat_sessions row per session
+    (owner, JSON list of the recent messages, expires_at), read and
+    written on short connections of its own so the request never holds
+    a transaction while an answer streams.  The default ('database://').
+  * RedisChatSessionStore    - one capped list per session (RPUSH + LTRIM
+    + EXPIRE in one pipeline), shared by every gunicorn worker.
+  * MemoryChatSessionStore   - per-process LRU of ring buffers
+    (CHAT_SESSION_MAX_SESSIONS sessions, each a bounded deque) with a
+    sliding CHAT_SESSION_TTL_SECONDS expiry.  Only correct when a single
+    process serves /api/chatbot, so it is refused unless DEBUG is on.
+
+The backend is chosen by CHAT_SESSION_STORE_URL, which defaults to
+OTP_STORE_URL.  A session belongs to the user who first used it while
+logged in.  Another user (or an anonymous caller) presenting the same
+session_id is given a new session; the owner's history is left alone.
+
+append() also queues the exchange for chat_logs through the background
+writer (chat_logs.record), so the chat path never commits.
+"""
+import re
+import json
+import time
+import secrets
+import threading
+from abc import ABC, abstractmethod
+from collections import deque
+from datetime import datetime, timedelta
+from sqlalchemy import select
+from config import Config
+from cache import TTLCache
+from extensions import db
+from models import ChatSession
+import chat_logs
+
+_SESSION_ID = re.compile(r'^[A-Za-z0-9_-]{8,100}$')
+
+
+def new_session_id():
+    return 'sess_' + secrets.token_urlsafe(16)
+
+
+def resolve_session_id(session_id):
+    """The client's session_id if it is well-formed, otherwise a fresh one."""
+    if isinstance(session_id, str) and _SESSION_ID.match(session_id):
+        return session_id
+    return new_session_id()
+
+
+def _owner(user_id):
+    return str(user_id) if user_id else ''
+
+
+class ChatSessionStore(ABC):
+    def __init__(self, max_messages, ttl_seconds):
+        self.max_messages = max_messages
+        self.ttl_seconds = ttl_seconds
+        self.reads = 0
+        self.appends = 0
+        self.foreign = 0
+
+    @abstractmethod
+    def _load(self, session_id):
+        """(owner, [messages]) or None."""
+
+    @abstractmethod
+    def _push(self, session_id, owner, messages):
+        """Append `messages`, keep the last max_messages, set the owner and slide the TTL."""
+
+    def history(self, session_id, user_id=None):
+        """
+        Recent messages [{'role', 'content'}] of the session, oldest first,
+        or None when the session belongs to someone else.
+        """
+        self.reads += 1
+        entry = self._load(session_id)
+        if entry is None:
+            return []
+        if entry[0] not in ('', _owner(user_id)):
+            self.foreign += 1
+            return None
+        return entry[1]
+
+    def append(self, session_id, user_id, *messages):
+        entry = self._load(session_id)
+        if entry is not None and entry[0] not in ('', _owner(user_id)):
+            return False        # never write into someone else's session
+        self.appends += 1
+        self._push(session_id, _owner(user_id), messages)
+        return True
+
+    def stats(self):
+        return {'reads': self.reads, 'appends': self.appends, 'foreign': self.foreign,
+                'max_messages': self.max_messages, 'ttl_seconds': self.ttl_seconds}
+
+
+class MemoryChatSessionStore(ChatSessionStore):
+    def __init__(self, max_messages, ttl_seconds, max_sessions):
+        super().__init__(max_messages, ttl_seconds)
+        # session_id -> [owner, deque of messages]; get() evicts expired, set() slides the TTL
+        self._sessions = TTLCache(maxsize=max_sessions, ttl=ttl_seconds)
+        self._lock = threading.Lock()
+
+    def _load(self, session_id):
+        entry = self._sessions.get(session_id, None)
+        if entry is None:
+            return None
+        with self._lock:
+            return entry[0], list(entry[1])
+
+    def _push(self, session_id, owner, messages):
+        with self._lock:
+            entry = self._sessions.get(session_id, None)
+            if entry is None:
+                entry = [owner, deque(maxlen=self.max_messages)]
+            entry[0] = owner
+            entry[1].extend(messages)
+            self._sessions.set(session_id, entry)
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def stats(self):
+        return {**super().stats(), 'backend': 'memory', 'sessions': len(self._sessions),
+                'capacity': self._sessions.maxsize}
+
+
+class RedisChatSessionStore(ChatSessionStore):
+    KEY_PREFIX = 'chat:'
+
+    def __init__(self, url, max_messages, ttl_seconds):
+        super().__init__(max_messages, ttl_seconds)
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError("CHAT_SESSION_STORE_URL points at Redis but the 'redis' package is not installed")
+        self._client = redis.Redis.from_url(url)
+
+    def _keys(self, session_id):
+        return self.KEY_PREFIX + session_id, self.KEY_PREFIX + session_id + ':owner'
+
+    def _load(self, session_id):
+        key, owner_key = self._keys(session_id)
+        pipe = self._client.pipeline(transaction=False)
+        pipe.get(owner_key)
+        pipe.lrange(key, 0, -1)
+        owner, raw = pipe.execute()
+        if owner is None:
+            return None
+        return owner.decode(), [json.loads(m) for m in raw]
+
+    def _push(self, session_id, owner, messages):
+        key, owner_key = self._keys(session_id)
+        pipe = self._client.pipeline(transaction=True)
+        pipe.rpush(key, *[json.dumps(m, ensure_ascii=False) for m in messages])
+        pipe.ltrim(key, -self.max_messages, -1)
+        pipe.set(owner_key, owner)
+        pipe.expire(key, self.ttl_seconds)
+        pipe.expire(owner_key, self.ttl_seconds)
+        pipe.execute()
+
+    def stats(self):
+        return {**super().stats(), 'backend': 'redis'}
+
+
+class DatabaseChatSessionStore(ChatSessionStore):
+    SWEEP_INTERVAL = 300
+
+    def __init__(self, max_messages, ttl_seconds):
+        super().__init__(max_messages, ttl_seconds)
+        self._next_sweep = time.monotonic() + self.SWEEP_INTERVAL
+
+    def _load(self, session_id):
+        table = ChatSession.__table__
+        with db.engine.connect() as conn:
+            row = conn.execute(select(table.c.owner, table.c.messages)
+                               .where(table.c.session_id == session_id,
+                                      table.c.expires_at > datetime.utcnow())).first()
+        if row is None:
+            return None
+        return row.owner, json.loads(row.messages)
+
+    def _push(self, session_id, owner, messages):
+        table = ChatSession.__table__
+        now = datetime.utcnow()
+        with db.engine.begin() as conn:
+            row = conn.execute(select(table.c.messages, table.c.expires_at)
+                               .where(table.c.session_id == session_id).with_for_update()).first()
+            recent = json.loads(row.messages) if row is not None and row.expires_at > now else []
+            values = {'owner': owner, 'expires_at': now + timedelta(seconds=self.ttl_seconds),
+                      'messages': json.dumps((recent + list(messages))[-self.max_messages:], ensure_ascii=False)}
+            if row is None:
+                conn.execute(table.insert().values(session_id=session_id, **values))
+            else:
+                conn.execute(table.update().where(table.c.session_id == session_id).values(**values))
+            if time.monotonic() >= self._next_sweep:
+                self._next_sweep = time.monotonic() + self.SWEEP_INTERVAL
+                conn.execute(table.delete().where(table.c.expires_at <= now))
+
+    def stats(self):
+        return {**super().stats(), 'backend': 'database'}
+
+
+def _create_store():
+    url = Config.CHAT_SESSION_STORE_URL
+    if url.startswith(('redis://', 'rediss://', 'unix://')):
+        return RedisChatSessionStore(url, Config.CHAT_SESSION_MAX_MESSAGES, Config.CHAT_SESSION_TTL_SECONDS)
+    if url.startswith('memory://'):
+        if not Config.DEBUG:
+            # each gunicorn worker would keep its own history, lost between turns at random
+            raise RuntimeError("CHAT_SESSION_STORE_URL=memory:// only works in a single process; "
+                               "use database:// or a Redis URL unless DEBUG=True")
+        return MemoryChatSessionStore(Config.CHAT_SESSION_MAX_MESSAGES, Config.CHAT_SESSION_TTL_SECONDS,
+                                      Config.CHAT_SESSION_MAX_SESSIONS)
+    if url.startswith('database://'):
+        return DatabaseChatSessionStore(Config.CHAT_SESSION_MAX_MESSAGES, Config.CHAT_SESSION_TTL_SECONDS)
+    raise RuntimeError(f"Unsupported CHAT_SESSION_STORE_URL: {url}")
+
+
+store = _create_store()
+
+
+def open_session(session_id, user_id=None):
+    """
+    (session_id, history) for a request: the client's session and its
+    recent messages, or a new session id when the client's is missing,
+    malformed or belongs to someone else.
+    """
+    session_id = resolve_session_id(session_id)
+    try:
+        messages = store.history(session_id, user_id)
+    except Exception as e:
+        # a store outage costs the conversation context, not the answer
+        print(f"Chat session read failed: {e}")
+        return session_id, []
+    if messages is None:
+        return new_session_id(), []
+    return session_id, messages
+
+
+def history(session_id, user_id=None):
+    return open_session(session_id, user_id)[1]
+
+
+def append(session_id, user_id, user_message, bot_response, language='en'):
+    """Remember the exchange for the session and queue its chat_logs row."""
+    try:
+        store.append(session_id, user_id,
+                     {'role': 'user', 'content': user_message},
+                     {'role': 'assistant', 'content': bot_response})
+    except Exception as e:
+        print(f"Chat session write failed: {e}")
+    chat_logs.record(user_id, session_id, user_message, bot_response, language)
+
+
+def stats():
+    return store.stats()
@@ -0,0 +1,295 @@
+"""
+Process-wide Cohere chat client.
+
+One requests.Session with a bounded connection pool (COHERE_POOL_SIZE) is
+shared by every request in the worker, so connections and TLS sessions
+are reused instead of being set up per message, and every call is bounded
+by COHERE_CONNECT_TIMEOUT / COHERE_READ_TIMEOUT.  The v1 /chat endpoint is
+called directly: the v4 SDK builds a new session per Client, checks the
+key over the network when constructed and only takes a single timeout.
+
+A circuit breaker sits in front of the upstream: after
+COHERE_BREAKER_FAILURES consecutive failures (errors, timeouts, non-200)
+calls fail fast with CircuitOpen for COHERE_BREAKER_RESET_SECONDS, after
+which a single trial call is let through and either closes the circuit
+or opens it again.  Callers are expected to fall back to the rule-based
+answers on any UpstreamError.
+
+Set COHERE_API_URL to a local stub (benchmarks/cohere_stub.py) to run
+without the real API.
+"""
+import json
+import threading
+import time
+from collections import deque
+import requests
+from requests.adapters import HTTPAdapter
+from config import Config
+
+
+class UpstreamError(Exception):
+    pass
+
+
+class UpstreamTimeout(UpstreamError):
+    pass
+
+
+class CircuitOpen(UpstreamError):
+    pass
+
+
+class CircuitBreaker:
+    def __init__(self, failures, reset_seconds):
+        self.failures = failures
+        self.reset_seconds = reset_seconds
+        self._lock = threading.Lock()
+        self._consecutive = 0
+        self._opened_at = None
+        self._trial = False
+        self.times_opened = 0
+
+    def _state(self, now):
+        if self._opened_at is None:
+            return 'closed'
+        return 'half_open' if now - self._opened_at >= self.reset_seconds else 'open'
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._state(time.monotonic())
+
+    def allow(self):
+        """True if a call may go upstream now (closed, or the one half-open trial)."""
+        with self._lock:
+            state = self._state(time.monotonic())
+            if state == 'closed':
+                return True
+            if state == 'half_open' and not self._trial:
+                self._trial = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self._consecutive = 0
+            self._opened_at = None
+            self._trial = False
+
+    def release(self):
+        """The admitted call ended without a verdict (e.g. the caller went away)."""
+        with self._lock:
+            self._trial = False
+
+    def record_failure(self):
+        with self._lock:
+            self._consecutive += 1
+            if self._trial or (self._opened_at is None and self._consecutive >= self.failures):
+                if not self._trial:
+                    self.times_opened += 1
+                self._opened_at = time.monotonic()
+            self._trial = False
+
+
+def _summary(samples):
+    if not samples:
+        return None
+    samples = sorted(samples)
+
+    def pct(p):
+        return round(samples[min(len(samples) - 1, int(p * len(samples)))] * 1000, 1)
+
+    return {
+        'samples': len(samples),
+        'avg': round(sum(samples) * 1000 / len(samples), 1),
+        'p50': pct(0.50),
+        'p95': pct(0.95),
+        'max': round(samples[-1] * 1000, 1)
+    }
+
+
+class CohereClient:
+    def __init__(self, api_key, api_url, model, connect_timeout, read_timeout, pool_size,
+                 breaker_failures, breaker_reset_seconds):
+        self.api_url = api_url.rstrip('/')
+        self.model = model
+        self.timeout = (connect_timeout, read_timeout)
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.session.headers.update({
+            'Authorization': f'Bearer {api_key}',
+            'Accept': 'application/json'
+        })
+        self.breaker = CircuitBreaker(breaker_failures, breaker_reset_seconds)
+
+        self._lock = threading.Lock()
+        self._latencies = deque(maxlen=1000)     # seconds, last successful calls
+        self._first_token = deque(maxlen=1000)   # seconds to the first streamed text
+        self.calls = 0
+        self.streams = 0
+        self.errors = 0
+        self.timeouts = 0
+        self.short_circuited = 0
+
+    def _admit(self):
+        if not self.breaker.allow():
+            with self._lock:
+                self.short_circuited += 1
+            raise CircuitOpen('Cohere circuit open')
+
+    def _post(self, payload, stream=False):
+        try:
+            response = self.session.post(f"{self.api_url}/v1/chat", json=payload, timeout=self.timeout,
+                                         stream=stream)
+        except requests.Timeout as e:
+            raise UpstreamTimeout(str(e)) from e
+        except requests.RequestException as e:
+            raise UpstreamError(str(e)) from e
+        if response.status_code != 200:
+            response.close()
+            raise UpstreamError(f"Cohere returned HTTP {response.status_code}")
+        return response
+
+    def _payload(self, message, preamble, chat_history, temperature, documents):
+        payload = {'message': message, 'model': self.model, 'temperature': temperature,
+                   'chat_history': chat_history or []}
+        if preamble:
+            payload['preamble'] = preamble
+        if documents:
+            payload['documents'] = documents
+        return payload
+
+    def _failed(self, error):
+        self.breaker.record_failure()
+        with self._lock:
+            self.errors += 1
+            if isinstance(error, UpstreamTimeout):
+                self.timeouts += 1
+
+    def chat(self, message, preamble=None, chat_history=None, temperature=0.3, documents=None):
+        """
+        Reply text for `message`, grounded on `documents` ([{'title', 'snippet'}])
+        if given.  Raises UpstreamError (incl. CircuitOpen / UpstreamTimeout).
+        """
+        self._admit()
+        with self._lock:
+            self.calls += 1
+        start = time.perf_counter()
+        try:
+            response = self._post(self._payload(message, preamble, chat_history, temperature, documents))
+            try:
+                text = response.json().get('text')
+            except ValueError as e:
+                raise UpstreamError('Invalid JSON from Cohere') from e
+            if not text:
+                raise UpstreamError('Empty response from Cohere')
+        except UpstreamError as e:
+            self._failed(e)
+            raise
+
+        self.breaker.record_success()
+        with self._lock:
+            self._latencies.append(time.perf_counter() - start)
+        return text
+
+    def chat_stream(self, message, preamble=None, chat_history=None, temperature=0.3, documents=None):
+        """
+        Yield reply text as Cohere generates it (streaming /chat, one JSON
+        event per line).  COHERE_READ_TIMEOUT bounds the gap between
+        events rather than the whole answer.  Raises UpstreamError like
+        chat(), possibly after some text has been yielded.
+        """
+        self._admit()
+        with self._lock:
+            self.calls += 1
+            self.streams += 1
+        payload = self._payload(message, preamble, chat_history, temperature, documents)
+        payload['stream'] = True
+        start = time.perf_counter()
+        first = None
+        try:
+            response = self._post(payload, stream=True)
+            try:
+                for line in response.iter_lines():
+                    if not line:
+                        continue
+                    try:
+                        event = json.loads(line)
+                    except ValueError as e:
+                        raise UpstreamError('Invalid stream event from Cohere') from e
+                    kind = event.get('event_type')
+                    if kind == 'text-generation' and event.get('text'):
+                        if first is None:
+                            first = time.perf_counter() - start
+                        yield event['text']
+                    elif kind == 'stream-end':
+                        if event.get('finish_reason') not in ('COMPLETE', 'MAX_TOKENS'):
+                            raise UpstreamError(f"Cohere stream ended with {event.get('finish_reason')}")
+                        break
+                else:
+                    raise UpstreamError('Cohere stream ended early')
+            except requests.exceptions.ConnectionError as e:
+                # a read timeout while streaming surfaces as ConnectionError(ReadTimeoutError)
+                if 'timed out' in str(e).lower():
+                    raise UpstreamTimeout(str(e)) from e
+                raise UpstreamError(str(e)) from e
+            except requests.RequestException as e:
+                raise UpstreamError(str(e)) from e
+            finally:
+                response.close()
+        except UpstreamError as e:
+            self._failed(e)
+            raise
+        except GeneratorExit:
+            # the consumer stopped reading (client disconnected)
+            if first is not None:
+                self.breaker.record_success()
+            else:
+                self.breaker.release()
+            raise
+
+        self.breaker.record_success()
+        with self._lock:
+            self._latencies.append(time.perf_counter() - start)
+            if first is not None:
+                self._first_token.append(first)
+
+    def stats(self):
+        with self._lock:
+            latencies, first_token = list(self._latencies), list(self._first_token)
+            counters = {'calls': self.calls, 'streams': self.streams, 'errors': self.errors,
+                        'timeouts': self.timeouts, 'short_circuited': self.short_circuited}
+        return {
+            **counters,
+            'circuit': self.breaker.state,
+            'circuit_opened': self.breaker.times_opened,
+            'latency_ms': _summary(latencies),
+            'first_token_ms': _summary(first_token)
+        }
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    """The shared client, or None when COHERE_API_KEY is not set."""
+    global _client
+    if not Config.COHERE_API_KEY:
+        return None
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = CohereClient(
+                    Config.COHERE_API_KEY, Config.COHERE_API_URL, Config.COHERE_MODEL,
+                    Config.COHERE_CONNECT_TIMEOUT, Config.COHERE_READ_TIMEOUT, Config.COHERE_POOL_SIZE,
+                    Config.COHERE_BREAKER_FAILURES, Config.COHERE_BREAKER_RESET_SECONDS
+                )
+    return _client
+
+
+def stats():
+    client = _client
+    return client.stats() if client is not None else {'configured': bool(Config.COHERE_API_KEY)}
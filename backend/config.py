@@ -22,15 +22,139 @@ class Config:
     UPLOAD_FOLDER = os.path.join(os.path.dirname(__file__), 'uploads')
     MAX_CONTENT_LENGTH = 10 * 1024 * 1024
     ALLOWED_EXTENSIONS = {'pdf', 'png', 'jpg', 'jpeg', 'doc', 'docx'}
+    # Uploads are hashed while streamed to disk in pieces of this size (see upload_store.py)
+    UPLOAD_CHUNK_SIZE = 1024 * 1024
+    # Resumable uploads (see upload_sessions.py): chunk size, largest file, idle sessions expire after
+    UPLOAD_SESSION_CHUNK_SIZE = int(os.environ.get('UPLOAD_SESSION_CHUNK_SIZE', str(256 * 1024)))
+    UPLOAD_SESSION_MAX_SIZE = 50 * 1024 * 1024
+    UPLOAD_SESSION_TTL_HOURS = 24
+    # Photos (jpg/png) get a recompressed preview and a thumbnail from
+    # background workers (see document_images.py); threads inside the API
+    # process, or 0 when running a dedicated `flask image-worker` pool
+    DOCUMENT_WORKER_THREADS = int(os.environ.get('DOCUMENT_WORKER_THREADS', '1'))
+    DOCUMENT_JOB_MAX_ATTEMPTS = 3
+    DOCUMENT_JOB_BACKOFF_SECONDS = 10
+    DOCUMENT_JOB_LOCK_TIMEOUT_SECONDS = 120
+    DOCUMENT_JOB_POLL_SECONDS = 2
+    IMAGE_PREVIEW_MAX_PX = 1600
+    IMAGE_PREVIEW_MAX_BYTES = 400 * 1024
+    IMAGE_PREVIEW_QUALITY = 80
+    IMAGE_THUMBNAIL_PX = 320
+    IMAGE_THUMBNAIL_QUALITY = 70
 
     OTP_EXPIRY_MINUTES = 10
     OTP_LENGTH = 6
     MOCK_OTP = True
+    OTP_MAX_ATTEMPTS = 5
+    # 'database://' (otp_codes table), a Redis URL, or 'memory://' (single
+    # process, DEBUG only); see otp_store.py
+    OTP_STORE_URL = os.environ.get('OTP_STORE_URL', 'database://')
+    # Also append issue/verify events to otp_logs (asynchronously)
+    OTP_AUDIT_LOG = os.environ.get('OTP_AUDIT_LOG', 'False') == 'True'
+
+    # Analytics events are bulk-inserted in the background (see analytics_events.py)
+    ANALYTICS_BATCH_SIZE = int(os.environ.get('ANALYTICS_BATCH_SIZE', '500'))
+    ANALYTICS_FLUSH_MS = int(os.environ.get('ANALYTICS_FLUSH_MS', '1000'))
+    ANALYTICS_QUEUE_SIZE = int(os.environ.get('ANALYTICS_QUEUE_SIZE', '20000'))
+
+    # Daily rollups behind /api/analytics (see rollups.py)
+    ROLLUP_REFRESH_SECONDS = int(os.environ.get('ROLLUP_REFRESH_SECONDS', '60'))
+    ROLLUP_OVERLAP_SECONDS = 300
+
+    # flask reclassify-grievances / POST /api/admin/grievances/reclassify
+    RECLASSIFY_CHUNK_SIZE = 2000
+    RECLASSIFY_PROCESSES = int(os.environ.get('RECLASSIFY_PROCESSES', os.cpu_count() or 1))
+
+    # Near-duplicate grievance clustering (see grievance_clusters.py)
+    CLUSTER_NUM_PERM = 64
+    CLUSTER_BANDS = 16
+    CLUSTER_THRESHOLD = float(os.environ.get('CLUSTER_THRESHOLD', '0.5'))
+    CLUSTER_WINDOW_DAYS = 14
+    CLUSTER_MAX_CANDIDATES = 200
 
     COHERE_API_KEY = os.environ.get('COHERE_API_KEY', '')
+    COHERE_API_URL = os.environ.get('COHERE_API_URL', 'https://api.cohere.ai')
+    COHERE_MODEL = 'command-r'
+    # Shared pooled client (see cohere_client.py); a slow upstream must not hold a worker
+    COHERE_CONNECT_TIMEOUT = 3.05
+    COHERE_READ_TIMEOUT = float(os.environ.get('COHERE_READ_TIMEOUT', '12'))
+    COHERE_POOL_SIZE = 8
+    COHERE_BREAKER_FAILURES = 5
+    COHERE_BREAKER_RESET_SECONDS = 30
+    # Cached chatbot answers, keyed by language + normalised message + last N history turns
+    CHATBOT_CACHE_SIZE = 5000
+    CHATBOT_CACHE_TTL_SECONDS = int(os.environ.get('CHATBOT_CACHE_TTL_SECONDS', '3600'))
+    CHATBOT_CACHE_HISTORY_TURNS = 2
+    # Local BM25 index over service_categories answering service questions (see service_index.py)
+    SERVICE_INDEX_CHECK_SECONDS = 30
+    SERVICE_INDEX_MIN_SCORE = 1.5
+    SERVICE_INDEX_MARGIN = 1.5
+    # Pre-serialised /api/services/categories (see catalogue.py): version check interval, browser / nginx max-age
+    CATALOGUE_CHECK_SECONDS = 5
+    CATALOGUE_MAX_AGE = int(os.environ.get('CATALOGUE_MAX_AGE', '60'))
+    # Server-side chat sessions (see chat_sessions.py): last N messages per session_id, sliding TTL.
+    # Same schemes as OTP_STORE_URL; MAX_SESSIONS only bounds the memory:// store
+    CHAT_SESSION_STORE_URL = os.environ.get('CHAT_SESSION_STORE_URL', OTP_STORE_URL)
+    CHAT_SESSION_MAX_MESSAGES = 6
+    CHAT_SESSION_TTL_SECONDS = int(os.environ.get('CHAT_SESSION_TTL_SECONDS', '1800'))
+    CHAT_SESSION_MAX_SESSIONS = 20000
+    # chat_logs rows are written in the background (see chat_logs.py)
+    CHAT_LOG_BATCH_SIZE = 200
+    CHAT_LOG_FLUSH_MS = 1000
+    CHAT_LOG_QUEUE_SIZE = 10000
 
     MOCK_PAYMENT = True
 
+    # Return X-SQL-Query-Count on every response (tests / N+1 hunting)
+    SQL_QUERY_COUNT_HEADER = os.environ.get('SQL_QUERY_COUNT_HEADER', str(DEBUG)) == 'True'
+
     CERTIFICATE_OUTPUT_DIR = os.path.join(os.path.dirname(__file__), 'certificates')
 
+    # Behind the bundled nginx, downloads are handed off with X-Accel-Redirect
+    # to its internal /_protected/ locations (see file_delivery.py)
+    X_ACCEL_REDIRECT = os.environ.get('X_ACCEL_REDIRECT', 'False') == 'True'
+    X_ACCEL_PREFIX = '/_protected'
+    # Reverse proxies in front of the API whose X-Forwarded-For is trusted
+    # for the client address (1 behind the bundled nginx, 0 when exposed directly)
+    TRUSTED_PROXY_HOPS = int(os.environ.get('TRUSTED_PROXY_HOPS', '0'))
+
+    # Certificate PDFs are rendered by background workers (see jobs.py).
+    # Threads started inside the API process on first use; set to 0 when
+    # running a dedicated `flask cert-worker` pool.
+    CERTIFICATE_WORKER_THREADS = int(os.environ.get('CERTIFICATE_WORKER_THREADS', '1'))
+    CERTIFICATE_JOB_MAX_ATTEMPTS = 5
+    CERTIFICATE_JOB_BACKOFF_SECONDS = 10
+    CERTIFICATE_JOB_LOCK_TIMEOUT_SECONDS = 300
+    CERTIFICATE_JOB_POLL_SECONDS = 2
+
+    # Bulk issuance renders on a process pool (see certificate_batch.py)
+    CERTIFICATE_RENDER_PROCESSES = int(os.environ.get('CERTIFICATE_RENDER_PROCESSES', os.cpu_count() or 1))
+    BULK_CERTIFICATE_MAX = 1000
+    BULK_ZIP_RETENTION_HOURS = 24
+
+    # base64 of a 32-byte Ed25519 seed; required unless DEBUG (then derived from SECRET_KEY)
+    CERTIFICATE_SIGNING_KEY = os.environ.get('CERTIFICATE_SIGNING_KEY', '')
+
+    # REQ / GRV / TXN / CERT numbers come from per-day (CERT: per-year)
+    # sequences, reserved in blocks per process (see reference_numbers.py).
+    # `flask reference-sequences` creates them DAYS_AHEAD days in advance.
+    # The key scrambles the suffixes; derived from SECRET_KEY when empty.
+    REFERENCE_BLOCK_SIZE = int(os.environ.get('REFERENCE_BLOCK_SIZE', '20'))
+    REFERENCE_SEQUENCE_DAYS_AHEAD = 30
+    REFERENCE_SEQUENCE_KEEP_DAYS = 7
+    REFERENCE_NUMBER_KEY = os.environ.get('REFERENCE_NUMBER_KEY', '')
+
+    # Per-process cache of /verify lookups; a revocation bumps a
+    # cache_versions row that every process checks this often
+    VERIFY_CACHE_SIZE = 50000
+    VERIFY_CACHE_TTL_SECONDS = 300
+    VERIFY_NEGATIVE_TTL_SECONDS = 60
+    VERIFY_REVOCATION_CHECK_SECONDS = 2
+
+    # Batch verification for institutions: "name:key,name2:key2" sent as X-API-Key
+    VERIFY_API_KEYS = os.environ.get('VERIFY_API_KEYS', '')
+    VERIFY_BATCH_MAX = 5000
+    VERIFY_BATCH_CLIENT_PER_MINUTE = 20000   # certificates / minute per API client
+    VERIFY_BATCH_ANON_PER_MINUTE = 500       # certificates / minute per IP without a key
+
     CORS_ORIGINS = os.environ.get('CORS_ORIGINS', 'http://localhost:3000').split(',')
\ No newline at end of file
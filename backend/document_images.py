@@ -0,0 +1,259 @@
+"""
+Background previews and thumbnails for photographed documents.
+
+Citizens mostly attach 8-10 MB phone photos of Aadhaar / ration cards,
+while officers only need to read them.  Every jpg/png upload gets a
+document_jobs row in the upload's transaction; image workers then make,
+from the stored blob:
+
+  * a preview   - EXIF-rotated, longest edge IMAGE_PREVIEW_MAX_PX, JPEG at
+                  IMAGE_PREVIEW_QUALITY, stepped down until it is under
+                  IMAGE_PREVIEW_MAX_BYTES (skipped when the original is
+                  already smaller)
+  * a thumbnail - longest edge IMAGE_THUMBNAIL_PX, what the officer review
+                  screen loads by default
+
+and record preview_size / thumbnail_size on the Document.  Both files are
+stored by the blob's hash (upload_store.derived_path), so a scan uploaded
+for several applications is only processed once and is removed with the
+blob by `flask gc-uploads`.
+
+Jobs are claimed like certificate jobs (jobs.claim_next: atomic UPDATE,
+SKIP LOCKED on Postgres, backoff, stale lock reclaim).  Workers run as
+DOCUMENT_WORKER_THREADS threads in the API process - Pillow releases
+the GIL while decoding and resizing - or as a process pool:
+
+    flask --app app:create_app image-worker --processes 4
+"""
+import io
+import os
+import threading
+import time
+import uuid
+import traceback
+import multiprocessing
+from datetime import datetime
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from PIL import Image, ImageOps, UnidentifiedImageError
+from extensions import db
+from models import Document, DocumentJob
+from config import Config
+import jobs
+import upload_store
+
+IMAGE_EXTENSIONS = {'jpg', 'jpeg', 'png'}
+MIN_QUALITY = 40
+# Failures retrying will not fix
+PERMANENT_ERRORS = (UnidentifiedImageError, Image.DecompressionBombError, FileNotFoundError)
+
+_wakeup = threading.Event()
+_threads_lock = threading.Lock()
+_threads = []
+
+
+def is_image(file_name):
+    return '.' in (file_name or '') and file_name.rsplit('.', 1)[1].lower() in IMAGE_EXTENSIONS
+
+
+def enqueue(doc):
+    """Queue derivatives for `doc` in the current transaction (caller commits); None for non-images."""
+    if not is_image(doc.file_name):
+        return None
+    job = DocumentJob(document_id=doc.id, status='queued',
+                      max_attempts=Config.DOCUMENT_JOB_MAX_ATTEMPTS,
+                      run_after=datetime.utcnow())
+    db.session.add(job)
+    return job
+
+
+def _flatten(img):
+    img = ImageOps.exif_transpose(img)        # returns a loaded copy
+    if img.mode in ('RGBA', 'LA') or (img.mode == 'P' and 'transparency' in img.info):
+        rgba = img.convert('RGBA')
+        flat = Image.new('RGB', rgba.size, 'white')
+        flat.paste(rgba, mask=rgba.getchannel('A'))
+        return flat
+    return img if img.mode == 'RGB' else img.convert('RGB')
+
+
+def _encode(img, quality, max_bytes=None):
+    while True:
+        out = io.BytesIO()
+        img.save(out, 'JPEG', quality=quality, optimize=True, progressive=True)
+        if max_bytes is None or out.tell() <= max_bytes or quality <= MIN_QUALITY:
+            return out.getvalue()
+        quality -= 10
+
+
+def _write(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temp = f"{path}.{uuid.uuid4().hex}.tmp"
+    with open(temp, 'wb') as f:
+        f.write(data)
+    os.replace(temp, path)
+
+
+def render(source, sha256):
+    """Write the derivatives of blob `sha256` (stored at `source`).  Returns (preview_size or None, thumbnail_size)."""
+    preview_path = upload_store.derived_path(sha256, 'preview')
+    thumbnail_path = upload_store.derived_path(sha256, 'thumbnail')
+    if os.path.exists(thumbnail_path):        # same file already processed for another document
+        preview_size = os.path.getsize(preview_path) if os.path.exists(preview_path) else None
+        return preview_size, os.path.getsize(thumbnail_path)
+
+    with Image.open(source) as original:
+        # JPEG: let the decoder scale by 1/2..1/8 instead of decoding every pixel
+        scale = Config.IMAGE_PREVIEW_MAX_PX / max(original.size)
+        original.draft('RGB', (int(original.width * scale), int(original.height * scale)))
+        img = _flatten(original)
+
+    img.thumbnail((Config.IMAGE_PREVIEW_MAX_PX, Config.IMAGE_PREVIEW_MAX_PX), Image.Resampling.LANCZOS)
+    preview = _encode(img, Config.IMAGE_PREVIEW_QUALITY, Config.IMAGE_PREVIEW_MAX_BYTES)
+    preview_size = None
+    if len(preview) < os.path.getsize(source):
+        _write(preview_path, preview)
+        preview_size = len(preview)
+
+    img.thumbnail((Config.IMAGE_THUMBNAIL_PX, Config.IMAGE_THUMBNAIL_PX), Image.Resampling.LANCZOS)
+    thumbnail = _encode(img, Config.IMAGE_THUMBNAIL_QUALITY)
+    _write(thumbnail_path, thumbnail)
+    return preview_size, len(thumbnail)
+
+
+def run_job(job):
+    """Make the derivatives for a claimed job and record the sizes or the failure."""
+    job_id, document_id = job.id, job.document_id
+    doc = db.session.get(Document, document_id)
+    sha256 = doc.sha256 if doc else None
+    source = upload_store.absolute_path(doc.file_path) if doc and doc.file_path else None
+    # no transaction stays open while decoding
+    db.session.close()
+
+    try:
+        if not sha256:
+            raise FileNotFoundError(f"Document {document_id} has no stored file")
+        preview_size, thumbnail_size = render(source, sha256)
+    except Exception as e:
+        db.session.rollback()
+        job = db.session.get(DocumentJob, job_id)
+        if job is None:                       # document deleted meanwhile
+            return False
+        job.last_error = f"{type(e).__name__}: {e}"[:2000]
+        job.locked_by = None
+        job.locked_at = None
+        if isinstance(e, PERMANENT_ERRORS) or job.attempts >= job.max_attempts:
+            job.status = 'failed'
+            job.finished_at = datetime.utcnow()
+        else:
+            job.status = 'queued'
+            job.run_after = datetime.utcnow() + jobs.backoff(job.attempts, Config.DOCUMENT_JOB_BACKOFF_SECONDS)
+        db.session.commit()
+        print(f"Document job {job_id} failed (attempt {job.attempts}): {e}")
+        if not isinstance(e, PERMANENT_ERRORS):
+            traceback.print_exc()
+        return False
+
+    Document.query.filter_by(id=document_id).update(
+        {'preview_size': preview_size, 'thumbnail_size': thumbnail_size}, synchronize_session=False)
+    DocumentJob.query.filter_by(id=job_id).update(
+        {'status': 'done', 'last_error': None, 'finished_at': datetime.utcnow()}, synchronize_session=False)
+    db.session.commit()
+    return True
+
+
+def run_pending(max_jobs=None, worker=None):
+    """Process runnable jobs until the queue is empty; returns the number processed."""
+    done = 0
+    while max_jobs is None or done < max_jobs:
+        job = jobs.claim_next(worker, model=DocumentJob, lock_timeout=Config.DOCUMENT_JOB_LOCK_TIMEOUT_SECONDS)
+        if job is None:
+            break
+        run_job(job)
+        done += 1
+    return done
+
+
+def _work_loop(app, poll_seconds, stop=None):
+    with app.app_context():
+        while stop is None or not stop.is_set():
+            try:
+                processed = run_pending()
+            except Exception as e:
+                print(f"Image worker error: {e}")
+                db.session.rollback()
+                processed = 0
+            finally:
+                db.session.remove()
+            if not processed:
+                _wakeup.wait(poll_seconds)
+                _wakeup.clear()
+
+
+def ensure_inprocess_workers():
+    """Start DOCUMENT_WORKER_THREADS daemon threads in this process (once) and wake them."""
+    count = Config.DOCUMENT_WORKER_THREADS
+    if count > 0:
+        with _threads_lock:
+            _threads[:] = [t for t in _threads if t.is_alive()]
+            app = current_app._get_current_object()
+            while len(_threads) < count:
+                t = threading.Thread(target=_work_loop, args=(app, Config.DOCUMENT_JOB_POLL_SECONDS),
+                                     name=f"image-worker-{len(_threads)}", daemon=True)
+                t.start()
+                _threads.append(t)
+    _wakeup.set()
+
+
+def backfill():
+    """Queue image documents stored before this pipeline existed.  Returns the number queued."""
+    pending = db.session.query(DocumentJob.id).filter(DocumentJob.document_id == Document.id)
+    docs = Document.query.filter(Document.thumbnail_size.is_(None), Document.sha256.isnot(None),
+                                 Document.sha256 != '', ~pending.exists()).all()
+    queued = sum(enqueue(doc) is not None for doc in docs)
+    db.session.commit()
+    return queued
+
+
+def stats():
+    counts = dict(db.session.query(DocumentJob.status, db.func.count(DocumentJob.id))
+                  .group_by(DocumentJob.status).all())
+    row = db.session.query(db.func.coalesce(db.func.sum(Document.file_size), 0),
+                           db.func.coalesce(db.func.sum(Document.preview_size), 0),
+                           db.func.coalesce(db.func.sum(Document.thumbnail_size), 0)) \
+        .filter(Document.thumbnail_size.isnot(None)).one()
+    return {'jobs': counts, 'original_bytes': int(row[0]), 'preview_bytes': int(row[1]),
+            'thumbnail_bytes': int(row[2])}
+
+
+def _process_main(poll_seconds):
+    from app import create_app
+    app = create_app()
+    _work_loop(app, poll_seconds)
+
+
+@click.command('image-worker')
+@click.option('--processes', default=os.cpu_count() or 1, show_default=True, help='Worker processes to run.')
+@click.option('--poll', 'poll_seconds', default=Config.DOCUMENT_JOB_POLL_SECONDS, show_default=True,
+              help='Seconds to sleep when the queue is empty.')
+@click.option('--backfill', 'run_backfill', is_flag=True, help='First queue image documents uploaded earlier.')
+@with_appcontext
+def image_worker_command(processes, poll_seconds, run_backfill):
+    """Run a pool of workers making previews and thumbnails of uploaded photos."""
+    if run_backfill:
+        click.echo(f"✅ {backfill()} existing image documents queued")
+    ctx = multiprocessing.get_context('spawn')
+    procs = [ctx.Process(target=_process_main, args=(poll_seconds,), name=f"image-worker-{i}", daemon=False)
+             for i in range(processes)]
+    for p in procs:
+        p.start()
+    click.echo(f"✅ {processes} image worker(s) started")
+    try:
+        while any(p.is_alive() for p in procs):
+            time.sleep(1)
+    except KeyboardInterrupt:
+        for p in procs:
+            p.terminate()
+    for p in procs:
+        p.join()
@@ -0,0 +1,58 @@
+"""
+Authenticated file downloads handed off to nginx.
+
+Routes check who may see a file and then call send(); the bytes never
+pass through a gunicorn thread when X_ACCEL_REDIRECT is on.  The
+response is then empty apart from
+
+    X-Accel-Redirect: /_protected/<root>/<relative path>
+
+and the Content-Type / Content-Disposition / Cache-Control headers,
+which nginx keeps while serving the file from an `internal` location
+(frontend/nginx.conf).  nginx answers Range, If-Range, If-None-Match and
+If-Modified-Since itself, with an ETag and Last-Modified taken from the
+file, so interrupted downloads resume.
+
+Without nginx (flask run, tests) the same call falls back to send_file,
+which supports the same conditional and Range requests.
+
+Roots are the directories the internal locations alias:
+    uploads       UPLOAD_FOLDER (content-addressed documents + derived/)
+    certificates  CERTIFICATE_OUTPUT_DIR
+"""
+import os
+import mimetypes
+from urllib.parse import quote
+from flask import Response, send_file
+from werkzeug.security import safe_join
+from config import Config
+
+ROOTS = {
+    'uploads': lambda: Config.UPLOAD_FOLDER,
+    'certificates': lambda: Config.CERTIFICATE_OUTPUT_DIR,
+}
+
+
+def send(root, relative, mimetype=None, download_name=None, as_attachment=False, max_age=None):
+    """Response delivering `relative` under `root`, or None when the file does not exist."""
+    path = safe_join(ROOTS[root](), relative)
+    if path is None or not os.path.isfile(path):
+        return None
+
+    if Config.X_ACCEL_REDIRECT:
+        response = Response(mimetype=mimetype or mimetypes.guess_type(download_name or path)[0]
+                            or 'application/octet-stream')
+        if download_name:
+            response.headers.set('Content-Disposition', 'attachment' if as_attachment else 'inline',
+                                 filename=download_name)
+        response.headers['X-Accel-Redirect'] = quote(f"{Config.X_ACCEL_PREFIX}/{root}/{relative.replace(os.sep, '/')}")
+    else:
+        response = send_file(path, mimetype=mimetype, as_attachment=as_attachment,
+                             download_name=download_name, conditional=True)
+
+    response.cache_control.no_cache = None
+    response.cache_control.public = False
+    response.cache_control.private = True
+    if max_age is not None:
+        response.cache_control.max_age = max_age
+    return response
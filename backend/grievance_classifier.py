@@ -0,0 +1,214 @@
+"""
+Keyword classifier for grievances (category + priority).
+
+All category and priority lexicons - English, transliterated and
+Marathi / Hindi in Devanagari - are compiled once at import into a
+single regular expression.  Each script's terms are folded into a
+character trie before being turned into a pattern, so at every position
+the engine walks one trie instead of trying every keyword (the same
+idea as an Aho-Corasick automaton, with the standard library only).
+
+Matches must sit on word boundaries, where a "word" character includes
+the whole Devanagari block (Python's \\b treats vowel signs as
+non-word, which breaks Devanagari words apart):
+
+  * ASCII terms may take a plural 's' / 'es' ("pothole" -> "potholes")
+    but never match inside another word ("clean" is not in "unclean").
+  * Devanagari terms may take one of the Marathi / Hindi endings in
+    SUFFIXES ("गटार" -> "गटारात"); stems that change under inflection
+    are listed separately ("पाणी", "पाण्या").
+  * Terms written with a trailing '*' match any continuation of the
+    word ("भ्रष्ट*").
+
+A category scores one point per distinct term found; the highest score
+wins (ties go to the category listed first), 'Other' when nothing
+matched.  Priority is 'high' when any HIGH_PRIORITY term is present.
+"""
+import re
+import unicodedata
+
+CATEGORIES = {
+    'Water Supply': [
+        'water', 'water supply', 'drinking water', 'pipe', 'pipeline', 'tap', 'leakage', 'leak', 'borewell',
+        'well water', 'village well', 'public well', 'tanker', 'pani', 'paani', 'jal', 'nal',
+        'पाणी', 'पाण्या', 'पाणीपुरवठा', 'नळ', 'जलवाहिनी', 'विहीर', 'टँकर', 'गळती', 'बोअरवेल',
+        'पानी', 'जल', 'नल', 'पाइप', 'पाइपलाइन', 'रिसाव', 'कुआं', 'कुआँ', 'टैंकर',
+    ],
+    'Roads & Infrastructure': [
+        'road', 'pothole', 'bridge', 'street', 'footpath', 'highway', 'rasta', 'sadak', 'pul',
+        'रस्ता', 'रस्त्या', 'रस्ते', 'खड्डा', 'खड्डे', 'पूल', 'डांबरीकरण',
+        'सड़क', 'सडक', 'गड्ढा', 'गड्ढे', 'पुल',
+    ],
+    'Sanitation & Waste': [
+        'garbage', 'waste', 'toilet', 'sewage', 'drainage', 'drain', 'gutter', 'dustbin', 'clean', 'cleaning',
+        'cleanliness', 'sanitation', 'kachra', 'safai',
+        'कचरा', 'कचऱ्या', 'शौचालय', 'गटार', 'सांडपाणी', 'स्वच्छता',
+        'कूड़ा', 'कूडा', 'नाली', 'सीवर', 'सफाई', 'गंदगी',
+    ],
+    'Electricity': [
+        'light', 'street light', 'streetlight', 'electricity', 'electric', 'power', 'power cut', 'transformer',
+        'voltage', 'outage', 'bijli', 'vij',
+        'वीज', 'विजे', 'दिवे', 'पथदिवे', 'ट्रान्सफॉर्मर', 'रोहित्र',
+        'बिजली', 'ट्रांसफार्मर', 'बत्ती',
+    ],
+    'Healthcare': [
+        'hospital', 'doctor', 'health', 'medicine', 'clinic', 'ambulance', 'nurse', 'vaccination', 'phc',
+        'dawakhana',
+        'रुग्णालय', 'दवाखाना', 'डॉक्टर', 'आरोग्य', 'औषध', 'रुग्णवाहिका',
+        'अस्पताल', 'स्वास्थ्य', 'दवा', 'दवाई', 'एम्बुलेंस',
+    ],
+    'Education': [
+        'school', 'teacher', 'education', 'student', 'anganwadi', 'mid day meal', 'shala', 'shikshak',
+        'शाळा', 'शाळे', 'शिक्षक', 'शिक्षण', 'विद्यार्थी', 'अंगणवाडी',
+        'स्कूल', 'विद्यालय', 'शिक्षा', 'छात्र',
+    ],
+    'Land Records': [
+        'land', 'record', 'property', 'survey', 'encroachment', 'mutation', 'jamin', 'zameen', 'satbara',
+        'ferfar',
+        'जमीन', 'जमिनी', 'सातबारा', 'उतारा', 'मालमत्ता', 'फेरफार', 'अतिक्रमण',
+        'ज़मीन', 'भूमि', 'संपत्ति', 'खसरा',
+    ],
+    'Corruption': [
+        'bribe', 'bribery', 'corrupt', 'corruption', 'fraud', 'kickback', 'bhrashtachar', 'lach',
+        'लाच', 'भ्रष्ट*', 'फसवणूक',
+        'रिश्वत', 'घूस', 'धोखाधड़ी',
+    ],
+    'Public Safety': [
+        'crime', 'safety', 'police', 'accident', 'theft', 'harassment', 'chori',
+        'गुन्हा', 'सुरक्षा', 'पोलीस', 'अपघात', 'चोरी',
+        'अपराध', 'पुलिस', 'दुर्घटना',
+    ],
+}
+
+HIGH_PRIORITY = [
+    'urgent', 'urgently', 'emergency', 'death', 'died', 'dead', 'accident', 'serious', 'critical', 'danger',
+    'dangerous', 'immediately', 'injured', 'injury', 'life threatening', 'fire', 'turant',
+    'तातडी*', 'तात्काळ', 'ताबडतोब', 'मृत्यू', 'अपघात', 'गंभीर', 'धोका', 'धोकादायक', 'जखमी', 'आग',
+    'तुरंत', 'आपातकाल', 'आपात', 'मौत', 'मृत्यु', 'दुर्घटना', 'खतरा', 'ख़तरा', 'घायल',
+]
+
+DEFAULT_CATEGORY = 'Other'
+
+# Marathi case endings and Hindi clitics that attach directly to the word
+SUFFIXES = [
+    'चा', 'ची', 'चे', 'च्या', 'ला', 'ना', 'ने', 'नी', 'त', 'ात', 'मध्ये', 'वर', 'साठी', 'ही', 'च',
+    'ों', 'ें', 'ाें', 'ी', 'े',
+]
+
+_WORD = '\\w\u0900-\u097F\u200c\u200d'   # word characters incl. the Devanagari block, ZWNJ/ZWJ
+_DEVANAGARI = re.compile('[\u0900-\u097F]')
+
+
+def _normalize(text):
+    if text.isascii():
+        return text.lower()
+    if not unicodedata.is_normalized('NFC', text):
+        text = unicodedata.normalize('NFC', text)
+    return text.casefold()
+
+
+_TOKEN = re.compile(f'[{_WORD}]+')
+
+
+def tokens(text):
+    """Normalised word tokens of `text` (same folding and word definition as the matcher)."""
+    return _TOKEN.findall(_normalize(text))
+
+
+def _term_key(term):
+    return ' '.join(_normalize(term).split())
+
+
+def _trie_pattern(words):
+    """Regex matching any of `words`, structured as a character trie (longest match preferred)."""
+    if not words:
+        return '(?!)'
+    trie = {}
+    for word in words:
+        node = trie
+        for ch in word:
+            node = node.setdefault(ch, {})
+        node[''] = {}
+
+    def build(node):
+        branches = [(r'\s+' if ch == ' ' else re.escape(ch)) + build(child)
+                    for ch, child in sorted(node.items()) if ch]
+        if not branches:
+            return ''
+        body = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+        return f'(?:{body})?' if '' in node else body
+
+    return build(trie)
+
+
+class GrievanceClassifier:
+    def __init__(self, categories, high_priority, default_category=DEFAULT_CATEGORY):
+        self.categories = list(categories)
+        self.default_category = default_category
+        # (kind, normalised term) -> labels: category names, None for the high-priority list
+        self._labels = {}
+        groups = {'en': set(), 'dev': set(), 'stem': set()}
+
+        for label, terms in list(categories.items()) + [(None, high_priority)]:
+            for term in terms:
+                stem = term.endswith('*')
+                key = _term_key(term.rstrip('*'))
+                kind = 'stem' if stem else ('dev' if _DEVANAGARI.search(key) else 'en')
+                groups[kind].add(key)
+                self._labels.setdefault((kind, key), set()).add(label)
+
+        suffixes = '|'.join(sorted((re.escape(unicodedata.normalize('NFC', s)) for s in SUFFIXES),
+                                   key=len, reverse=True))
+        self.pattern = re.compile(
+            rf'(?<![{_WORD}])(?:'
+            rf'(?P<en>{_trie_pattern(groups["en"])})(?:e?s)?'
+            rf'|(?P<dev>{_trie_pattern(groups["dev"])})(?:{suffixes})?'
+            rf'|(?P<stem>{_trie_pattern(groups["stem"])})[{_WORD}]*'
+            rf')(?![{_WORD}])'
+        )
+
+    def matches(self, text):
+        """Distinct (kind, term) keys found in `text`."""
+        found = set()
+        for m in self.pattern.finditer(_normalize(text)):
+            kind = m.lastgroup
+            found.add((kind, ' '.join(m.group(kind).split())))
+        return found
+
+    def scores(self, text):
+        scores = dict.fromkeys(self.categories, 0)
+        high = False
+        for key in self.matches(text):
+            for label in self._labels[key]:
+                if label is None:
+                    high = True
+                else:
+                    scores[label] += 1
+        return scores, high
+
+    def classify_text(self, text):
+        scores, high = self.scores(text)
+        best = max(scores, key=scores.get) if scores else None
+        return {
+            'category': best if best is not None and scores[best] > 0 else self.default_category,
+            'priority': 'high' if high else 'normal'
+        }
+
+    def classify(self, subject, description=''):
+        return self.classify_text(f"{subject or ''} {description or ''}")
+
+    def classify_batch(self, items):
+        """Classify an iterable of (subject, description) pairs; returns a list of results in order."""
+        classify_text = self.classify_text
+        return [classify_text(f"{subject or ''} {description or ''}") for subject, description in items]
+
+
+classifier = GrievanceClassifier(CATEGORIES, HIGH_PRIORITY)
+
+
+def classify(subject, description=''):
+    return classifier.classify(subject, description)
+
+
+def classify_batch(items):
+    return classifier.classify_batch(items)
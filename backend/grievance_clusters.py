@@ -0,0 +1,212 @@
+"""
+Near-duplicate grievance clustering (MinHash + LSH).
+
+Each grievance's subject + description is reduced to its set of word
+tokens (stop-words dropped) and summarised by a CLUSTER_NUM_PERM-value
+MinHash signature computed with NumPy.  The signature is cut into
+CLUSTER_BANDS bands; each band is hashed to a bucket and stored in
+grievance_lsh_buckets.  At submit time the new grievance only looks at
+grievances sharing at least one bucket within the last
+CLUSTER_WINDOW_DAYS (one indexed query, independent of table size),
+estimates Jaccard similarity from the signatures and joins the cluster of
+the most similar one if it reaches CLUSTER_THRESHOLD.  Clusters are
+created lazily when a second grievance matches, so one-off complaints
+never get a cluster row.
+
+apply_update() moves every grievance of a cluster to a new status with
+one conditional UPDATE per current status and one executemany INSERT of
+GrievanceUpdate rows.  Buckets older than the window are never read again;
+`flask index-grievance-clusters` deletes them.
+"""
+import hashlib
+from datetime import datetime, timedelta
+import click
+import numpy as np
+from flask.cli import with_appcontext
+from sqlalchemy import tuple_, update, insert
+from extensions import db
+from models import Grievance, GrievanceCluster, GrievanceSignature, GrievanceLSHBucket, GrievanceUpdate, generate_uuid
+from config import Config
+import grievance_classifier
+import stats
+
+STOPWORDS = frozenset('''
+a an the and or of to in on at for from by with is are was were be been it this that there these those
+i we you he she they my our your their me us please sir madam kindly since no not has have had do does
+did will shall can very also near our area
+आहे आहेत नाही व आणि या ते हे की का ला ने त मध्ये वर साठी आमच्या आमचे कृपया
+है हैं नहीं और या के की का को में पर से भी कृपया हमारे हमारी
+'''.split())
+
+_PRIME = (1 << 31) - 1
+_rng = np.random.RandomState(20240131)
+_A = _rng.randint(1, _PRIME, size=Config.CLUSTER_NUM_PERM, dtype=np.int64)
+_B = _rng.randint(0, _PRIME, size=Config.CLUSTER_NUM_PERM, dtype=np.int64)
+_ROWS = Config.CLUSTER_NUM_PERM // Config.CLUSTER_BANDS
+
+OPEN_STATUSES = ('open', 'in_progress', 'escalated')
+
+
+def shingles(text):
+    return {t for t in grievance_classifier.tokens(text) if len(t) > 1 and t not in STOPWORDS}
+
+
+def signature(text):
+    """MinHash signature (uint32 array) of `text`, or None if it has no usable tokens."""
+    tokens = shingles(text)
+    if not tokens:
+        return None
+    hashes = np.fromiter(
+        (int.from_bytes(hashlib.blake2b(t.encode(), digest_size=4).digest(), 'little') for t in tokens),
+        dtype=np.int64, count=len(tokens)
+    ) % _PRIME
+    return ((np.outer(hashes, _A) + _B) % _PRIME).min(axis=0).astype('<u4')
+
+
+def band_buckets(sig):
+    """[(band, bucket)] for a signature; bucket is a signed 64-bit hash of the band's values."""
+    raw = sig.tobytes()
+    width = _ROWS * 4
+    return [
+        (band, int.from_bytes(hashlib.blake2b(raw[band * width:(band + 1) * width], digest_size=8).digest(),
+                              'little', signed=True))
+        for band in range(Config.CLUSTER_BANDS)
+    ]
+
+
+def similarity(sig_a, sig_b):
+    return float(np.count_nonzero(sig_a == sig_b)) / len(sig_a)
+
+
+def _candidates(buckets, since, exclude_id):
+    return db.session.query(
+        GrievanceSignature.grievance_id, GrievanceSignature.signature, Grievance.cluster_id, Grievance.subject
+    ).join(GrievanceLSHBucket, GrievanceLSHBucket.grievance_id == GrievanceSignature.grievance_id)\
+     .join(Grievance, Grievance.id == GrievanceSignature.grievance_id)\
+     .filter(tuple_(GrievanceLSHBucket.band, GrievanceLSHBucket.bucket).in_(buckets),
+             GrievanceLSHBucket.created_at >= since,
+             GrievanceSignature.grievance_id != exclude_id)\
+     .distinct().limit(Config.CLUSTER_MAX_CANDIDATES).all()
+
+
+def assign(grievance, now=None):
+    """
+    Index `grievance` (already added to the session, id assigned) and put
+    it in a cluster if a near-duplicate exists.  Returns the cluster id or
+    None.  Does not commit.
+    """
+    now = now or datetime.utcnow()
+    if grievance.id is None:
+        grievance.id = generate_uuid()
+    sig = signature(f"{grievance.subject} {grievance.description}")
+    if sig is None:
+        # nothing to compare; an empty signature marks the row as indexed
+        db.session.add(GrievanceSignature(grievance_id=grievance.id, signature=b'', created_at=now))
+        return None
+    buckets = band_buckets(sig)
+
+    best, best_sim = None, 0.0
+    for cand in _candidates(buckets, now - timedelta(days=Config.CLUSTER_WINDOW_DAYS), grievance.id):
+        sim = similarity(sig, np.frombuffer(cand.signature, dtype='<u4'))
+        if sim > best_sim:
+            best, best_sim = cand, sim
+
+    db.session.add(GrievanceSignature(grievance_id=grievance.id, signature=sig.tobytes(), created_at=now))
+    db.session.execute(insert(GrievanceLSHBucket.__table__), [
+        {'band': band, 'bucket': bucket, 'grievance_id': grievance.id, 'created_at': now}
+        for band, bucket in buckets
+    ])
+
+    if best is None or best_sim < Config.CLUSTER_THRESHOLD:
+        return None
+    # Lock the match and re-read its cluster: of two submits matching the same
+    # unclustered grievance, the second waits here and joins the first's cluster
+    best_cluster = db.session.query(Grievance.cluster_id).filter(Grievance.id == best.grievance_id)\
+        .with_for_update().scalar()
+    if best_cluster is None:
+        best_cluster = generate_uuid()
+        db.session.add(GrievanceCluster(id=best_cluster, category=grievance.category, subject=best.subject,
+                                        first_grievance_id=best.grievance_id, size=1, first_seen=now, last_seen=now))
+        db.session.flush()
+        db.session.execute(update(Grievance).where(Grievance.id == best.grievance_id).values(cluster_id=best_cluster)
+                           .execution_options(synchronize_session=False))
+    db.session.execute(update(GrievanceCluster).where(GrievanceCluster.id == best_cluster)
+                       .values(size=GrievanceCluster.size + 1, last_seen=now))
+    grievance.cluster_id = best_cluster
+    return best_cluster
+
+
+def apply_update(cluster_id, admin_id, status=None, update_text='', escalate=False, only_open=True):
+    """
+    Apply one status change to every grievance in a cluster with one
+    conditional UPDATE per current status plus a bulk insert of
+    GrievanceUpdate rows, and adjust the dashboard counters.  Each UPDATE
+    only matches rows still in that status and returns their ids, so a
+    concurrent update of the same cluster cannot make a grievance count
+    twice.  Returns the number of grievances updated.  Commits.
+    """
+    now = datetime.utcnow()
+    new_status = 'escalated' if escalate else status
+    query = db.session.query(Grievance.status).filter(Grievance.cluster_id == cluster_id).distinct()
+    if only_open:
+        query = query.filter(Grievance.status.in_(OPEN_STATUSES))
+    old_statuses = [row.status for row in query.all()]
+
+    values = {'status': new_status, 'assigned_to': admin_id, 'updated_at': now}
+    if escalate:
+        values['escalation_level'] = Grievance.escalation_level + 1
+    if new_status == 'resolved':
+        values['resolved_at'] = now
+    ids = []
+    for old_status in old_statuses:
+        moved = db.session.execute(
+            update(Grievance).where(Grievance.cluster_id == cluster_id, Grievance.status == old_status)
+            .values(**values).returning(Grievance.id).execution_options(synchronize_session=False)
+        ).scalars().all()
+        stats.record_transition('grievances', old_status, new_status, rows=len(moved))
+        ids += moved
+    if not ids:
+        db.session.rollback()
+        return 0
+
+    db.session.execute(insert(GrievanceUpdate.__table__), [
+        {'id': generate_uuid(), 'grievance_id': gid, 'updated_by': admin_id, 'update_text': update_text,
+         'status': new_status, 'created_at': now}
+        for gid in ids
+    ])
+    db.session.commit()
+    return len(ids)
+
+
+def prune_buckets(before):
+    """Delete LSH bucket rows older than `before`; _candidates() never looks at them.  Commits."""
+    removed = GrievanceLSHBucket.query.filter(GrievanceLSHBucket.created_at < before)\
+        .delete(synchronize_session=False)
+    db.session.commit()
+    return removed
+
+
+@click.command('index-grievance-clusters')
+@click.option('--days', type=int, default=None, help='Index grievances from the last N days (CLUSTER_WINDOW_DAYS).')
+@click.option('--prune/--no-prune', default=True, show_default=True,
+              help='Delete LSH buckets older than CLUSTER_WINDOW_DAYS.')
+@with_appcontext
+def index_grievance_clusters_command(days, prune):
+    """Sign and cluster recent grievances that have no MinHash signature yet, then prune old buckets."""
+    since = datetime.utcnow() - timedelta(days=days or Config.CLUSTER_WINDOW_DAYS)
+    indexed = clustered = 0
+    while True:
+        batch = Grievance.query.outerjoin(GrievanceSignature, GrievanceSignature.grievance_id == Grievance.id)\
+            .filter(GrievanceSignature.grievance_id.is_(None), Grievance.submitted_at >= since)\
+            .order_by(Grievance.submitted_at, Grievance.id).limit(500).all()
+        if not batch:
+            break
+        for grievance in batch:
+            if assign(grievance, now=grievance.submitted_at) is not None:
+                clustered += 1
+            indexed += 1
+        db.session.commit()
+    click.echo(f"✅ {indexed} grievances indexed, {clustered} joined a cluster")
+    if prune:
+        removed = prune_buckets(datetime.utcnow() - timedelta(days=Config.CLUSTER_WINDOW_DAYS))
+        click.echo(f"✅ {removed} LSH bucket rows older than {Config.CLUSTER_WINDOW_DAYS} days removed")
@@ -0,0 +1,258 @@
+"""
+Re-classify existing grievances with the current lexicon.
+
+Grievances are read in primary-key order in chunks of
+RECLASSIFY_CHUNK_SIZE using keyset pagination (WHERE id > :last ORDER BY
+id LIMIT n), so no transaction stays open between chunks.  Chunks are
+classified on a spawn process pool (RECLASSIFY_PROCESSES) with up to two
+chunks per process in flight while the next ones are read.  Changed rows
+are written back with one executemany UPDATE per chunk.  The checkpoint
+row (job_checkpoints) is updated in the same transaction, so an
+interrupted run resumes after the last committed chunk.
+
+Checkpoints are keyed by a hash of the lexicon: editing
+grievance_classifier starts a fresh pass, re-running with an unchanged
+lexicon is a no-op unless restarted.  `category` is only rewritten where
+it still equals the old ai_category, so manual re-categorisation is kept.
+
+    flask --app app:create_app reclassify-grievances --dry-run
+    flask --app app:create_app reclassify-grievances [--restart]
+"""
+import json
+import hashlib
+import threading
+import multiprocessing
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import update, text
+from extensions import db
+from models import Grievance, JobCheckpoint
+from config import Config
+import grievance_classifier
+
+_ADVISORY_LOCK_ID = 74210312
+_run_lock = threading.Lock()
+
+
+def lexicon_version():
+    raw = json.dumps([grievance_classifier.CATEGORIES, grievance_classifier.HIGH_PRIORITY,
+                      grievance_classifier.SUFFIXES], ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(raw.encode()).hexdigest()[:12]
+
+
+def checkpoint_name():
+    return f"reclassify-grievances:{lexicon_version()}"
+
+
+def _classify_chunk(rows):
+    """Runs in a pool process: [(id, subject, description)] -> [(id, category, priority)]."""
+    results = grievance_classifier.classify_batch((subject, description) for _, subject, description in rows)
+    return [(row[0], r['category'], r['priority']) for row, r in zip(rows, results)]
+
+
+def _read_chunks(after_id, chunk_size, limit=None):
+    last, read = after_id, 0
+    while limit is None or read < limit:
+        query = db.session.query(
+            Grievance.id, Grievance.grievance_number, Grievance.subject, Grievance.description,
+            Grievance.ai_category, Grievance.ai_priority, Grievance.category
+        ).order_by(Grievance.id)
+        if last is not None:
+            query = query.filter(Grievance.id > last)
+        size = chunk_size if limit is None else min(chunk_size, limit - read)
+        rows = query.limit(size).all()
+        if not rows:
+            return
+        last, read = rows[-1].id, read + len(rows)
+        yield rows
+
+
+def _changes(rows, results):
+    current = {r.id: r for r in rows}
+    for gid, category, priority in results:
+        row = current[gid]
+        if (row.ai_category, row.ai_priority) != (category, priority):
+            yield row, category, priority
+
+
+def _write(changes):
+    now = datetime.utcnow()
+    with_category, without_category = [], []
+    for row, category, priority in changes:
+        params = {'id': row.id, 'ai_category': category, 'ai_priority': priority, 'updated_at': now}
+        if row.category == row.ai_category:
+            params['category'] = category
+            with_category.append(params)
+        else:
+            without_category.append(params)
+    for batch in (with_category, without_category):
+        if batch:
+            db.session.execute(update(Grievance), batch)
+
+
+def reclassify(dry_run=False, restart=False, limit=None, chunk_size=None, processes=None, show=100, echo=None):
+    """
+    Run (or resume) a re-classification pass.  Returns a summary dict;
+    with dry_run nothing is written and up to `show` example changes are
+    included.  Returns None if another process is already running one.
+    """
+    chunk_size = chunk_size or Config.RECLASSIFY_CHUNK_SIZE
+    processes = Config.RECLASSIFY_PROCESSES if processes is None else processes
+    if not _run_lock.acquire(blocking=False):
+        return None
+    lock_conn = None
+    try:
+        if not dry_run and db.engine.dialect.name == 'postgresql':
+            conn = db.engine.connect()
+            if not conn.execute(text('SELECT pg_try_advisory_lock(:id)'), {'id': _ADVISORY_LOCK_ID}).scalar():
+                conn.close()
+                return None
+            lock_conn = conn
+
+        checkpoint = None
+        if not dry_run:
+            checkpoint = db.session.get(JobCheckpoint, checkpoint_name())
+            if checkpoint is None:
+                checkpoint = JobCheckpoint(name=checkpoint_name(), processed=0, changed=0)
+                db.session.add(checkpoint)
+            elif restart:
+                checkpoint.position, checkpoint.processed, checkpoint.changed = None, 0, 0
+                checkpoint.started_at, checkpoint.finished_at = datetime.utcnow(), None
+            elif checkpoint.finished_at is not None:
+                return {'lexicon_version': lexicon_version(), 'dry_run': False, 'already_done': True,
+                        'checkpoint': checkpoint.to_dict()}
+            db.session.commit()
+
+        summary = {'lexicon_version': lexicon_version(), 'dry_run': dry_run,
+                   'resumed_from': checkpoint.position if checkpoint is not None else None,
+                   'processed': 0, 'changed': 0}
+        transitions = Counter()
+        examples = []
+
+        executor = None
+        if processes > 1:
+            executor = ProcessPoolExecutor(max_workers=processes, mp_context=multiprocessing.get_context('spawn'))
+        pending = deque()
+        chunks = _read_chunks(checkpoint.position if checkpoint is not None else None, chunk_size, limit)
+
+        def submit(rows):
+            data = [(r.id, r.subject or '', r.description or '') for r in rows]
+            pending.append((rows, executor.submit(_classify_chunk, data) if executor else _classify_chunk(data)))
+
+        try:
+            for rows in chunks:
+                submit(rows)
+                if len(pending) >= max(processes, 1) * 2:
+                    break
+            while pending:
+                rows, result = pending.popleft()
+                results = result.result() if executor else result
+                changes = list(_changes(rows, results))
+
+                for row, category, priority in changes:
+                    transitions[f"{row.ai_category or 'None'} -> {category}"] += 1
+                    if dry_run and len(examples) < show:
+                        examples.append({
+                            'grievance_number': row.grievance_number,
+                            'ai_category': [row.ai_category, category],
+                            'ai_priority': [row.ai_priority, priority]
+                        })
+                if not dry_run:
+                    _write(changes)
+                    checkpoint.position = rows[-1].id
+                    checkpoint.processed += len(rows)
+                    checkpoint.changed += len(changes)
+                    db.session.commit()
+                summary['processed'] += len(rows)
+                summary['changed'] += len(changes)
+                if echo:
+                    echo(summary['processed'], summary['changed'])
+
+                next_rows = next(chunks, None)
+                if next_rows is not None:
+                    submit(next_rows)
+        finally:
+            if executor is not None:
+                executor.shutdown(cancel_futures=True)
+
+        if checkpoint is not None:
+            if limit is None or summary['processed'] < limit:
+                checkpoint.finished_at = datetime.utcnow()
+                db.session.commit()
+            summary['checkpoint'] = checkpoint.to_dict()
+        summary['transitions'] = dict(transitions.most_common())
+        if dry_run:
+            summary['examples'] = examples
+        return summary
+    except Exception:
+        db.session.rollback()
+        raise
+    finally:
+        if lock_conn is not None:
+            _release_advisory_lock(lock_conn)
+        _run_lock.release()
+
+
+def _release_advisory_lock(conn):
+    # A session-level advisory lock survives rollback and close(): the
+    # connection would go back to the pool still holding it
+    try:
+        conn.execute(text('SELECT pg_advisory_unlock(:id)'), {'id': _ADVISORY_LOCK_ID})
+        conn.commit()
+        conn.close()
+    except Exception:
+        conn.invalidate()       # closing the DBAPI connection ends the session and its locks
+
+
+def is_running():
+    return _run_lock.locked()
+
+
+def start_background(app):
+    """Run a full pass in a daemon thread.  False if one is already running in this process."""
+    if is_running():
+        return False
+
+    def run():
+        with app.app_context():
+            try:
+                reclassify()
+            except Exception as e:
+                print(f"Grievance re-classification failed: {e}")
+            finally:
+                db.session.remove()
+
+    threading.Thread(target=run, name='reclassify-grievances', daemon=True).start()
+    return True
+
+
+@click.command('reclassify-grievances')
+@click.option('--dry-run', is_flag=True, help='Show what would change without writing.')
+@click.option('--restart', is_flag=True, help='Ignore the checkpoint and start from the first grievance.')
+@click.option('--limit', type=int, default=None, help='Stop after this many grievances.')
+@click.option('--chunk-size', type=int, default=None, help='Grievances per chunk (RECLASSIFY_CHUNK_SIZE).')
+@click.option('--processes', type=int, default=None, help='Classifier processes (RECLASSIFY_PROCESSES).')
+@click.option('--show', type=int, default=20, help='Example changes to print with --dry-run.')
+@with_appcontext
+def reclassify_grievances_command(dry_run, restart, limit, chunk_size, processes, show):
+    """Re-run the grievance classifier over stored grievances."""
+    summary = reclassify(dry_run=dry_run, restart=restart, limit=limit, chunk_size=chunk_size,
+                         processes=processes, show=show,
+                         echo=lambda done, changed: click.echo(f"  {done} processed, {changed} changed"))
+    if summary is None:
+        click.echo('A re-classification pass is already running; skipped.')
+        return
+    if summary.get('already_done'):
+        click.echo(f"Lexicon {summary['lexicon_version']} already applied; use --restart to run again.")
+        return
+    for example in summary.get('examples', []):
+        click.echo(f"{example['grievance_number']}: "
+                   f"{example['ai_category'][0]}/{example['ai_priority'][0]} -> "
+                   f"{example['ai_category'][1]}/{example['ai_priority'][1]}")
+    for transition, n in summary['transitions'].items():
+        click.echo(f"{transition:50s} {n}")
+    verb = 'would change' if dry_run else 'changed'
+    click.echo(f"✅ {summary['processed']} grievances processed, {summary['changed']} {verb}")
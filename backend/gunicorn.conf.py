@@ -0,0 +1,11 @@
+# gunicorn reads this file from the working directory (/app in the container).
+import os
+
+bind = '0.0.0.0:5000'
+workers = int(os.environ.get('GUNICORN_WORKERS', '2'))
+# Threaded workers: every open /api/chatbot/stream holds a thread for the whole
+# answer, which would pin a sync worker.  Streams wait on Cohere, not the CPU.
+worker_class = 'gthread'
+threads = int(os.environ.get('GUNICORN_THREADS', '32'))
+timeout = 60
+keepalive = 5
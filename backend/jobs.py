@@ -0,0 +1,209 @@
+"""
+Persistent background queue for certificate PDF rendering.
+
+request_certificate only allocates the certificate row and a
+certificate_jobs row, then returns 202.  Workers claim queued jobs with an
+atomic UPDATE (FOR UPDATE SKIP LOCKED on Postgres), render the PDF outside
+of any DB transaction and record the result.  Failed renders are retried
+with exponential backoff up to max_attempts; jobs whose worker died are
+reclaimed after CERTIFICATE_JOB_LOCK_TIMEOUT_SECONDS.
+
+Workers run either as threads inside the API process (started on first
+enqueue, CERTIFICATE_WORKER_THREADS) or as a dedicated process pool:
+
+    flask --app app:create_app cert-worker --processes 4
+"""
+import os
+import socket
+import threading
+import time
+import traceback
+import multiprocessing
+from datetime import datetime, timedelta
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from sqlalchemy import or_, and_
+from extensions import db
+from models import CertificateJob, Certificate, ServiceRequest, User
+from config import Config
+import stats
+
+_wakeup = threading.Event()
+_threads_lock = threading.Lock()
+_threads = []
+
+
+def worker_name():
+    return f"{socket.gethostname()}:{os.getpid()}:{threading.get_ident()}"
+
+
+def enqueue_certificate(cert):
+    """Create a queued job for `cert` in the current transaction (caller commits)."""
+    job = CertificateJob(certificate_id=cert.id, status='queued',
+                         max_attempts=Config.CERTIFICATE_JOB_MAX_ATTEMPTS,
+                         run_after=datetime.utcnow())
+    db.session.add(job)
+    return job
+
+
+def active_job_for(cert_id):
+    return CertificateJob.query.filter(
+        CertificateJob.certificate_id == cert_id,
+        CertificateJob.status.in_(['queued', 'running'])
+    ).first()
+
+
+def claim_next(worker=None, model=CertificateJob, lock_timeout=None):
+    """Atomically move the next runnable job to 'running' and return it, or None.
+
+    `model` may be any job table with the certificate_jobs columns
+    (status, run_after, attempts, locked_by, locked_at), e.g. DocumentJob.
+    """
+    worker = worker or worker_name()
+    now = datetime.utcnow()
+    stale = now - timedelta(seconds=lock_timeout or Config.CERTIFICATE_JOB_LOCK_TIMEOUT_SECONDS)
+    runnable = or_(
+        and_(model.status == 'queued', model.run_after <= now),
+        and_(model.status == 'running', model.locked_at < stale)
+    )
+
+    query = db.session.query(model.id).filter(runnable).order_by(model.run_after)
+    if db.session.get_bind().dialect.name == 'postgresql':
+        query = query.with_for_update(skip_locked=True)
+    candidate = query.limit(1).scalar()
+    if candidate is None:
+        db.session.rollback()
+        return None
+
+    claimed = model.query.filter(model.id == candidate, runnable).update(
+        {'status': 'running', 'locked_by': worker[:100], 'locked_at': now,
+         'attempts': model.attempts + 1},
+        synchronize_session=False
+    )
+    db.session.commit()
+    if not claimed:
+        return None
+    return db.session.get(model, candidate)
+
+
+def backoff(attempts, base_seconds=None):
+    base_seconds = base_seconds or Config.CERTIFICATE_JOB_BACKOFF_SECONDS
+    return timedelta(seconds=base_seconds * 2 ** max(attempts - 1, 0))
+
+
+def run_job(job):
+    """Render the certificate for a claimed job and record success or failure."""
+    from certificate_pdf import generate_certificate_pdf
+
+    job_id = job.id
+    try:
+        cert = db.session.get(Certificate, job.certificate_id)
+        service_req = db.session.get(ServiceRequest, cert.request_id)
+        user = db.session.get(User, cert.user_id)
+        # Detach the loaded rows so no transaction stays open while rendering
+        db.session.close()
+
+        pdf_filename = generate_certificate_pdf(cert, user, service_req)
+    except Exception as e:
+        db.session.rollback()
+        job = db.session.get(CertificateJob, job_id)
+        job.last_error = f"{type(e).__name__}: {e}"[:2000]
+        job.locked_by = None
+        job.locked_at = None
+        if job.attempts >= job.max_attempts:
+            job.status = 'failed'
+            job.finished_at = datetime.utcnow()
+        else:
+            job.status = 'queued'
+            job.run_after = datetime.utcnow() + backoff(job.attempts)
+        db.session.commit()
+        print(f"Certificate job {job_id} failed (attempt {job.attempts}): {e}")
+        traceback.print_exc()
+        return False
+
+    job = db.session.get(CertificateJob, job_id)
+    cert = db.session.get(Certificate, job.certificate_id)
+    service_req = db.session.get(ServiceRequest, cert.request_id)
+    cert.pdf_path = pdf_filename
+    if service_req.status != 'completed':
+        stats.record_transition('service_requests', service_req.status, 'completed')
+        service_req.status = 'completed'
+        service_req.resolved_at = datetime.utcnow()
+    job.status = 'done'
+    job.last_error = None
+    job.finished_at = datetime.utcnow()
+    db.session.commit()
+    return True
+
+
+def run_pending(max_jobs=None, worker=None):
+    """Process runnable jobs until the queue is empty; returns the number processed."""
+    done = 0
+    while max_jobs is None or done < max_jobs:
+        job = claim_next(worker)
+        if job is None:
+            break
+        run_job(job)
+        done += 1
+    return done
+
+
+def _work_loop(app, poll_seconds, stop=None):
+    with app.app_context():
+        while stop is None or not stop.is_set():
+            try:
+                processed = run_pending()
+            except Exception as e:
+                print(f"Certificate worker error: {e}")
+                db.session.rollback()
+                processed = 0
+            finally:
+                db.session.remove()
+            if not processed:
+                _wakeup.wait(poll_seconds)
+                _wakeup.clear()
+
+
+def ensure_inprocess_workers():
+    """Start CERTIFICATE_WORKER_THREADS daemon threads in this process (once) and wake them."""
+    count = Config.CERTIFICATE_WORKER_THREADS
+    if count > 0:
+        with _threads_lock:
+            _threads[:] = [t for t in _threads if t.is_alive()]
+            app = current_app._get_current_object()
+            while len(_threads) < count:
+                t = threading.Thread(target=_work_loop, args=(app, Config.CERTIFICATE_JOB_POLL_SECONDS),
+                                     name=f"cert-worker-{len(_threads)}", daemon=True)
+                t.start()
+                _threads.append(t)
+    _wakeup.set()
+
+
+def _process_main(poll_seconds):
+    from app import create_app
+    app = create_app()
+    _work_loop(app, poll_seconds)
+
+
+@click.command('cert-worker')
+@click.option('--processes', default=os.cpu_count() or 1, show_default=True, help='Worker processes to run.')
+@click.option('--poll', 'poll_seconds', default=Config.CERTIFICATE_JOB_POLL_SECONDS, show_default=True,
+              help='Seconds to sleep when the queue is empty.')
+@with_appcontext
+def cert_worker_command(processes, poll_seconds):
+    """Run a pool of certificate rendering workers."""
+    ctx = multiprocessing.get_context('spawn')
+    procs = [ctx.Process(target=_process_main, args=(poll_seconds,), name=f"cert-worker-{i}", daemon=False)
+             for i in range(processes)]
+    for p in procs:
+        p.start()
+    click.echo(f"✅ {processes} certificate worker(s) started")
+    try:
+        while any(p.is_alive() for p in procs):
+            time.sleep(1)
+    except KeyboardInterrupt:
+        for p in procs:
+            p.terminate()
+    for p in procs:
+        p.join()
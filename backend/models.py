@@ -1,13 +1,51 @@
-from datetime import datetime
+import os
+import time
 import uuid
+from datetime import datetime
 from extensions import db
 
+
+def uuid7():
+    """RFC 9562 version 7 UUID: 48-bit Unix milliseconds, then random bits.
+
+    Keys made later sort later, so inserts append to the right edge of the
+    primary-key and foreign-key B-trees instead of splitting random pages.
+    """
+    value = int.from_bytes((time.time_ns() // 1_000_000).to_bytes(6, 'big') + os.urandom(10), 'big')
+    value = value & ~(0xF << 76) | 0x7 << 76     # version 7
+    value = value & ~(0x3 << 62) | 0x2 << 62     # RFC 4122 variant
+    return uuid.UUID(int=value)
+
+
 def generate_uuid():
-    return str(uuid.uuid4())
+    return str(uuid7())
+
+
+class UUIDKey(db.TypeDecorator):
+    """
+    Primary / foreign keys: native UUID (16 bytes) on PostgreSQL, CHAR(32)
+    elsewhere.  Python code keeps seeing hyphenated strings.  A value that
+    is not a UUID (a mistyped id in a URL) binds as NULL, so lookups find
+    nothing instead of PostgreSQL rejecting the statement.
+    """
+    impl = db.Uuid(as_uuid=False)
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        if value is None or isinstance(value, uuid.UUID):
+            return value and str(value)
+        try:
+            return str(uuid.UUID(value))
+        except (TypeError, ValueError, AttributeError):
+            return None
+
 
 class User(db.Model):
     __tablename__ = 'users'
-    id = db.Column(db.String(36), primary_key=True, default=generate_uuid)
+    __table_args__ = (
+        db.Index('idx_users_created_id', 'created_at', 'id'),
+    )
+    id = db.Column(UUIDKey, primary_key=True, default=generate_uuid)
     full_name = db.Column(db.String(150), nullable=False)
     mobile = db.Column(db.String(15), unique=True, nullable=False)
     email = db.Column(db.String(150), unique=True)
@@ -40,7 +78,7 @@ class User(db.Model):
 
 class OTPLog(db.Model):
     __tablename__ = 'otp_logs'
-    id = db.Column(db.String(36), primary_key=True, default=generate_uuid)
+    id = db.Column(UUIDKey, primary_key=True, default=generate_uuid)
     mobile = db.Column(db.String(15), nullable=False)
     otp_code = db.Column(db.String(6), nullable=False)
     purpose = db.Column(db.String(50), default='login')
@@ -49,9 +87,21 @@ class OTPLog(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
 
+class OTPCode(db.Model):
+    """The live OTP of each mobile for the database:// OTP store (see otp_store.py)."""
+    __tablename__ = 'otp_codes'
+    __table_args__ = (
+        db.Index('idx_otp_codes_expires', 'expires_at'),
+    )
+    mobile = db.Column(db.String(15), primary_key=True)
+    code_hash = db.Column(db.String(64), nullable=False)    # sha256 of mobile:code
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    expires_at = db.Column(db.DateTime, nullable=False)
+
+
 class Admin(db.Model):
     __tablename__ = 'admins'
-    id = db.Column(db.String(36), primary_key=True, default=generate_uuid)
+    id = db.Column(UUIDKey, primary_key=True, default=generate_uuid)
     username = db.Column(db.String(100), unique=True, nullable=False)
     email = db.Column(db.String(150), unique=True, nullable=False)
     password_hash = db.Column(db.Text, nullable=False)
@@ -107,15 +157,22 @@ class ServiceCategory(db.Model):
 
 class ServiceRequest(db.Model):
     __tablename__ = 'service_requests'
-    id = db.Column(db.String(36), primary_key=True, default=generate_uuid)
-    user_id = db.Column(db.String(36), db.ForeignKey('users.id'), nullable=False)
+    __table_args__ = (
+        # keyset pagination seeks on (submitted_at, id), see pagination.py
+        db.Index('idx_service_requests_submitted_id', 'submitted_at', 'id'),
+        db.Index('idx_service_requests_user_submitted_id', 'user_id', 'submitted_at', 'id'),
+        db.Index('idx_service_requests_status_submitted_id', 'status', 'submitted_at', 'id'),
+        db.Index('idx_service_requests_updated', 'updated_at'),
+    )
+    id = db.Column(UUIDKey, primary_key=True, default=generate_uuid)
+    user_id = db.Column(UUIDKey, db.ForeignKey('users.id'), nullable=False)
     category_id = db.Column(db.Integer, db.ForeignKey('service_categories.id'))
     request_number = db.Column(db.String(30), unique=True, nullable=False)
     status = db.Column(db.String(30), default='pending')
     priority = db.Column(db.String(20), default='normal')
     description = db.Column(db.Text)
     remarks = db.Column(db.Text)
-    assigned_to = db.Column(db.String(36), db.ForeignKey('admins.id'))
+    assigned_to = db.Column(UUIDKey, db.ForeignKey('admins.id'))
     submitted_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     resolved_at = db.Column(db.DateTime)
@@ -140,13 +197,21 @@ class ServiceRequest(db.Model):
 
 class Document(db.Model):
     __tablename__ = 'documents'
-    id = db.Column(db.String(36), primary_key=True, default=generate_uuid)
-    request_id = db.Column(db.String(36), db.ForeignKey('service_requests.id'))
-    user_id = db.Column(db.String(36), db.ForeignKey('users.id'))
+    __table_args__ = (
+        db.Index('idx_documents_sha256', 'sha256'),
+    )
+    id = db.Column(UUIDKey, primary_key=True, default=generate_uuid)
+    request_id = db.Column(UUIDKey, db.ForeignKey('service_requests.id'))
+    user_id = db.Column(UUIDKey, db.ForeignKey('users.id'))
     file_name = db.Column(db.String(255))
     file_path = db.Column(db.Text)
     file_type = db.Column(db.String(50))
     file_size = db.Column(db.Integer)
+    sha256 = db.Column(db.String(64))     # content hash; file_path is then ab/cd/<sha256>
+    # Set by the image workers (document_images.py); preview_size stays NULL
+    # when the original was already smaller than a recompressed copy
+    preview_size = db.Column(db.Integer)
+    thumbnail_size = db.Column(db.Integer)
     uploaded_at = db.Column(db.DateTime, default=datetime.utcnow)
 
     def to_dict(self):
@@ -155,14 +220,72 @@ class Document(db.Model):
             'file_name': self.file_name,
             'file_type': self.file_type,
             'file_size': self.file_size,
+            'sha256': self.sha256 or None,
+            'preview_size': self.preview_size,
+            'thumbnail_size': self.thumbnail_size,
             'uploaded_at': self.uploaded_at.isoformat()
         }
 
 
+class DocumentJob(db.Model):
+    __tablename__ = 'document_jobs'
+    __table_args__ = (
+        db.Index('idx_document_jobs_claim', 'status', 'run_after'),
+    )
+    id = db.Column(UUIDKey, primary_key=True, default=generate_uuid)
+    document_id = db.Column(UUIDKey, db.ForeignKey('documents.id', ondelete='CASCADE'), nullable=False)
+    status = db.Column(db.String(20), default='queued')   # queued / running / done / failed
+    attempts = db.Column(db.Integer, default=0)
+    max_attempts = db.Column(db.Integer, default=3)
+    last_error = db.Column(db.Text)
+    run_after = db.Column(db.DateTime, default=datetime.utcnow)
+    locked_by = db.Column(db.String(100))
+    locked_at = db.Column(db.DateTime)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    finished_at = db.Column(db.DateTime)
+
+
+class UploadSession(db.Model):
+    __tablename__ = 'upload_sessions'
+    __table_args__ = (
+        db.Index('idx_upload_sessions_expires', 'expires_at'),
+    )
+    id = db.Column(UUIDKey, primary_key=True, default=generate_uuid)
+    request_id = db.Column(UUIDKey, db.ForeignKey('service_requests.id'), nullable=False)
+    user_id = db.Column(UUIDKey, db.ForeignKey('users.id'), nullable=False)
+    file_name = db.Column(db.String(255))
+    file_type = db.Column(db.String(50))
+    total_size = db.Column(db.BigInteger, nullable=False)
+    chunk_size = db.Column(db.Integer, nullable=False)
+    received = db.Column(db.BigInteger, nullable=False, default=0)   # bytes stored, always a chunk boundary
+    sha256 = db.Column(db.String(64))                                 # declared by the client, checked on completion
+    # set by complete(); the session is kept until it expires so a retried /complete gets the same document
+    document_id = db.Column(UUIDKey, db.ForeignKey('documents.id', ondelete='SET NULL'))
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+    expires_at = db.Column(db.DateTime, nullable=False)
+
+
+class DocumentBlob(db.Model):
+    __tablename__ = 'document_blobs'
+    sha256 = db.Column(db.String(64), primary_key=True)
+    size = db.Column(db.BigInteger, nullable=False)
+    ref_count = db.Column(db.Integer, nullable=False, default=0)   # documents rows pointing at this blob
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+
 class Grievance(db.Model):
     __tablename__ = 'grievances'
-    id = db.Column(db.String(36), primary_key=True, default=generate_uuid)
-    user_id = db.Column(db.String(36), db.ForeignKey('users.id'), nullable=False)
+    __table_args__ = (
+        db.Index('idx_grievances_submitted_id', 'submitted_at', 'id'),
+        db.Index('idx_grievances_user_submitted_id', 'user_id', 'submitted_at', 'id'),
+        db.Index('idx_grievances_status_submitted_id', 'status', 'submitted_at', 'id'),
+        db.Index('idx_grievances_updated', 'updated_at'),
+        db.Index('idx_grievances_cluster', 'cluster_id'),
+    )
+    id = db.Column(UUIDKey, primary_key=True, default=generate_uuid)
+    user_id = db.Column(UUIDKey, db.ForeignKey('users.id'), nullable=False)
     grievance_number = db.Column(db.String(30), unique=True, nullable=False)
     category = db.Column(db.String(100))
     subject = db.Column(db.String(255), nullable=False)
@@ -170,11 +293,12 @@ class Grievance(db.Model):
     ai_category = db.Column(db.String(100))
     ai_priority = db.Column(db.String(20))
     status = db.Column(db.String(30), default='open')
-    assigned_to = db.Column(db.String(36), db.ForeignKey('admins.id'))
+    assigned_to = db.Column(UUIDKey, db.ForeignKey('admins.id'))
     escalation_level = db.Column(db.Integer, default=0)
     submitted_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     resolved_at = db.Column(db.DateTime)
+    cluster_id = db.Column(UUIDKey, db.ForeignKey('grievance_clusters.id'))   # near-duplicates, see grievance_clusters.py
 
     user = db.relationship('User', foreign_keys=[user_id])
 
@@ -189,16 +313,57 @@ class Grievance(db.Model):
             'ai_priority': self.ai_priority,
             'status': self.status,
             'escalation_level': self.escalation_level,
+            'cluster_id': self.cluster_id,
             'submitted_at': self.submitted_at.isoformat() if self.submitted_at else None,
             'updated_at': self.updated_at.isoformat() if self.updated_at else None
         }
 
 
+class GrievanceCluster(db.Model):
+    __tablename__ = 'grievance_clusters'
+    __table_args__ = (
+        db.Index('idx_grievance_clusters_last_seen_id', 'last_seen', 'id'),
+    )
+    id = db.Column(UUIDKey, primary_key=True, default=generate_uuid)
+    category = db.Column(db.String(100))
+    subject = db.Column(db.String(255))            # subject of the first grievance
+    first_grievance_id = db.Column(UUIDKey)
+    size = db.Column(db.Integer, nullable=False, default=0)
+    first_seen = db.Column(db.DateTime, default=datetime.utcnow)
+    last_seen = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'category': self.category,
+            'subject': self.subject,
+            'first_grievance_id': self.first_grievance_id,
+            'size': self.size,
+            'first_seen': self.first_seen.isoformat() if self.first_seen else None,
+            'last_seen': self.last_seen.isoformat() if self.last_seen else None
+        }
+
+
+class GrievanceSignature(db.Model):
+    __tablename__ = 'grievance_signatures'
+    grievance_id = db.Column(UUIDKey, db.ForeignKey('grievances.id'), primary_key=True)
+    signature = db.Column(db.LargeBinary, nullable=False)   # MinHash, uint32 little-endian
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+
+class GrievanceLSHBucket(db.Model):
+    __tablename__ = 'grievance_lsh_buckets'
+    band = db.Column(db.SmallInteger, primary_key=True)
+    bucket = db.Column(db.BigInteger, primary_key=True)
+    grievance_id = db.Column(UUIDKey, db.ForeignKey('grievances.id'), primary_key=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+
 class GrievanceUpdate(db.Model):
     __tablename__ = 'grievance_updates'
-    id = db.Column(db.String(36), primary_key=True, default=generate_uuid)
-    grievance_id = db.Column(db.String(36), db.ForeignKey('grievances.id'))
-    updated_by = db.Column(db.String(36), db.ForeignKey('admins.id'))
+    id = db.Column(UUIDKey, primary_key=True, default=generate_uuid)
+    grievance_id = db.Column(UUIDKey, db.ForeignKey('grievances.id'))
+    updated_by = db.Column(UUIDKey, db.ForeignKey('admins.id'))
     update_text = db.Column(db.Text)
     status = db.Column(db.String(30))
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
@@ -206,15 +371,19 @@ class GrievanceUpdate(db.Model):
 
 class Payment(db.Model):
     __tablename__ = 'payments'
-    id = db.Column(db.String(36), primary_key=True, default=generate_uuid)
-    request_id = db.Column(db.String(36), db.ForeignKey('service_requests.id'))
-    user_id = db.Column(db.String(36), db.ForeignKey('users.id'))
+    __table_args__ = (
+        db.Index('idx_payments_paid', 'paid_at'),
+    )
+    id = db.Column(UUIDKey, primary_key=True, default=generate_uuid)
+    request_id = db.Column(UUIDKey, db.ForeignKey('service_requests.id'))
+    user_id = db.Column(UUIDKey, db.ForeignKey('users.id'))
     amount = db.Column(db.Numeric(10, 2), nullable=False)
     purpose = db.Column(db.String(255))
     transaction_id = db.Column(db.String(100), unique=True)
     status = db.Column(db.String(30), default='pending')
     payment_method = db.Column(db.String(50), default='mock')
     mock_reference = db.Column(db.String(50))
+    receipt_number = db.Column(db.String(30), unique=True)     # NULL for receipts issued before migration 008
     paid_at = db.Column(db.DateTime)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
@@ -234,16 +403,18 @@ class Payment(db.Model):
 
 class Certificate(db.Model):
     __tablename__ = 'certificates'
-    id = db.Column(db.String(36), primary_key=True, default=generate_uuid)
-    request_id = db.Column(db.String(36), db.ForeignKey('service_requests.id'))
-    user_id = db.Column(db.String(36), db.ForeignKey('users.id'))
+    id = db.Column(UUIDKey, primary_key=True, default=generate_uuid)
+    request_id = db.Column(UUIDKey, db.ForeignKey('service_requests.id'))
+    user_id = db.Column(UUIDKey, db.ForeignKey('users.id'))
     certificate_type = db.Column(db.String(100))
     certificate_number = db.Column(db.String(50), unique=True)
     qr_code = db.Column(db.Text)
     pdf_path = db.Column(db.Text)
-    issued_by = db.Column(db.String(36), db.ForeignKey('admins.id'))
+    issued_by = db.Column(UUIDKey, db.ForeignKey('admins.id'))
     valid_until = db.Column(db.Date)
     issued_at = db.Column(db.DateTime, default=datetime.utcnow)
+    revoked_at = db.Column(db.DateTime)
+    revocation_reason = db.Column(db.Text)
 
     def to_dict(self):
         return {
@@ -251,14 +422,46 @@ class Certificate(db.Model):
             'certificate_type': self.certificate_type,
             'certificate_number': self.certificate_number,
             'valid_until': self.valid_until.isoformat() if self.valid_until else None,
-            'issued_at': self.issued_at.isoformat()
+            'issued_at': self.issued_at.isoformat(),
+            'revoked_at': self.revoked_at.isoformat() if self.revoked_at else None
+        }
+
+
+class CertificateJob(db.Model):
+    __tablename__ = 'certificate_jobs'
+    __table_args__ = (
+        db.Index('idx_certificate_jobs_claim', 'status', 'run_after'),
+    )
+    id = db.Column(UUIDKey, primary_key=True, default=generate_uuid)
+    certificate_id = db.Column(UUIDKey, db.ForeignKey('certificates.id'), nullable=False)
+    status = db.Column(db.String(20), default='queued')   # queued / running / done / failed
+    attempts = db.Column(db.Integer, default=0)
+    max_attempts = db.Column(db.Integer, default=5)
+    last_error = db.Column(db.Text)
+    run_after = db.Column(db.DateTime, default=datetime.utcnow)
+    locked_by = db.Column(db.String(100))
+    locked_at = db.Column(db.DateTime)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    finished_at = db.Column(db.DateTime)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'certificate_id': self.certificate_id,
+            'status': self.status,
+            'attempts': self.attempts,
+            'max_attempts': self.max_attempts,
+            'last_error': self.last_error,
+            'run_after': self.run_after.isoformat() if self.run_after else None,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None
         }
 
 
 class ChatLog(db.Model):
     __tablename__ = 'chat_logs'
-    id = db.Column(db.String(36), primary_key=True, default=generate_uuid)
-    user_id = db.Column(db.String(36), db.ForeignKey('users.id'))
+    id = db.Column(UUIDKey, primary_key=True, default=generate_uuid)
+    user_id = db.Column(UUIDKey, db.ForeignKey('users.id'))
     session_id = db.Column(db.String(100))
     user_message = db.Column(db.Text)
     bot_response = db.Column(db.Text)
@@ -266,11 +469,85 @@ class ChatLog(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
 
+class ChatSession(db.Model):
+    """Recent messages of a chatbot conversation for the database:// session store (see chat_sessions.py)."""
+    __tablename__ = 'chat_sessions'
+    __table_args__ = (
+        db.Index('idx_chat_sessions_expires', 'expires_at'),
+    )
+    session_id = db.Column(db.String(100), primary_key=True)
+    owner = db.Column(db.String(36), nullable=False, default='')     # user id, '' while anonymous
+    messages = db.Column(db.Text, nullable=False, default='[]')      # JSON [{'role', 'content'}]
+    expires_at = db.Column(db.DateTime, nullable=False)
+
+
 class AnalyticsLog(db.Model):
     __tablename__ = 'analytics_logs'
-    id = db.Column(db.String(36), primary_key=True, default=generate_uuid)
+    id = db.Column(UUIDKey, primary_key=True, default=generate_uuid)
     event_type = db.Column(db.String(100))
-    user_id = db.Column(db.String(36), db.ForeignKey('users.id'))
+    user_id = db.Column(UUIDKey, db.ForeignKey('users.id'))
     event_data = db.Column(db.JSON)   # renamed from 'metadata' (reserved by SQLAlchemy)
     ip_address = db.Column(db.String(50))
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+
+class StatCounter(db.Model):
+    __tablename__ = 'stat_counters'
+    entity = db.Column(db.String(50), primary_key=True)
+    status = db.Column(db.String(30), primary_key=True)   # '_total' holds the row count of the whole table
+    count = db.Column(db.BigInteger, nullable=False, default=0)
+    amount = db.Column(db.Numeric(14, 2), nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+class ReferenceCounter(db.Model):
+    """Reference number counters when the database has no sequences (see reference_numbers.py)."""
+    __tablename__ = 'reference_counters'
+    name = db.Column(db.String(60), primary_key=True)      # ref_<prefix>_<period>
+    value = db.Column(db.BigInteger, nullable=False, default=0)
+
+
+class CacheVersion(db.Model):
+    __tablename__ = 'cache_versions'
+    name = db.Column(db.String(50), primary_key=True)      # e.g. 'service_categories' (see catalogue.py)
+    version = db.Column(db.BigInteger, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+
+class DailyRollup(db.Model):
+    __tablename__ = 'daily_rollups'
+    metric = db.Column(db.String(30), primary_key=True)      # requests / grievances / revenue / users
+    day = db.Column(db.Date, primary_key=True)
+    dim1 = db.Column(db.String(100), primary_key=True, default='')
+    dim2 = db.Column(db.String(100), primary_key=True, default='')
+    count = db.Column(db.BigInteger, nullable=False, default=0)
+    amount = db.Column(db.Numeric(14, 2), nullable=False, default=0)
+
+
+class RollupWatermark(db.Model):
+    __tablename__ = 'rollup_watermarks'
+    metric = db.Column(db.String(30), primary_key=True)
+    high_water = db.Column(db.DateTime)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+class JobCheckpoint(db.Model):
+    __tablename__ = 'job_checkpoints'
+    name = db.Column(db.String(100), primary_key=True)
+    position = db.Column(db.String(64))           # last primary key processed
+    processed = db.Column(db.BigInteger, nullable=False, default=0)
+    changed = db.Column(db.BigInteger, nullable=False, default=0)
+    started_at = db.Column(db.DateTime, default=datetime.utcnow)
+    finished_at = db.Column(db.DateTime)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def to_dict(self):
+        return {
+            'name': self.name,
+            'position': self.position,
+            'processed': self.processed,
+            'changed': self.changed,
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+        }
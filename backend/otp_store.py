@@ -0,0 +1,246 @@
+"""
+Short-lived OTP storage.
+
+One live OTP per mobile number:
+
+  * DatabaseOTPStore - the otp_codes table (default, 'database://').
+    Shared by every worker with nothing else to run; verify locks the
+    row, so concurrent verifies cannot both succeed.
+  * RedisOTPStore    - shared store that keeps OTP traffic off the
+    database; works with any Redis-protocol server (Redis, Valkey,
+    KeyDB, ...).  Expiry is the key TTL, and the compare / attempt count
+    / single-use delete runs as one Lua script.
+  * MemoryOTPStore   - thread-safe dict with TTL eviction.  Only correct
+    when a single process serves /api/auth, so it is refused unless
+    DEBUG is on.
+
+Codes are stored as a SHA-256 of mobile + code, never in clear.  Issuing
+a new OTP replaces the previous one and resets the attempt counter; a
+code is deleted after OTP_MAX_ATTEMPTS wrong guesses.
+
+The backend is chosen by OTP_STORE_URL ('database://', 'redis://...' or
+'memory://').  When OTP_AUDIT_LOG is on, issue/verify events are also
+appended to otp_logs through a background writer, off the request path.
+"""
+import hashlib
+import threading
+import time
+from abc import ABC, abstractmethod
+from datetime import datetime, timedelta
+from config import Config
+from extensions import db
+from models import OTPCode
+
+OK = 'ok'
+INVALID = 'invalid'       # wrong code, attempts left
+EXPIRED = 'expired'       # no live code for this mobile (expired, used or never sent)
+LOCKED = 'locked'         # too many wrong codes, the OTP has been discarded
+
+
+def _digest(mobile, code):
+    return hashlib.sha256(f"{mobile}:{code}".encode()).hexdigest()
+
+
+class OTPStore(ABC):
+    def __init__(self, max_attempts):
+        self.max_attempts = max_attempts
+
+    @abstractmethod
+    def issue(self, mobile, code, ttl_seconds):
+        """Replace any live OTP for `mobile` with `code`, valid for ttl_seconds."""
+
+    @abstractmethod
+    def verify(self, mobile, code, consume=True):
+        """
+        Check `code` for `mobile`.  Returns (status, attempts_left).  On OK
+        the OTP is deleted unless consume=False (used to validate the code
+        before asking a new user for their name).
+        """
+
+
+class DatabaseOTPStore(OTPStore):
+    SWEEP_INTERVAL = 300
+
+    def __init__(self, max_attempts):
+        super().__init__(max_attempts)
+        self._next_sweep = time.monotonic() + self.SWEEP_INTERVAL
+
+    def issue(self, mobile, code, ttl_seconds):
+        now = datetime.utcnow()
+        table = OTPCode.__table__
+        values = dict(mobile=mobile, code_hash=_digest(mobile, code), attempts=0,
+                      expires_at=now + timedelta(seconds=ttl_seconds))
+        dialect = db.session.get_bind().dialect.name
+        if dialect in ('postgresql', 'sqlite'):
+            if dialect == 'postgresql':
+                from sqlalchemy.dialects.postgresql import insert
+            else:
+                from sqlalchemy.dialects.sqlite import insert
+            stmt = insert(table).values(**values)
+            stmt = stmt.on_conflict_do_update(index_elements=[table.c.mobile], set_={
+                'code_hash': stmt.excluded.code_hash,
+                'attempts': 0,
+                'expires_at': stmt.excluded.expires_at,
+            })
+            db.session.execute(stmt)
+        else:
+            db.session.execute(table.delete().where(table.c.mobile == mobile))
+            db.session.execute(table.insert().values(**values))
+        if time.monotonic() >= self._next_sweep:
+            # codes that were never verified
+            self._next_sweep = time.monotonic() + self.SWEEP_INTERVAL
+            db.session.execute(table.delete().where(table.c.expires_at <= now))
+        db.session.commit()
+
+    def verify(self, mobile, code, consume=True):
+        # the row lock makes the compare / attempt count / delete one step
+        entry = OTPCode.query.filter_by(mobile=mobile).with_for_update().first()
+        if entry is None or entry.expires_at <= datetime.utcnow():
+            if entry is not None:
+                db.session.delete(entry)
+            db.session.commit()
+            return EXPIRED, 0
+        if entry.code_hash != _digest(mobile, code):
+            entry.attempts += 1
+            if entry.attempts >= self.max_attempts:
+                db.session.delete(entry)
+                db.session.commit()
+                return LOCKED, 0
+            left = self.max_attempts - entry.attempts
+            db.session.commit()
+            return INVALID, left
+        left = self.max_attempts - entry.attempts
+        if consume:
+            db.session.delete(entry)
+        db.session.commit()
+        return OK, left
+
+
+class MemoryOTPStore(OTPStore):
+    SWEEP_INTERVAL = 60
+
+    def __init__(self, max_attempts):
+        super().__init__(max_attempts)
+        self._entries = {}   # mobile -> [digest, expires_at, attempts]
+        self._lock = threading.Lock()
+        self._next_sweep = time.monotonic() + self.SWEEP_INTERVAL
+
+    def _sweep(self, now):
+        if now < self._next_sweep:
+            return
+        self._next_sweep = now + self.SWEEP_INTERVAL
+        for mobile in [m for m, e in self._entries.items() if e[1] <= now]:
+            del self._entries[mobile]
+
+    def issue(self, mobile, code, ttl_seconds):
+        now = time.monotonic()
+        with self._lock:
+            self._sweep(now)
+            self._entries[mobile] = [_digest(mobile, code), now + ttl_seconds, 0]
+
+    def verify(self, mobile, code, consume=True):
+        now = time.monotonic()
+        with self._lock:
+            self._sweep(now)
+            entry = self._entries.get(mobile)
+            if entry is None or entry[1] <= now:
+                self._entries.pop(mobile, None)
+                return EXPIRED, 0
+            if entry[0] != _digest(mobile, code):
+                entry[2] += 1
+                if entry[2] >= self.max_attempts:
+                    del self._entries[mobile]
+                    return LOCKED, 0
+                return INVALID, self.max_attempts - entry[2]
+            if consume:
+                del self._entries[mobile]
+            return OK, self.max_attempts - entry[2]
+
+    def __len__(self):
+        return len(self._entries)
+
+
+# KEYS[1] = otp:<mobile>; ARGV = digest, max_attempts, consume
+_VERIFY_LUA = """
+local stored = redis.call('HGET', KEYS[1], 'h')
+if not stored then return {0, 0} end
+local attempts = tonumber(redis.call('HGET', KEYS[1], 'a') or '0')
+if stored ~= ARGV[1] then
+    attempts = redis.call('HINCRBY', KEYS[1], 'a', 1)
+    if attempts >= tonumber(ARGV[2]) then
+        redis.call('DEL', KEYS[1])
+        return {3, 0}
+    end
+    return {1, tonumber(ARGV[2]) - attempts}
+end
+if ARGV[3] == '1' then redis.call('DEL', KEYS[1]) end
+return {2, tonumber(ARGV[2]) - attempts}
+"""
+_LUA_STATUS = {0: EXPIRED, 1: INVALID, 2: OK, 3: LOCKED}
+
+
+class RedisOTPStore(OTPStore):
+    KEY_PREFIX = 'otp:'
+
+    def __init__(self, url, max_attempts):
+        super().__init__(max_attempts)
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError("OTP_STORE_URL points at Redis but the 'redis' package is not installed")
+        self._client = redis.Redis.from_url(url)
+        self._verify = self._client.register_script(_VERIFY_LUA)
+
+    def issue(self, mobile, code, ttl_seconds):
+        key = self.KEY_PREFIX + mobile
+        pipe = self._client.pipeline(transaction=True)
+        pipe.delete(key)
+        pipe.hset(key, mapping={'h': _digest(mobile, code), 'a': 0})
+        pipe.expire(key, int(ttl_seconds))
+        pipe.execute()
+
+    def verify(self, mobile, code, consume=True):
+        status, left = self._verify(keys=[self.KEY_PREFIX + mobile],
+                                    args=[_digest(mobile, code), self.max_attempts, '1' if consume else '0'])
+        return _LUA_STATUS[int(status)], int(left)
+
+
+def _create_store():
+    url = Config.OTP_STORE_URL
+    if url.startswith(('redis://', 'rediss://', 'unix://')):
+        return RedisOTPStore(url, Config.OTP_MAX_ATTEMPTS)
+    if url.startswith('memory://'):
+        if not Config.DEBUG:
+            # each gunicorn worker would keep its own codes: send-otp and
+            # verify-otp landing on different workers fail as EXPIRED
+            raise RuntimeError("OTP_STORE_URL=memory:// only works in a single process; "
+                               "use database:// or a Redis URL unless DEBUG=True")
+        return MemoryOTPStore(Config.OTP_MAX_ATTEMPTS)
+    if url.startswith('database://'):
+        return DatabaseOTPStore(Config.OTP_MAX_ATTEMPTS)
+    raise RuntimeError(f"Unsupported OTP_STORE_URL: {url}")
+
+
+store = _create_store()
+
+
+_audit_writer = None
+
+
+def init_otp_audit(app):
+    """Start the otp_logs audit writer when OTP_AUDIT_LOG is enabled."""
+    global _audit_writer
+    if not Config.OTP_AUDIT_LOG:
+        return None
+    from background_writer import BufferedWriter
+    from models import OTPLog
+    _audit_writer = BufferedWriter('otp-audit', OTPLog, max_batch=200, flush_interval_ms=2000)
+    _audit_writer.init_app(app)
+    return _audit_writer
+
+
+def audit(mobile, purpose, expires_at, is_used=False):
+    """Append an otp_logs row asynchronously (the code itself is never written)."""
+    if _audit_writer is not None:
+        _audit_writer.emit(mobile=mobile, otp_code='*' * Config.OTP_LENGTH,
+                           purpose=purpose, is_used=is_used, expires_at=expires_at)
@@ -0,0 +1,88 @@
+"""
+Offset and keyset (cursor) pagination for list endpoints.
+
+The default mode keeps the existing ?page= behaviour.  Passing ?cursor=
+(empty for the first page) switches to keyset mode: rows are fetched with
+a seek predicate on (timestamp, id) so every page costs O(page size) no
+matter how deep it is, and no COUNT(*) runs unless ?total=exact is asked
+for.  ?total=estimate returns a cheap approximate total instead.
+"""
+import base64
+import binascii
+from datetime import datetime
+from flask import request
+from sqlalchemy import tuple_, text, literal
+from extensions import db
+
+
+def encode_cursor(ts, row_id):
+    raw = f"{ts.isoformat()}|{row_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        ts, row_id = base64.urlsafe_b64decode(padded.encode()).decode().split('|', 1)
+        return datetime.fromisoformat(ts), row_id
+    except (ValueError, binascii.Error, UnicodeDecodeError):
+        raise ValueError('Invalid cursor')
+
+
+def estimated_row_count(model):
+    """Planner estimate from pg_class; None where unavailable (non-Postgres, never analysed)."""
+    bind = db.session.get_bind()
+    if bind.dialect.name != 'postgresql':
+        return None
+    n = db.session.execute(
+        text("SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass(:t)"),
+        {'t': model.__tablename__}
+    ).scalar()
+    return n if n is not None and n >= 0 else None
+
+
+def keyset_paginate(query, ts_col, id_col, per_page, cursor=None):
+    """Return (items, next_cursor) for the page after `cursor`, newest first."""
+    if cursor:
+        ts, row_id = decode_cursor(cursor)
+        # bind through the column types, so UUIDKey stores the id the way the column does
+        query = query.filter(tuple_(ts_col, id_col) < tuple_(literal(ts, ts_col.type), literal(row_id, id_col.type)))
+
+    rows = query.order_by(ts_col.desc(), id_col.desc()).limit(per_page + 1).all()
+    next_cursor = None
+    if len(rows) > per_page:
+        rows = rows[:per_page]
+        last = rows[-1]
+        next_cursor = encode_cursor(getattr(last, ts_col.key), getattr(last, id_col.key))
+    return rows, next_cursor
+
+
+def paginate(query, ts_col, id_col, per_page, estimate=None):
+    """
+    Paginate `query` according to the current request's arguments.
+
+    Returns (items, meta) where meta is merged into the JSON response:
+    offset mode -> {'total', 'pages'}; cursor mode -> {'next_cursor'} plus
+    'total' when ?total=exact, or 'total' / 'total_is_estimate' when
+    ?total=estimate and `estimate` (a zero-argument callable) can answer.
+    Raises ValueError on a malformed cursor.
+    """
+    cursor = request.args.get('cursor')
+    if cursor is None:
+        pagination = query.order_by(ts_col.desc(), id_col.desc()).paginate(
+            page=request.args.get('page', 1, type=int), per_page=per_page, error_out=False
+        )
+        return pagination.items, {'total': pagination.total, 'pages': pagination.pages}
+
+    items, next_cursor = keyset_paginate(query, ts_col, id_col, per_page, cursor)
+    meta = {'next_cursor': next_cursor}
+
+    total_mode = request.args.get('total')
+    if total_mode == 'exact':
+        meta['total'] = query.order_by(None).count()
+    elif total_mode == 'estimate' and estimate is not None:
+        total = estimate()
+        if total is not None:
+            meta['total'] = total
+            meta['total_is_estimate'] = True
+    return items, meta
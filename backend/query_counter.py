@@ -0,0 +1,62 @@
+"""
+Per-request SQL statement counter.
+
+Every statement sent to the database increments a counter on flask.g, so
+a request handler's round trips can be inspected (and asserted on) to
+stop N+1 lazy loads from creeping back into list endpoints.  When
+SQL_QUERY_COUNT_HEADER is enabled the count is returned to the client as
+X-SQL-Query-Count.
+"""
+import threading
+from contextlib import contextmanager
+from flask import g, has_app_context
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+HEADER = 'X-SQL-Query-Count'
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if has_app_context():
+        g.sql_query_count = g.get('sql_query_count', 0) + 1
+
+
+def get_query_count():
+    return g.get('sql_query_count', 0) if has_app_context() else 0
+
+
+@contextmanager
+def count_queries():
+    """
+    Count statements this thread issues inside the block (the Flask test
+    client runs the request in the calling thread):
+
+        with count_queries() as counter:
+            client.get('/api/admin/requests')
+        assert counter['count'] <= 3
+    """
+    counter = {'count': 0}
+    thread = threading.get_ident()
+
+    def _count(*args):
+        # background writers and job / image workers share the engine;
+        # only statements issued by this thread belong to the block
+        if threading.get_ident() == thread:
+            counter['count'] += 1
+
+    event.listen(Engine, 'before_cursor_execute', _count)
+    try:
+        yield counter
+    finally:
+        event.remove(Engine, 'before_cursor_execute', _count)
+
+
+def init_query_counter(app):
+    if not event.contains(Engine, 'before_cursor_execute', _before_cursor_execute):
+        event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+
+    if app.config.get('SQL_QUERY_COUNT_HEADER'):
+        @app.after_request
+        def _add_query_count_header(response):
+            response.headers[HEADER] = str(get_query_count())
+            return response
@@ -0,0 +1,73 @@
+"""
+In-process token-bucket rate limiting.
+
+Each client key gets a bucket of `capacity` tokens that refills at
+`capacity / period` tokens per second; capacity can be overridden per
+call (e.g. a higher quota for registered API clients).  A request that
+costs more tokens than are available is rejected with the number of
+seconds to wait.
+Buckets live per worker process, so the effective limit across N
+gunicorn workers is up to N times the configured one.
+"""
+import threading
+import time
+from collections import OrderedDict
+from flask import request
+from config import Config
+
+
+class TokenBucketLimiter:
+    def __init__(self, capacity, period=60.0, max_clients=10000):
+        self.capacity = float(capacity)
+        self.period = float(period)
+        self.max_clients = max_clients
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def consume(self, key, cost=1, capacity=None):
+        """Take `cost` tokens for `key`.  Returns (allowed, remaining, retry_after_seconds)."""
+        capacity = float(capacity or self.capacity)
+        rate = capacity / self.period
+        now = time.monotonic()
+        with self._lock:
+            tokens, last = self._buckets.pop(key, (capacity, now))
+            tokens = min(capacity, tokens + (now - last) * rate)
+            if cost <= tokens:
+                tokens -= cost
+                allowed, retry_after = True, 0
+            else:
+                allowed, retry_after = False, (cost - tokens) / rate if cost <= capacity else None
+            self._buckets[key] = (tokens, now)
+            while len(self._buckets) > self.max_clients:
+                self._buckets.popitem(last=False)
+        return allowed, int(tokens), retry_after
+
+
+def _parse_api_keys(raw):
+    keys = {}
+    for item in (raw or '').split(','):
+        if ':' in item:
+            name, key = item.split(':', 1)
+            keys[key.strip()] = name.strip()
+    return keys
+
+
+API_CLIENTS = _parse_api_keys(Config.VERIFY_API_KEYS)
+
+
+def identify_client():
+    """
+    Return (client_key, quota) for the current request: a registered API
+    client when a valid X-API-Key is sent, otherwise the caller's IP.
+    Raises PermissionError for an unknown API key.
+    """
+    api_key = request.headers.get('X-API-Key')
+    if api_key:
+        name = API_CLIENTS.get(api_key)
+        if name is None:
+            raise PermissionError('Invalid API key')
+        return f"client:{name}", Config.VERIFY_BATCH_CLIENT_PER_MINUTE
+    # remote_addr is the client address taken from X-Forwarded-For only
+    # when the request came through TRUSTED_PROXY_HOPS proxies (app.py)
+    ip = request.remote_addr or 'unknown'
+    return f"ip:{ip}", Config.VERIFY_BATCH_ANON_PER_MINUTE
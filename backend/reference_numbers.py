@@ -0,0 +1,225 @@
+"""
+Collision-free human reference numbers.
+
+    REQ-20261017-483920         service requests    6 digits per day
+    GRV-20261017-07214          grievances          5 digits per day
+    TXN-20261017143002-00318855 payments            8 digits per day
+    CERT-2026-55038122          certificates        8 digits per year
+    RCP-20261017-30571946       payment receipts    8 digits per day
+
+The formats are the ones the random generators produced, but the suffix
+now comes from a counter per prefix and period, so two numbers can never
+be the same.  Each counter is a PostgreSQL sequence (ref_req_20261017,
+...) with INCREMENT BY REFERENCE_BLOCK_SIZE: one nextval() reserves a
+whole block that the process then hands out from memory (hi/lo), so most
+numbers need no round trip.  nextval() runs on the caller's own
+connection (it is not transactional), and no lock is held while a block
+is being reserved.  Blocks left unused when a process exits are skipped,
+which only leaves gaps.
+
+The API never runs DDL: `flask reference-sequences` (daily, from cron or
+the deploy) creates the sequences of the coming
+REFERENCE_SEQUENCE_DAYS_AHEAD days and drops those older than
+REFERENCE_SEQUENCE_KEEP_DAYS.  It only creates periods that start more
+than an hour later, so a period is served either by its sequence or, when
+no sequence was created ahead (a fresh install, the cron job stopped), by
+the reference_counters table for the whole period.  SQLite in development
+always uses the table.
+
+The counter value is passed through a keyed permutation of the suffix
+range (a small Feistel network, REFERENCE_NUMBER_KEY), so consecutive
+numbers do not look consecutive and certificates / applications cannot be
+enumerated through the public tracking and verification endpoints.
+Changing the key within a period could repeat numbers of that period.
+A counter that outgrows its digits continues with a longer suffix.
+"""
+import os
+import hashlib
+import threading
+import click
+from flask.cli import with_appcontext
+from datetime import datetime, timedelta
+from sqlalchemy import text
+from extensions import db
+from models import ReferenceCounter
+from config import Config
+
+# prefix -> (period format, suffix digits, template)
+FORMATS = {
+    'REQ': ('%Y%m%d', 6, 'REQ-{now:%Y%m%d}-{suffix}'),
+    'GRV': ('%Y%m%d', 5, 'GRV-{now:%Y%m%d}-{suffix}'),
+    'TXN': ('%Y%m%d', 8, 'TXN-{now:%Y%m%d%H%M%S}-{suffix}'),
+    'CERT': ('%Y', 8, 'CERT-{now:%Y}-{suffix}'),
+    'RCP': ('%Y%m%d', 8, 'RCP-{now:%Y%m%d}-{suffix}'),
+}
+FEISTEL_ROUNDS = 4
+
+_lock = threading.Lock()
+_pid = None
+_blocks = {}        # counter name -> [[next value, end (exclusive)], ...]
+_increments = {}    # sequence name -> INCREMENT BY it was created with (None: not created)
+_stats = {'numbers': 0, 'blocks': 0}
+
+
+def _key():
+    secret = Config.REFERENCE_NUMBER_KEY or f"reference-numbers:{Config.SECRET_KEY}"
+    return hashlib.sha256(secret.encode()).digest()
+
+
+def scramble(value, digits):
+    """Keyed permutation of 0 .. 10**digits - 1 (values beyond that are returned as-is)."""
+    limit = 10 ** digits
+    if value >= limit:
+        return value
+    half = 10 ** ((digits + 1) // 2)
+    key = _key()
+    while True:
+        left, right = divmod(value, half)
+        for round_ in range(FEISTEL_ROUNDS):
+            mix = hashlib.blake2b(f"{digits}:{round_}:{right}".encode(), key=key, digest_size=8).digest()
+            left, right = right, (left + int.from_bytes(mix, 'big')) % half
+        value = left * half + right
+        if value < limit:          # cycle-walk back into range when the half*half domain is larger
+            return value
+
+
+def _counter_name(prefix, period):
+    return f"ref_{prefix.lower()}_{period}"
+
+
+def _upcoming_periods(period_format, now, days):
+    """Periods starting more than an hour and at most `days` days from now."""
+    earliest = now + timedelta(hours=1)
+    if period_format == '%Y':
+        starts = [datetime(year, 1, 1) for year in range(now.year + 1, (now + timedelta(days=days)).year + 1)]
+    else:
+        today = datetime(now.year, now.month, now.day)
+        starts = [today + timedelta(days=day) for day in range(1, days + 1)]
+    return [start.strftime(period_format) for start in starts if start > earliest]
+
+
+def ensure_sequences(days=None, now=None):
+    """Create the sequences of the coming periods and drop expired ones; returns (created, dropped)."""
+    days = Config.REFERENCE_SEQUENCE_DAYS_AHEAD if days is None else days
+    now = now or datetime.utcnow()
+    created, dropped = [], []
+    counters = ReferenceCounter.__table__
+    with db.engine.begin() as conn:
+        for prefix, (period_format, _, _) in FORMATS.items():
+            cutoff = _counter_name(prefix, (now - timedelta(days=Config.REFERENCE_SEQUENCE_KEEP_DAYS))
+                                   .strftime(period_format))
+            conn.execute(counters.delete().where(counters.c.name.like(f"ref\\_{prefix.lower()}\\_%", escape='\\'),
+                                                 counters.c.name < cutoff))
+            if conn.dialect.name != 'postgresql':
+                continue
+            existing = set(conn.execute(text("SELECT sequencename FROM pg_sequences "
+                                             "WHERE schemaname = current_schema() AND sequencename LIKE :pattern"),
+                                        {'pattern': f"ref\\_{prefix.lower()}\\_%"}).scalars())
+            for name in sorted(existing):
+                if name < cutoff:
+                    conn.execute(text(f'DROP SEQUENCE IF EXISTS "{name}"'))
+                    dropped.append(name)
+            for period in _upcoming_periods(period_format, now, days):
+                name = _counter_name(prefix, period)
+                # a period some host already numbers from reference_counters keeps the table
+                if name in existing or conn.execute(counters.select().where(counters.c.name == name)).first():
+                    continue
+                conn.execute(text(f'CREATE SEQUENCE IF NOT EXISTS "{name}" '
+                                  f'START WITH 0 MINVALUE 0 INCREMENT BY {int(Config.REFERENCE_BLOCK_SIZE)}'))
+                created.append(name)
+    return created, dropped
+
+
+def _reserve_sequence(name):
+    """Reserve a block from the period's sequence, or None when it was not created ahead."""
+    conn = db.session.connection()
+    if name not in _increments:
+        # a sequence made before REFERENCE_BLOCK_SIZE changed keeps its own block size
+        _increments[name] = conn.execute(text("SELECT increment_by FROM pg_sequences "
+                                              "WHERE schemaname = current_schema() AND sequencename = :name"),
+                                         {'name': name}).scalar()
+    increment = _increments[name]
+    if increment is None:
+        return None
+    start = conn.execute(text('SELECT nextval(:name)'), {'name': name}).scalar()
+    return start, start + increment
+
+
+def _reserve_counter(name):
+    # its own short transaction: the block must stay reserved if the caller rolls back
+    block = int(Config.REFERENCE_BLOCK_SIZE)
+    table = ReferenceCounter.__table__
+    with db.engine.begin() as conn:
+        if conn.dialect.name in ('postgresql', 'sqlite'):
+            if conn.dialect.name == 'postgresql':
+                from sqlalchemy.dialects.postgresql import insert
+            else:
+                from sqlalchemy.dialects.sqlite import insert
+            stmt = insert(table).values(name=name, value=block)
+            stmt = stmt.on_conflict_do_update(index_elements=[table.c.name], set_={'value': table.c.value + block})
+            end = conn.execute(stmt.returning(table.c.value)).scalar()
+        else:
+            result = conn.execute(table.update().where(table.c.name == name).values(value=table.c.value + block))
+            if result.rowcount == 0:
+                conn.execute(table.insert().values(name=name, value=block))
+            end = conn.execute(table.select().with_only_columns(table.c.value).where(table.c.name == name)).scalar()
+    return end - block, end
+
+
+def _take(name):
+    ranges = _blocks.get(name)
+    while ranges:
+        if ranges[0][0] < ranges[0][1]:
+            value = ranges[0][0]
+            ranges[0][0] += 1
+            _stats['numbers'] += 1
+            return value
+        ranges.pop(0)
+    return None
+
+
+def _next_value(prefix, period):
+    global _pid
+    name = _counter_name(prefix, period)
+    with _lock:
+        if _pid != os.getpid():     # blocks reserved before a fork belong to the parent
+            _pid = os.getpid()
+            _blocks.clear()
+        value = _take(name)
+    if value is not None:
+        return value
+
+    # Reserve outside _lock: the reservation may wait for a pooled connection, and
+    # threads still holding numbers must not queue behind it.  Blocks reserved by
+    # threads that ran out at the same time are all kept, so none is wasted.
+    block = _reserve_sequence(name) if db.engine.dialect.name == 'postgresql' else None
+    if block is None:
+        block = _reserve_counter(name)
+    with _lock:
+        for stale in [n for n in _blocks if n.startswith(f"ref_{prefix.lower()}_") and n != name]:
+            del _blocks[stale]
+        _blocks.setdefault(name, []).append(list(block))
+        _stats['blocks'] += 1
+        return _take(name)
+
+
+def allocate(prefix, now=None):
+    """Next reference number for `prefix` ('REQ', 'GRV', 'TXN', 'CERT', 'RCP')."""
+    period_format, digits, template = FORMATS[prefix]
+    now = now or datetime.utcnow()
+    value = _next_value(prefix, now.strftime(period_format))
+    return template.format(now=now, suffix=f"{scramble(value, digits):0{digits}d}")
+
+
+def stats():
+    return {**_stats, 'cached_blocks': {name: sum(end - start for start, end in ranges)
+                                        for name, ranges in _blocks.items()}}
+
+
+@click.command('reference-sequences')
+@click.option('--days', type=int, default=None, help='Days ahead to create (default REFERENCE_SEQUENCE_DAYS_AHEAD)')
+@with_appcontext
+def reference_sequences_command(days):
+    """Create the reference number sequences of the coming days and drop expired ones."""
+    created, dropped = ensure_sequences(days)
+    click.echo(f"✅ Reference sequences: {len(created)} created, {len(dropped)} dropped")
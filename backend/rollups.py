@@ -0,0 +1,237 @@
+"""
+Daily analytics rollups.
+
+daily_rollups holds one row per (metric, day, dim1, dim2) with a count
+and an amount:
+
+    requests    service requests by submit day, category_id, status
+    grievances  grievances by submit day, category, ai_priority
+    revenue     successful payments by paid day, purpose (amount = revenue)
+    users       new users by registration day
+
+refresh() is incremental: for each metric it finds the days touched by
+rows changed since the stored watermark (updated_at / paid_at /
+created_at), recomputes just those days from the source table and moves
+the watermark forward.  Recomputing whole days keeps it idempotent, so
+the lookback window (ROLLUP_OVERLAP_SECONDS) can safely re-read rows
+committed late by long transactions.  Run it from cron with
+`flask rollup-analytics`; the timeseries endpoints also call
+refresh_if_stale() so data is never older than ROLLUP_REFRESH_SECONDS.
+"""
+import threading
+import time
+from collections import namedtuple, OrderedDict
+from datetime import datetime, date, timedelta
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import func, cast, delete, insert, text, String
+from extensions import db
+from models import DailyRollup, RollupWatermark, ServiceRequest, Grievance, Payment, User
+from config import Config
+
+Metric = namedtuple('Metric', 'model day changed dims amount where')
+
+METRICS = OrderedDict([
+    ('requests', Metric(ServiceRequest, ServiceRequest.submitted_at, ServiceRequest.updated_at,
+                        (ServiceRequest.category_id, ServiceRequest.status), None, ())),
+    ('grievances', Metric(Grievance, Grievance.submitted_at, Grievance.updated_at,
+                          (Grievance.category, Grievance.ai_priority), None, ())),
+    ('revenue', Metric(Payment, Payment.paid_at, Payment.paid_at,
+                       (Payment.purpose,), Payment.amount, (Payment.status == 'success',))),
+    ('users', Metric(User, User.created_at, User.created_at, (), None, ())),
+])
+
+# metric -> {group_by name: dim column in daily_rollups}
+GROUP_BY = {
+    'requests': {'category': 'dim1', 'status': 'dim2'},
+    'grievances': {'category': 'dim1', 'priority': 'dim2'},
+    'revenue': {'purpose': 'dim1'},
+    'users': {},
+}
+
+INTERVALS = ('day', 'week', 'month')
+
+_DAY_CHUNK = 500
+_ADVISORY_LOCK_ID = 74210311
+
+
+def _day_expr(metric):
+    return func.date(metric.day, type_=db.Date)
+
+
+def _dim_expr(column):
+    return func.coalesce(cast(column, String), '')
+
+
+def _refresh_metric(name, metric, now):
+    mark = db.session.get(RollupWatermark, name)
+    query = db.session.query(_day_expr(metric)).filter(metric.day.isnot(None), *metric.where)
+    if mark is not None and mark.high_water is not None:
+        query = query.filter(metric.changed > mark.high_water - timedelta(seconds=Config.ROLLUP_OVERLAP_SECONDS))
+    days = sorted({d for (d,) in query.distinct()})
+
+    for i in range(0, len(days), _DAY_CHUNK):
+        chunk = days[i:i + _DAY_CHUNK]
+        db.session.execute(
+            delete(DailyRollup).where(DailyRollup.metric == name, DailyRollup.day.in_(chunk))
+        )
+        day = _day_expr(metric)
+        dims = [_dim_expr(c) for c in metric.dims]
+        amount = func.coalesce(func.sum(metric.amount), 0) if metric.amount is not None else None
+        cols = [day, *dims, func.count()] + ([amount] if amount is not None else [])
+        grouped = db.session.query(*cols).filter(
+            metric.day >= datetime.combine(chunk[0], datetime.min.time()),
+            metric.day < datetime.combine(chunk[-1] + timedelta(days=1), datetime.min.time()),
+            day.in_(chunk),
+            *metric.where
+        ).group_by(day, *dims).all()
+
+        rows = []
+        for r in grouped:
+            row = {'metric': name, 'day': r[0], 'dim1': '', 'dim2': '', 'count': r[len(dims) + 1],
+                   'amount': r[len(dims) + 2] if amount is not None else 0}
+            for n, value in enumerate(r[1:len(dims) + 1], start=1):
+                row[f'dim{n}'] = value
+            rows.append(row)
+        if rows:
+            db.session.execute(insert(DailyRollup.__table__), rows)
+
+    if mark is None:
+        mark = RollupWatermark(metric=name)
+        db.session.add(mark)
+    mark.high_water = now
+    mark.updated_at = now
+    return len(days)
+
+
+def refresh(metrics=None):
+    """
+    Bring the rollups up to date in one transaction.  Returns
+    {metric: days recomputed}, or None if another process holds the
+    refresh lock (PostgreSQL only).
+    """
+    if db.session.get_bind().dialect.name == 'postgresql':
+        locked = db.session.execute(text('SELECT pg_try_advisory_xact_lock(:id)'),
+                                    {'id': _ADVISORY_LOCK_ID}).scalar()
+        if not locked:
+            db.session.rollback()
+            return None
+    now = datetime.utcnow()
+    result = {}
+    try:
+        for name, metric in METRICS.items():
+            if metrics is None or name in metrics:
+                result[name] = _refresh_metric(name, metric, now)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    return result
+
+
+def rebuild():
+    """Drop all rollups and watermarks and recompute from scratch."""
+    DailyRollup.query.delete()
+    RollupWatermark.query.delete()
+    return refresh()
+
+
+_refresh_lock = threading.Lock()
+_last_refresh = 0.0
+
+
+def refresh_if_stale():
+    """Refresh at most once per ROLLUP_REFRESH_SECONDS per process; never waits on a running refresh."""
+    global _last_refresh
+    if time.monotonic() - _last_refresh < Config.ROLLUP_REFRESH_SECONDS:
+        return
+    if not _refresh_lock.acquire(blocking=False):
+        return
+    try:
+        refresh()
+        _last_refresh = time.monotonic()
+    finally:
+        _refresh_lock.release()
+
+
+def period_start(day, interval):
+    if interval == 'week':
+        return day - timedelta(days=day.weekday())
+    if interval == 'month':
+        return day.replace(day=1)
+    return day
+
+
+def _next_period(start, interval):
+    if interval == 'week':
+        return start + timedelta(days=7)
+    if interval == 'month':
+        return date(start.year + start.month // 12, start.month % 12 + 1, 1)
+    return start + timedelta(days=1)
+
+
+def period_label(start, interval):
+    return start.strftime('%Y-%m') if interval == 'month' else start.isoformat()
+
+
+def series(name, interval, start, end, group_by=None):
+    """
+    Read `name` from daily_rollups between `start` and `end` (inclusive)
+    bucketed per day / week (Monday) / month.  Every period in the range
+    is present, with zeros where nothing happened.  With group_by, each
+    point also has a breakdown {raw dimension value: count}.
+    """
+    cols = [DailyRollup.day, func.sum(DailyRollup.count), func.sum(DailyRollup.amount)]
+    group_cols = [DailyRollup.day]
+    if group_by:
+        dim = getattr(DailyRollup, GROUP_BY[name][group_by])
+        cols.insert(1, dim)
+        group_cols.append(dim)
+    rows = db.session.query(*cols).filter(
+        DailyRollup.metric == name, DailyRollup.day >= start, DailyRollup.day <= end
+    ).group_by(*group_cols).all()
+
+    points = OrderedDict()
+    p = period_start(start, interval)
+    while p <= end:
+        points[p] = {'period': period_label(p, interval), 'count': 0, 'amount': 0.0}
+        if group_by:
+            points[p]['breakdown'] = {}
+        p = _next_period(p, interval)
+
+    for r in rows:
+        point = points[period_start(r[0], interval)]
+        n, amt = int(r[-2] or 0), float(r[-1] or 0)
+        point['count'] += n
+        point['amount'] += amt
+        if group_by:
+            point['breakdown'][r[1]] = point['breakdown'].get(r[1], 0) + n
+
+    result = list(points.values())
+    for point in result:
+        point['amount'] = round(point['amount'], 2)
+        if name != 'revenue':
+            del point['amount']
+    return result
+
+
+def totals(name, dim='dim1', since=None):
+    """{dimension value: count} summed over all days (or days >= since)."""
+    col = getattr(DailyRollup, dim)
+    query = db.session.query(col, func.sum(DailyRollup.count)).filter(DailyRollup.metric == name)
+    if since is not None:
+        query = query.filter(DailyRollup.day >= since)
+    return {value: int(n or 0) for value, n in query.group_by(col).all()}
+
+
+@click.command('rollup-analytics')
+@click.option('--rebuild', 'full', is_flag=True, help='Discard existing rollups and recompute everything.')
+@with_appcontext
+def rollup_analytics_command(full):
+    """Update daily analytics rollups from the last watermark."""
+    result = rebuild() if full else refresh()
+    if result is None:
+        click.echo('Another process is refreshing the rollups; skipped.')
+        return
+    for name, days in result.items():
+        click.echo(f"{name:12s} {days} day(s) recomputed")
@@ -1,8 +1,17 @@
 from datetime import datetime
-from flask import Blueprint, request, jsonify
+from sqlalchemy import func
+from sqlalchemy.orm import joinedload
+from flask import Blueprint, request, jsonify, current_app
 from flask_jwt_extended import jwt_required, get_jwt_identity, get_jwt
 from extensions import db
-from models import ServiceRequest, Grievance, GrievanceUpdate, Payment, User, Admin, AnalyticsLog
+from models import ServiceRequest, Grievance, GrievanceUpdate, Payment, User, Admin, AnalyticsLog, JobCheckpoint, GrievanceCluster, ServiceCategory, Document
+import stats
+import grievance_reclassify
+import grievance_clusters
+import catalogue
+import upload_store
+import file_delivery
+from pagination import paginate, estimated_row_count
 
 admin_bp = Blueprint('admin', __name__)
 
@@ -17,39 +26,26 @@ def dashboard():
     if not require_admin():
         return jsonify({'success': False, 'message': 'Admin access required'}), 403
 
-    total_requests = ServiceRequest.query.count()
-    pending = ServiceRequest.query.filter_by(status='pending').count()
-    approved = ServiceRequest.query.filter_by(status='approved').count()
-    completed = ServiceRequest.query.filter_by(status='completed').count()
-    rejected = ServiceRequest.query.filter_by(status='rejected').count()
-
-    total_grievances = Grievance.query.count()
-    open_grievances = Grievance.query.filter_by(status='open').count()
-    escalated = Grievance.query.filter_by(status='escalated').count()
-
-    total_users = User.query.count()
-
-    from sqlalchemy import func
-    revenue = db.session.query(func.sum(Payment.amount)).filter_by(status='success').scalar() or 0
+    snap = stats.snapshot()
 
     return jsonify({
         'success': True,
         'stats': {
             'service_requests': {
-                'total': total_requests,
-                'pending': pending,
-                'approved': approved,
-                'completed': completed,
-                'rejected': rejected
+                'total': stats.count(snap, 'service_requests'),
+                'pending': stats.count(snap, 'service_requests', 'pending'),
+                'approved': stats.count(snap, 'service_requests', 'approved'),
+                'completed': stats.count(snap, 'service_requests', 'completed'),
+                'rejected': stats.count(snap, 'service_requests', 'rejected')
             },
             'grievances': {
-                'total': total_grievances,
-                'open': open_grievances,
-                'escalated': escalated,
-                'resolved': Grievance.query.filter_by(status='resolved').count()
+                'total': stats.count(snap, 'grievances'),
+                'open': stats.count(snap, 'grievances', 'open'),
+                'escalated': stats.count(snap, 'grievances', 'escalated'),
+                'resolved': stats.count(snap, 'grievances', 'resolved')
             },
-            'users': {'total': total_users},
-            'revenue': {'total': float(revenue)}
+            'users': {'total': stats.count(snap, 'users')},
+            'revenue': {'total': stats.amount(snap, 'payments', 'success')}
         }
     }), 200
 
@@ -61,18 +57,24 @@ def list_requests():
         return jsonify({'success': False, 'message': 'Admin access required'}), 403
 
     status = request.args.get('status')
-    page = request.args.get('page', 1, type=int)
 
-    query = ServiceRequest.query
+    query = ServiceRequest.query.options(
+        joinedload(ServiceRequest.category),
+        joinedload(ServiceRequest.user).load_only(User.full_name, User.mobile)
+    )
     if status:
         query = query.filter_by(status=status)
 
-    pagination = query.order_by(ServiceRequest.submitted_at.desc()).paginate(
-        page=page, per_page=20, error_out=False
-    )
+    try:
+        items, page_meta = paginate(
+            query, ServiceRequest.submitted_at, ServiceRequest.id, per_page=20,
+            estimate=lambda: stats.get_count('service_requests', status or stats.TOTAL)
+        )
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
 
     requests_data = []
-    for r in pagination.items:
+    for r in items:
         d = r.to_dict()
         if r.user:
             d['user'] = {'full_name': r.user.full_name, 'mobile': r.user.mobile}
@@ -81,8 +83,7 @@ def list_requests():
     return jsonify({
         'success': True,
         'requests': requests_data,
-        'total': pagination.total,
-        'pages': pagination.pages
+        **page_meta
     }), 200
 
 
@@ -100,10 +101,13 @@ def update_request(request_id):
     if new_status not in valid_statuses:
         return jsonify({'success': False, 'message': 'Invalid status'}), 400
 
-    service_req = ServiceRequest.query.get(request_id)
+    # Row lock: two officers updating the same request must not both move
+    # the counters out of the status they read
+    service_req = ServiceRequest.query.filter_by(id=request_id).with_for_update().first()
     if not service_req:
         return jsonify({'success': False, 'message': 'Request not found'}), 404
 
+    stats.record_transition('service_requests', service_req.status, new_status)
     service_req.status = new_status
     service_req.remarks = remarks
     service_req.assigned_to = get_jwt_identity()
@@ -121,6 +125,56 @@ def update_request(request_id):
     }), 200
 
 
+@admin_bp.route('/requests/<request_id>/documents', methods=['GET'])
+@jwt_required()
+def list_request_documents(request_id):
+    if not require_admin():
+        return jsonify({'success': False, 'message': 'Admin access required'}), 403
+
+    docs = Document.query.filter_by(request_id=request_id).order_by(Document.uploaded_at).all()
+    return jsonify({'success': True, 'documents': [d.to_dict() for d in docs]}), 200
+
+
+DOCUMENT_VARIANTS = ('thumbnail', 'preview', 'original')
+
+
+@admin_bp.route('/documents/<document_id>/file', methods=['GET'])
+@jwt_required()
+def document_file(document_id):
+    """The thumbnail by default; ?variant=preview for the readable copy, original for the upload itself."""
+    if not require_admin():
+        return jsonify({'success': False, 'message': 'Admin access required'}), 403
+
+    variant = request.args.get('variant', 'thumbnail')
+    if variant not in DOCUMENT_VARIANTS:
+        return jsonify({'success': False, 'message': f"variant must be one of {', '.join(DOCUMENT_VARIANTS)}"}), 400
+
+    doc = db.session.get(Document, document_id)
+    if not doc or not doc.file_path:
+        return jsonify({'success': False, 'message': 'Document not found'}), 404
+
+    if variant == 'thumbnail':
+        if doc.thumbnail_size is None:
+            return jsonify({'success': False, 'message': 'No thumbnail for this document'}), 404
+        relative = upload_store.derived_relative_path(doc.sha256, 'thumbnail')
+    elif variant == 'preview' and doc.preview_size is not None:
+        relative = upload_store.derived_relative_path(doc.sha256, 'preview')
+    else:
+        variant = 'original'        # no smaller copy than the upload itself
+        relative = doc.file_path
+
+    # contents never change for a document id; officers' browsers may keep them
+    if variant == 'original':
+        response = file_delivery.send('uploads', relative, mimetype=doc.file_type or None,
+                                      download_name=doc.file_name, max_age=86400)
+    else:
+        response = file_delivery.send('uploads', relative, mimetype='image/jpeg',
+                                      download_name=f"{variant}_{doc.file_name}.jpg", max_age=86400)
+    if response is None:
+        return jsonify({'success': False, 'message': 'File not found'}), 404
+    return response
+
+
 @admin_bp.route('/grievances', methods=['GET'])
 @jwt_required()
 def list_grievances():
@@ -129,20 +183,25 @@ def list_grievances():
 
     status = request.args.get('status')
     category = request.args.get('category')
-    page = request.args.get('page', 1, type=int)
 
-    query = Grievance.query
+    query = Grievance.query.options(
+        joinedload(Grievance.user).load_only(User.full_name, User.mobile)
+    )
     if status:
         query = query.filter_by(status=status)
     if category:
         query = query.filter_by(category=category)
 
-    pagination = query.order_by(Grievance.submitted_at.desc()).paginate(
-        page=page, per_page=20, error_out=False
-    )
+    try:
+        items, page_meta = paginate(
+            query, Grievance.submitted_at, Grievance.id, per_page=20,
+            estimate=None if category else lambda: stats.get_count('grievances', status or stats.TOTAL)
+        )
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
 
     grievances_data = []
-    for g in pagination.items:
+    for g in items:
         d = g.to_dict()
         if g.user:
             d['user'] = {'full_name': g.user.full_name, 'mobile': g.user.mobile}
@@ -151,8 +210,7 @@ def list_grievances():
     return jsonify({
         'success': True,
         'grievances': grievances_data,
-        'total': pagination.total,
-        'pages': pagination.pages
+        **page_meta
     }), 200
 
 
@@ -167,15 +225,18 @@ def update_grievance(grievance_id):
     update_text = data.get('update_text', '')
     escalate = data.get('escalate', False)
 
-    grievance = Grievance.query.get(grievance_id)
+    # Locked like update_request: the old status feeds the dashboard counters
+    grievance = Grievance.query.filter_by(id=grievance_id).with_for_update().first()
     if not grievance:
         return jsonify({'success': False, 'message': 'Grievance not found'}), 404
 
+    old_status = grievance.status
     if new_status:
         grievance.status = new_status
     if escalate:
         grievance.escalation_level += 1
         grievance.status = 'escalated'
+    stats.record_transition('grievances', old_status, grievance.status)
 
     grievance.assigned_to = get_jwt_identity()
     grievance.updated_at = datetime.utcnow()
@@ -199,13 +260,209 @@ def update_grievance(grievance_id):
     }), 200
 
 
+@admin_bp.route('/grievances/reclassify', methods=['GET'])
+@jwt_required()
+def reclassify_status():
+    if not require_admin():
+        return jsonify({'success': False, 'message': 'Admin access required'}), 403
+    checkpoint = db.session.get(JobCheckpoint, grievance_reclassify.checkpoint_name())
+    return jsonify({
+        'success': True,
+        'lexicon_version': grievance_reclassify.lexicon_version(),
+        'running': grievance_reclassify.is_running(),
+        'checkpoint': checkpoint.to_dict() if checkpoint else None,
+        'total_grievances': stats.get_count('grievances')
+    }), 200
+
+
+@admin_bp.route('/grievances/reclassify', methods=['POST'])
+@jwt_required()
+def reclassify_grievances():
+    if get_jwt().get('role') not in ['admin', 'superadmin']:
+        return jsonify({'success': False, 'message': 'Admin access required'}), 403
+
+    data = request.get_json(silent=True) or {}
+    if data.get('dry_run', True):
+        sample = min(int(data.get('sample', 1000)), 10000)
+        summary = grievance_reclassify.reclassify(dry_run=True, limit=sample, processes=1)
+        if summary is None:
+            return jsonify({'success': False, 'message': 'A re-classification pass is already running'}), 409
+        return jsonify({'success': True, 'summary': summary}), 200
+
+    if not grievance_reclassify.start_background(current_app._get_current_object()):
+        return jsonify({'success': False, 'message': 'A re-classification pass is already running'}), 409
+    return jsonify({
+        'success': True,
+        'message': 'Re-classification started',
+        'lexicon_version': grievance_reclassify.lexicon_version(),
+        'status_url': '/api/admin/grievances/reclassify'
+    }), 202
+
+
+@admin_bp.route('/grievance-clusters', methods=['GET'])
+@jwt_required()
+def list_grievance_clusters():
+    if not require_admin():
+        return jsonify({'success': False, 'message': 'Admin access required'}), 403
+
+    min_size = request.args.get('min_size', 2, type=int)
+    category = request.args.get('category')
+
+    query = GrievanceCluster.query.filter(GrievanceCluster.size >= min_size)
+    if category:
+        query = query.filter_by(category=category)
+
+    try:
+        items, page_meta = paginate(query, GrievanceCluster.last_seen, GrievanceCluster.id, per_page=20)
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+
+    open_counts = dict(db.session.query(Grievance.cluster_id, func.count(Grievance.id)).filter(
+        Grievance.cluster_id.in_([c.id for c in items]),
+        Grievance.status.in_(grievance_clusters.OPEN_STATUSES)
+    ).group_by(Grievance.cluster_id).all()) if items else {}
+
+    return jsonify({
+        'success': True,
+        'clusters': [{**c.to_dict(), 'open_count': open_counts.get(c.id, 0)} for c in items],
+        **page_meta
+    }), 200
+
+
+@admin_bp.route('/grievance-clusters/<cluster_id>', methods=['GET'])
+@jwt_required()
+def get_grievance_cluster(cluster_id):
+    if not require_admin():
+        return jsonify({'success': False, 'message': 'Admin access required'}), 403
+
+    cluster = db.session.get(GrievanceCluster, cluster_id)
+    if not cluster:
+        return jsonify({'success': False, 'message': 'Cluster not found'}), 404
+
+    query = Grievance.query.options(
+        joinedload(Grievance.user).load_only(User.full_name, User.mobile)
+    ).filter_by(cluster_id=cluster_id)
+    try:
+        items, page_meta = paginate(query, Grievance.submitted_at, Grievance.id, per_page=50)
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+
+    grievances_data = []
+    for g in items:
+        d = g.to_dict()
+        if g.user:
+            d['user'] = {'full_name': g.user.full_name, 'mobile': g.user.mobile}
+        grievances_data.append(d)
+
+    return jsonify({
+        'success': True,
+        'cluster': cluster.to_dict(),
+        'grievances': grievances_data,
+        **page_meta
+    }), 200
+
+
+@admin_bp.route('/grievance-clusters/<cluster_id>/update', methods=['PUT'])
+@jwt_required()
+def update_grievance_cluster(cluster_id):
+    if not require_admin():
+        return jsonify({'success': False, 'message': 'Admin access required'}), 403
+
+    data = request.get_json()
+    new_status = data.get('status')
+    escalate = data.get('escalate', False)
+    if not new_status and not escalate:
+        return jsonify({'success': False, 'message': 'status or escalate required'}), 400
+
+    cluster = db.session.get(GrievanceCluster, cluster_id)
+    if not cluster:
+        return jsonify({'success': False, 'message': 'Cluster not found'}), 404
+
+    updated = grievance_clusters.apply_update(
+        cluster_id, get_jwt_identity(), status=new_status, update_text=data.get('update_text', ''),
+        escalate=escalate, only_open=data.get('only_open', True)
+    )
+
+    return jsonify({
+        'success': True,
+        'message': f'{updated} grievances updated',
+        'updated': updated,
+        'cluster': cluster.to_dict()
+    }), 200
+
+
+CATEGORY_FIELDS = ['name_en', 'name_hi', 'name_mr', 'description', 'icon', 'fee', 'processing_days',
+                   'required_docs', 'is_active']
+
+
+def _category_values(data):
+    """Editable category fields from a request body; raises ValueError on bad fee / days."""
+    values = {k: data[k] for k in CATEGORY_FIELDS if k in data}
+    if 'fee' in values:
+        values['fee'] = float(values['fee'])
+        if values['fee'] < 0:
+            raise ValueError('fee must not be negative')
+    if 'processing_days' in values:
+        values['processing_days'] = int(values['processing_days'])
+        if values['processing_days'] < 1:
+            raise ValueError('processing_days must be at least 1')
+    if 'name_en' in values and not (values['name_en'] or '').strip():
+        raise ValueError('name_en is required')
+    return values
+
+
+@admin_bp.route('/categories', methods=['POST'])
+@jwt_required()
+def create_category():
+    if get_jwt().get('role') not in ['admin', 'superadmin']:
+        return jsonify({'success': False, 'message': 'Admin access required'}), 403
+
+    data = request.get_json(silent=True) or {}
+    if not data.get('name_en'):
+        return jsonify({'success': False, 'message': 'name_en is required'}), 400
+    try:
+        category = ServiceCategory(**_category_values(data))
+    except (TypeError, ValueError) as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+
+    db.session.add(category)
+    catalogue.bump()
+    db.session.commit()
+    catalogue.invalidate()
+
+    return jsonify({'success': True, 'category': category.to_dict()}), 201
+
+
+@admin_bp.route('/categories/<int:category_id>', methods=['PUT'])
+@jwt_required()
+def update_category(category_id):
+    if get_jwt().get('role') not in ['admin', 'superadmin']:
+        return jsonify({'success': False, 'message': 'Admin access required'}), 403
+
+    category = db.session.get(ServiceCategory, category_id)
+    if not category:
+        return jsonify({'success': False, 'message': 'Category not found'}), 404
+
+    try:
+        values = _category_values(request.get_json(silent=True) or {})
+    except (TypeError, ValueError) as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    for key, value in values.items():
+        setattr(category, key, value)
+
+    catalogue.bump()
+    db.session.commit()
+    catalogue.invalidate()
+
+    return jsonify({'success': True, 'category': category.to_dict()}), 200
+
+
 @admin_bp.route('/users', methods=['GET'])
 @jwt_required()
 def list_users():
     if not require_admin():
         return jsonify({'success': False, 'message': 'Admin access required'}), 403
 
-    page = request.args.get('page', 1, type=int)
     search = request.args.get('search', '')
 
     query = User.query
@@ -215,15 +472,18 @@ def list_users():
             (User.mobile.ilike(f'%{search}%'))
         )
 
-    pagination = query.order_by(User.created_at.desc()).paginate(
-        page=page, per_page=20, error_out=False
-    )
+    try:
+        items, page_meta = paginate(
+            query, User.created_at, User.id, per_page=20,
+            estimate=None if search else lambda: stats.get_count('users') or estimated_row_count(User)
+        )
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
 
     return jsonify({
         'success': True,
-        'users': [u.to_dict() for u in pagination.items],
-        'total': pagination.total,
-        'pages': pagination.pages
+        'users': [u.to_dict() for u in items],
+        **page_meta
     }), 200
 
 
@@ -1,52 +1,56 @@
+from datetime import date, datetime, timedelta
 from flask import Blueprint, request, jsonify
-from flask_jwt_extended import jwt_required, get_jwt_identity
+from flask_jwt_extended import jwt_required, get_jwt
 from extensions import db
-from models import ServiceRequest, Grievance, Payment, User, AnalyticsLog
-from sqlalchemy import func, cast, Date
+from models import ServiceCategory
+import stats
+import rollups
+import analytics_events
 
 analytics_bp = Blueprint('analytics', __name__)
 
-def require_admin(identity):
-    return identity.get('role') in ['admin', 'superadmin', 'officer']
+def require_admin():
+    return get_jwt().get('role') in ['admin', 'superadmin', 'officer']
+
+
+def _statuses(snap, entity):
+    return {status: v['count'] for status, v in snap.get(entity, {}).items()
+            if status != stats.TOTAL and v['count'] > 0}
+
+
+def _category_names():
+    return {str(c.id): c.name_en for c in db.session.query(ServiceCategory.id, ServiceCategory.name_en)}
+
+
+def _label(metric, group_by, value, names):
+    if metric == 'requests' and group_by == 'category':
+        return names.get(value, 'Uncategorized')
+    if value == '':
+        return 'unknown' if group_by in ('priority', 'status') else 'Uncategorized'
+    return value
 
 
 @analytics_bp.route('/overview', methods=['GET'])
 @jwt_required()
 def overview():
-    identity = get_jwt_identity()
-    if not require_admin(identity):
+    if not require_admin():
         return jsonify({'success': False, 'message': 'Admin access required'}), 403
 
-    # Service requests by status
-    req_by_status = db.session.query(
-        ServiceRequest.status,
-        func.count(ServiceRequest.id).label('count')
-    ).group_by(ServiceRequest.status).all()
-
-    # Grievances by category
-    grv_by_category = db.session.query(
-        Grievance.category,
-        func.count(Grievance.id).label('count')
-    ).group_by(Grievance.category).all()
-
-    # Revenue total
-    total_revenue = db.session.query(func.sum(Payment.amount)).filter_by(status='success').scalar() or 0
-
-    # Users registered over time (last 30 days)
-    from datetime import datetime, timedelta
-    thirty_days_ago = datetime.utcnow() - timedelta(days=30)
-    new_users = User.query.filter(User.created_at >= thirty_days_ago).count()
+    rollups.refresh_if_stale()
+    snap = stats.snapshot()
+    grv_by_category = rollups.totals('grievances', 'dim1')
+    new_users = sum(rollups.totals('users', since=date.today() - timedelta(days=30)).values())
 
     return jsonify({
         'success': True,
         'analytics': {
-            'service_requests_by_status': {r.status: r.count for r in req_by_status},
-            'grievances_by_category': {g.category or 'Uncategorized': g.count for g in grv_by_category},
-            'total_revenue': float(total_revenue),
+            'service_requests_by_status': _statuses(snap, 'service_requests'),
+            'grievances_by_category': {c or 'Uncategorized': n for c, n in grv_by_category.items()},
+            'total_revenue': stats.amount(snap, 'payments', 'success'),
             'new_users_last_30_days': new_users,
-            'total_users': User.query.count(),
-            'total_requests': ServiceRequest.query.count(),
-            'total_grievances': Grievance.query.count()
+            'total_users': stats.count(snap, 'users'),
+            'total_requests': stats.count(snap, 'service_requests'),
+            'total_grievances': stats.count(snap, 'grievances')
         }
     }), 200
 
@@ -54,45 +58,105 @@ def overview():
 @analytics_bp.route('/service-trends', methods=['GET'])
 @jwt_required()
 def service_trends():
-    identity = get_jwt_identity()
-    if not require_admin(identity):
+    if not require_admin():
         return jsonify({'success': False, 'message': 'Admin access required'}), 403
 
-    from models import ServiceCategory
-    service_usage = db.session.query(
-        ServiceCategory.name_en,
-        func.count(ServiceRequest.id).label('count')
-    ).join(ServiceRequest, ServiceRequest.category_id == ServiceCategory.id)\
-     .group_by(ServiceCategory.name_en)\
-     .order_by(func.count(ServiceRequest.id).desc()).all()
+    rollups.refresh_if_stale()
+    names = _category_names()
+    usage = {}
+    for category_id, n in rollups.totals('requests', 'dim1').items():
+        if category_id in names and n:
+            usage[names[category_id]] = usage.get(names[category_id], 0) + n
 
     return jsonify({
         'success': True,
-        'service_trends': [{'service': s.name_en, 'count': s.count} for s in service_usage]
+        'service_trends': [{'service': name, 'count': n}
+                           for name, n in sorted(usage.items(), key=lambda kv: kv[1], reverse=True)]
     }), 200
 
 
 @analytics_bp.route('/grievance-trends', methods=['GET'])
 @jwt_required()
 def grievance_trends():
-    identity = get_jwt_identity()
-    if not require_admin(identity):
+    if not require_admin():
         return jsonify({'success': False, 'message': 'Admin access required'}), 403
 
-    by_priority = db.session.query(
-        Grievance.ai_priority,
-        func.count(Grievance.id).label('count')
-    ).group_by(Grievance.ai_priority).all()
-
-    by_status = db.session.query(
-        Grievance.status,
-        func.count(Grievance.id).label('count')
-    ).group_by(Grievance.status).all()
+    rollups.refresh_if_stale()
+    by_priority = rollups.totals('grievances', 'dim2')
 
     return jsonify({
         'success': True,
         'grievance_trends': {
-            'by_priority': {g.ai_priority or 'unknown': g.count for g in by_priority},
-            'by_status': {g.status: g.count for g in by_status}
+            'by_priority': {p or 'unknown': n for p, n in by_priority.items()},
+            'by_status': _statuses(stats.snapshot(), 'grievances')
         }
     }), 200
+
+
+@analytics_bp.route('/timeseries', methods=['GET'])
+@jwt_required()
+def timeseries_index():
+    if not require_admin():
+        return jsonify({'success': False, 'message': 'Admin access required'}), 403
+    return jsonify({
+        'success': True,
+        'metrics': {name: sorted(options) for name, options in rollups.GROUP_BY.items()},
+        'intervals': list(rollups.INTERVALS)
+    }), 200
+
+
+@analytics_bp.route('/timeseries/<metric>', methods=['GET'])
+@jwt_required()
+def timeseries(metric):
+    if not require_admin():
+        return jsonify({'success': False, 'message': 'Admin access required'}), 403
+    if metric not in rollups.METRICS:
+        return jsonify({'success': False, 'message': f"Unknown metric; use one of {', '.join(rollups.METRICS)}"}), 404
+
+    interval = request.args.get('interval', 'day')
+    group_by = request.args.get('group_by') or None
+    if interval not in rollups.INTERVALS:
+        return jsonify({'success': False, 'message': 'interval must be day, week or month'}), 400
+    if group_by is not None and group_by not in rollups.GROUP_BY[metric]:
+        return jsonify({'success': False, 'message': f"group_by not supported for {metric}"}), 400
+
+    try:
+        end = datetime.strptime(request.args['to'], '%Y-%m-%d').date() if request.args.get('to') else date.today()
+        if request.args.get('from'):
+            start = datetime.strptime(request.args['from'], '%Y-%m-%d').date()
+        elif interval == 'month':
+            start = date(end.year - 1, end.month, 1) + timedelta(days=31)
+            start = start.replace(day=1)
+        elif interval == 'week':
+            start = end - timedelta(weeks=11)
+        else:
+            start = end - timedelta(days=29)
+    except ValueError:
+        return jsonify({'success': False, 'message': 'Dates must be YYYY-MM-DD'}), 400
+    if start > end or (end - start).days > 3660:
+        return jsonify({'success': False, 'message': 'Invalid date range (max 10 years)'}), 400
+
+    rollups.refresh_if_stale()
+    points = rollups.series(metric, interval, start, end, group_by)
+    if group_by:
+        names = _category_names() if metric == 'requests' else {}
+        for point in points:
+            point['breakdown'] = {_label(metric, group_by, k, names): v for k, v in point['breakdown'].items()}
+
+    return jsonify({
+        'success': True,
+        'metric': metric,
+        'interval': interval,
+        'group_by': group_by,
+        'from': start.isoformat(),
+        'to': end.isoformat(),
+        'series': points
+    }), 200
+
+
+@analytics_bp.route('/pipeline', methods=['GET'])
+@jwt_required()
+def pipeline_stats():
+    if not require_admin():
+        return jsonify({'success': False, 'message': 'Admin access required'}), 403
+    return jsonify({'success': True, 'pipeline': analytics_events.stats()}), 200
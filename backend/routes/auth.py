@@ -1,17 +1,20 @@
-import random
+import secrets
 import string
 import bcrypt
 from datetime import datetime, timedelta
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import create_access_token, jwt_required, get_jwt_identity, get_jwt
 from extensions import db
-from models import User, OTPLog, AnalyticsLog
+from models import User
 from config import Config
+import stats
+import analytics_events
+import otp_store
 
 auth_bp = Blueprint('auth', __name__)
 
 def generate_otp():
-    return ''.join(random.choices(string.digits, k=6))
+    return ''.join(secrets.choice(string.digits) for _ in range(Config.OTP_LENGTH))
 
 @auth_bp.route('/send-otp', methods=['POST'])
 def send_otp():
@@ -21,15 +24,10 @@ def send_otp():
     if not mobile or len(mobile) != 10 or not mobile.isdigit():
         return jsonify({'success': False, 'message': 'Invalid mobile number'}), 400
 
-    OTPLog.query.filter_by(mobile=mobile, is_used=False).update({'is_used': True})
-    db.session.commit()
-
     otp = '123456' if Config.MOCK_OTP else generate_otp()
-    expires_at = datetime.utcnow() + timedelta(minutes=Config.OTP_EXPIRY_MINUTES)
-
-    otp_log = OTPLog(mobile=mobile, otp_code=otp, expires_at=expires_at, purpose='login')
-    db.session.add(otp_log)
-    db.session.commit()
+    ttl = Config.OTP_EXPIRY_MINUTES * 60
+    otp_store.store.issue(mobile, otp, ttl)
+    otp_store.audit(mobile, 'login', datetime.utcnow() + timedelta(seconds=ttl))
 
     response = {'success': True, 'message': f'OTP sent to {mobile}'}
     if Config.MOCK_OTP:
@@ -47,21 +45,18 @@ def verify_otp():
     if not mobile or not otp:
         return jsonify({'success': False, 'message': 'Mobile and OTP required'}), 400
 
-    otp_record = OTPLog.query.filter_by(
-        mobile=mobile,
-        otp_code=otp,
-        is_used=False
-    ).order_by(OTPLog.created_at.desc()).first()
+    user = User.query.filter_by(mobile=mobile).first()
+    # A new user without a name only gets the code checked, not consumed,
+    # so the same OTP can be resubmitted together with full_name.
+    status, attempts_left = otp_store.store.verify(mobile, otp, consume=bool(user or full_name))
 
-    if not otp_record:
-        return jsonify({'success': False, 'message': 'Invalid OTP'}), 401
-    if otp_record.expires_at < datetime.utcnow():
-        return jsonify({'success': False, 'message': 'OTP expired'}), 401
+    if status == otp_store.INVALID:
+        return jsonify({'success': False, 'message': 'Invalid OTP', 'attempts_left': attempts_left}), 401
+    if status == otp_store.LOCKED:
+        return jsonify({'success': False, 'message': 'Too many attempts, OTP expired. Please request a new OTP'}), 401
+    if status == otp_store.EXPIRED:
+        return jsonify({'success': False, 'message': 'OTP expired. Please request a new OTP'}), 401
 
-    otp_record.is_used = True
-    db.session.commit()
-
-    user = User.query.filter_by(mobile=mobile).first()
     is_new = False
 
     if not user:
@@ -69,22 +64,19 @@ def verify_otp():
             return jsonify({'success': False, 'message': 'Full name required for registration'}), 400
         user = User(mobile=mobile, full_name=full_name)
         db.session.add(user)
+        stats.record_insert('users')
         db.session.commit()
         is_new = True
 
+    otp_store.audit(mobile, 'login', datetime.utcnow(), is_used=True)
+
     token = create_access_token(
         identity=user.id,
         additional_claims={'role': 'user'}
     )
 
-    log = AnalyticsLog(
-        event_type='user_login',
-        user_id=user.id,
-        event_data={'mobile': mobile},
-        ip_address=request.remote_addr
-    )
-    db.session.add(log)
-    db.session.commit()
+    analytics_events.emit('user_login', user_id=user.id, event_data={'mobile': mobile},
+                          ip_address=request.remote_addr)
 
     return jsonify({
         'success': True,
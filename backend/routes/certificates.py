@@ -1,119 +1,35 @@
 import os
-import random
-import string
-import qrcode
-import base64
+import json
+import uuid
 from datetime import datetime, date, timedelta
-from io import BytesIO
-from flask import Blueprint, request, jsonify, send_file
+from flask import Blueprint, request, jsonify, Response
 from flask_jwt_extended import jwt_required, get_jwt_identity, get_jwt
-from reportlab.lib.pagesizes import A4
-from reportlab.lib import colors
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, Image as RLImage
-from reportlab.lib.units import cm
+from sqlalchemy.orm import joinedload
 from extensions import db
-from models import Certificate, ServiceRequest, User
+from models import Certificate, CertificateJob, ServiceRequest, User
 from config import Config
+from certificate_pdf import generate_qr_code
+from cache import TTLCache, SharedVersion, MISSING
+from rate_limit import TokenBucketLimiter
+import rate_limit
+import jobs
+import certificate_batch
+import certificate_signing
+import file_delivery
+import reference_numbers
 
 certificates_bp = Blueprint('certificates', __name__)
 
+# certificate_number -> verification record (None = unknown number)
+verify_cache = TTLCache(maxsize=Config.VERIFY_CACHE_SIZE, ttl=Config.VERIFY_CACHE_TTL_SECONDS)
+# bumped on every revocation; each process drops its verify_cache when it moves
+revocations = SharedVersion('certificate_revocations', Config.VERIFY_REVOCATION_CHECK_SECONDS)
+# certificates / minute per client for /verify/batch
+verify_batch_limiter = TokenBucketLimiter(Config.VERIFY_BATCH_ANON_PER_MINUTE, period=60)
+
 
 def generate_certificate_number():
-    year = datetime.utcnow().year
-    suffix = ''.join(random.choices(string.digits, k=8))
-    return f"CERT-{year}-{suffix}"
-
-
-def generate_qr_code(data: str) -> str:
-    qr = qrcode.QRCode(version=1, box_size=6, border=2)
-    qr.add_data(data)
-    qr.make(fit=True)
-    img = qr.make_image(fill_color="black", back_color="white")
-    buffer = BytesIO()
-    img.save(buffer, format='PNG')
-    buffer.seek(0)
-    return base64.b64encode(buffer.getvalue()).decode('utf-8')
-
-
-def generate_certificate_pdf(cert, user, service_req):
-    filename = f"cert_{cert.certificate_number}.pdf"
-    filepath = os.path.join(Config.CERTIFICATE_OUTPUT_DIR, filename)
-
-    doc = SimpleDocTemplate(filepath, pagesize=A4,
-                            rightMargin=2*cm, leftMargin=2*cm,
-                            topMargin=2*cm, bottomMargin=2*cm)
-
-    styles = getSampleStyleSheet()
-    elements = []
-
-    header_style = ParagraphStyle('header', parent=styles['Title'],
-                                   fontSize=16, textColor=colors.darkblue, spaceAfter=6)
-    sub_style = ParagraphStyle('sub', parent=styles['Normal'],
-                                fontSize=11, textColor=colors.grey, spaceAfter=20, alignment=1)
-    body_style = ParagraphStyle('body', parent=styles['Normal'], fontSize=11, spaceAfter=10)
-
-    elements.append(Paragraph("GRAM PANCHAYAT / NAGAR PALIKA", header_style))
-    elements.append(Paragraph("Government of Maharashtra", sub_style))
-    elements.append(Paragraph(f"<b>{cert.certificate_type.upper()}</b>", header_style))
-    elements.append(Spacer(1, 0.5*cm))
-
-    cert_data = [
-        ['Certificate No.', cert.certificate_number],
-        ['Applicant Name', user.full_name],
-        ['Mobile', user.mobile],
-        ['Village/Ward', user.village_ward or 'N/A'],
-        ['District', user.district or 'N/A'],
-        ['Date of Issue', cert.issued_at.strftime('%d/%m/%Y')],
-        ['Valid Until', cert.valid_until.strftime('%d/%m/%Y') if cert.valid_until else 'Permanent'],
-        ['Request No.', service_req.request_number],
-    ]
-
-    table = Table(cert_data, colWidths=[6*cm, 10*cm])
-    table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (0, -1), colors.lightblue),
-        ('TEXTCOLOR', (0, 0), (-1, -1), colors.black),
-        ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, -1), 10),
-        ('ROWBACKGROUNDS', (0, 0), (-1, -1), [colors.whitesmoke, colors.white]),
-        ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
-        ('PADDING', (0, 0), (-1, -1), 8),
-    ]))
-    elements.append(table)
-    elements.append(Spacer(1, 0.5*cm))
-
-    cert_text = (f"This is to certify that {user.full_name}, "
-                 f"resident of {user.village_ward or 'the mentioned locality'}, "
-                 f"{user.district or ''}, Maharashtra, "
-                 f"has been issued this {cert.certificate_type} by the competent authority.")
-    elements.append(Paragraph(cert_text, body_style))
-    elements.append(Spacer(1, 1*cm))
-
-    qr_b64 = generate_qr_code(f"https://panchayat.gov.in/verify/{cert.certificate_number}")
-    qr_data = base64.b64decode(qr_b64)
-    qr_path = os.path.join(Config.CERTIFICATE_OUTPUT_DIR, f"qr_{cert.certificate_number}.png")
-    with open(qr_path, 'wb') as f:
-        f.write(qr_data)
-
-    qr_img = RLImage(qr_path, width=3*cm, height=3*cm)
-    sign_data = [[qr_img, '', Paragraph('<b>Authorized Signatory</b><br/>Gram Panchayat / Nagar Palika<br/>Government of Maharashtra', body_style)]]
-    sign_table = Table(sign_data, colWidths=[4*cm, 6*cm, 6*cm])
-    sign_table.setStyle(TableStyle([
-        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-        ('ALIGN', (2, 0), (2, 0), 'RIGHT'),
-    ]))
-    elements.append(sign_table)
-    elements.append(Spacer(1, 0.3*cm))
-
-    footer_style = ParagraphStyle('footer', parent=styles['Normal'],
-                                   fontSize=8, textColor=colors.grey, alignment=1)
-    elements.append(Paragraph(
-        f"This is a computer-generated certificate. Verify at https://panchayat.gov.in/verify/{cert.certificate_number}",
-        footer_style
-    ))
-
-    doc.build(elements)
-    return filename
+    return reference_numbers.allocate('CERT')
 
 
 @certificates_bp.route('/request/<request_id>', methods=['POST'])
@@ -123,17 +39,37 @@ def request_certificate(request_id):
     if claims.get('role') not in ['admin', 'superadmin', 'officer']:
         return jsonify({'success': False, 'message': 'Admin access required'}), 403
 
-    service_req = ServiceRequest.query.get(request_id)
+    # Lock the request like /bulk does: a concurrent issue waits here and
+    # then finds this certificate as `existing` instead of numbering a second one
+    service_req = ServiceRequest.query.filter_by(id=request_id).with_for_update().first()
     if not service_req:
         return jsonify({'success': False, 'message': 'Service request not found'}), 404
 
     if service_req.status != 'approved':
         return jsonify({'success': False, 'message': 'Request must be approved first'}), 400
 
-    user = User.query.get(service_req.user_id)
+    existing = Certificate.query.filter_by(request_id=request_id).order_by(Certificate.issued_at.desc()).first()
+    if existing and not existing.pdf_path and not existing.revoked_at:
+        job = jobs.active_job_for(existing.id)
+        message = 'Certificate generation already queued'
+        if not job:
+            # Its job failed for good: render the same certificate again
+            # instead of issuing a second number next to a PDF-less one
+            job = jobs.enqueue_certificate(existing)
+            db.session.commit()
+            jobs.ensure_inprocess_workers()
+            message = 'Certificate generation queued again'
+        return jsonify({
+            'success': True,
+            'message': message,
+            'certificate': existing.to_dict(),
+            'job': job.to_dict(),
+            'status_url': f"/api/certificates/jobs/{job.id}",
+            'download_url': f"/api/certificates/download/{existing.id}"
+        }), 202
+
     cert_type = service_req.category.name_en if service_req.category else 'Certificate'
     cert_number = generate_certificate_number()
-    qr_b64 = generate_qr_code(f"https://panchayat.gov.in/verify/{cert_number}")
     admin_id = get_jwt_identity()
 
     cert = Certificate(
@@ -141,25 +77,156 @@ def request_certificate(request_id):
         user_id=service_req.user_id,
         certificate_type=cert_type,
         certificate_number=cert_number,
-        qr_code=qr_b64,
         issued_by=admin_id,
+        issued_at=datetime.utcnow(),
         valid_until=date.today() + timedelta(days=365)
     )
+    cert.qr_code = generate_qr_code(certificate_signing.qr_data(cert, service_req.user.full_name))
     db.session.add(cert)
     db.session.flush()
 
-    pdf_filename = generate_certificate_pdf(cert, user, service_req)
-    cert.pdf_path = pdf_filename
-    service_req.status = 'completed'
-    service_req.resolved_at = datetime.utcnow()
+    job = jobs.enqueue_certificate(cert)
     db.session.commit()
+    jobs.ensure_inprocess_workers()
 
     return jsonify({
         'success': True,
-        'message': 'Certificate generated',
+        'message': 'Certificate generation queued',
         'certificate': cert.to_dict(),
+        'job': job.to_dict(),
+        'status_url': f"/api/certificates/jobs/{job.id}",
         'download_url': f"/api/certificates/download/{cert.id}"
-    }), 201
+    }), 202
+
+
+@certificates_bp.route('/bulk', methods=['POST'])
+@jwt_required()
+def bulk_issue_certificates():
+    claims = get_jwt()
+    if claims.get('role') not in ['admin', 'superadmin', 'officer']:
+        return jsonify({'success': False, 'message': 'Admin access required'}), 403
+
+    data = request.get_json(silent=True) or {}
+    request_ids = data.get('request_ids')
+    category_id = data.get('category_id')
+
+    query = ServiceRequest.query.options(joinedload(ServiceRequest.category), joinedload(ServiceRequest.user))
+    if request_ids:
+        if not isinstance(request_ids, list):
+            return jsonify({'success': False, 'message': 'request_ids must be a list'}), 400
+        request_ids = list(dict.fromkeys(str(i) for i in request_ids))
+        query = query.filter(ServiceRequest.id.in_(request_ids))
+    elif category_id:
+        query = query.filter(ServiceRequest.category_id == category_id, ServiceRequest.status == 'approved')
+        try:
+            if data.get('from'):
+                query = query.filter(ServiceRequest.submitted_at >= datetime.fromisoformat(data['from']))
+            if data.get('to'):
+                query = query.filter(ServiceRequest.submitted_at < datetime.fromisoformat(data['to']) + timedelta(days=1))
+        except (TypeError, ValueError):
+            return jsonify({'success': False, 'message': 'from/to must be YYYY-MM-DD dates'}), 400
+    else:
+        return jsonify({'success': False, 'message': 'request_ids or category_id required'}), 400
+
+    # Claim the rows: a concurrent batch skips them until issue_bulk() has
+    # committed their certificates, and then finds them already issued
+    query = query.order_by(ServiceRequest.submitted_at).limit(Config.BULK_CERTIFICATE_MAX + 1)
+    if db.session.get_bind().dialect.name == 'postgresql':
+        query = query.with_for_update(of=ServiceRequest, skip_locked=True)
+    candidates = query.all()
+    if len(candidates) > Config.BULK_CERTIFICATE_MAX:
+        return jsonify({'success': False,
+                        'message': f'At most {Config.BULK_CERTIFICATE_MAX} certificates per batch'}), 400
+
+    already_issued = {
+        r[0] for r in db.session.query(Certificate.request_id)
+        .filter(Certificate.request_id.in_([c.id for c in candidates])).all()
+    } if candidates else set()
+
+    eligible, skipped = [], []
+    for service_req in candidates:
+        if service_req.status != 'approved':
+            skipped.append({'request_id': service_req.id, 'status': 'skipped', 'reason': 'Request must be approved first'})
+        elif service_req.id in already_issued:
+            skipped.append({'request_id': service_req.id, 'status': 'skipped', 'reason': 'Certificate already issued'})
+        else:
+            eligible.append(service_req)
+    if request_ids:
+        found = {c.id for c in candidates}
+        missing = [i for i in request_ids if i not in found]
+        locked = {
+            r[0] for r in db.session.query(ServiceRequest.id).filter(ServiceRequest.id.in_(missing)).all()
+        } if missing else set()
+        skipped += [{'request_id': i, 'status': 'skipped',
+                     'reason': 'Being issued by another batch' if i in locked else 'Service request not found'}
+                    for i in missing]
+
+    results, elapsed = certificate_batch.issue_bulk(eligible, get_jwt_identity())
+    issued = sum(1 for r in results if r['status'] == 'issued')
+
+    response = {
+        'success': True,
+        'summary': {
+            'requested': len(results) + len(skipped),
+            'issued': issued,
+            'queued': len(results) - issued,
+            'skipped': len(skipped),
+            'elapsed_ms': round(elapsed * 1000, 1),
+            'certificates_per_second': round(issued / elapsed, 2) if elapsed and issued else 0
+        },
+        'items': [{k: v for k, v in r.items() if k != 'pdf_path'} for r in results] + skipped
+    }
+    if data.get('zip') and issued:
+        batch_id = certificate_batch.write_zip(results)
+        response['zip_url'] = f"/api/certificates/bulk/{batch_id}/download"
+    return jsonify(response), 200
+
+
+@certificates_bp.route('/bulk/<batch_id>/download', methods=['GET'])
+@jwt_required()
+def download_bulk_zip(batch_id):
+    claims = get_jwt()
+    if claims.get('role') not in ['admin', 'superadmin', 'officer']:
+        return jsonify({'success': False, 'message': 'Admin access required'}), 403
+
+    try:
+        batch_id = str(uuid.UUID(batch_id))
+    except ValueError:
+        return jsonify({'success': False, 'message': 'Batch not found'}), 404
+
+    response = file_delivery.send('certificates', os.path.basename(certificate_batch.bulk_zip_path(batch_id)),
+                                  mimetype='application/zip', download_name=f"certificates_{batch_id}.zip",
+                                  as_attachment=True)
+    if response is None:
+        return jsonify({'success': False, 'message': 'Batch not found'}), 404
+    return response
+
+
+@certificates_bp.route('/jobs/<job_id>', methods=['GET'])
+@jwt_required()
+def certificate_job_status(job_id):
+    user_id = get_jwt_identity()
+    claims = get_jwt()
+
+    job = CertificateJob.query.get(job_id)
+    if not job:
+        return jsonify({'success': False, 'message': 'Job not found'}), 404
+
+    cert = Certificate.query.get(job.certificate_id)
+    if cert.user_id != user_id and claims.get('role') not in ['admin', 'superadmin', 'officer']:
+        return jsonify({'success': False, 'message': 'Access denied'}), 403
+
+    if job.status == 'queued':
+        jobs.ensure_inprocess_workers()
+
+    response = {
+        'success': True,
+        'job': job.to_dict(),
+        'certificate': cert.to_dict()
+    }
+    if job.status == 'done':
+        response['download_url'] = f"/api/certificates/download/{cert.id}"
+    return jsonify(response), 200
 
 
 @certificates_bp.route('/download/<cert_id>', methods=['GET'])
@@ -175,36 +242,185 @@ def download_certificate(cert_id):
     if cert.user_id != user_id and claims.get('role') not in ['admin', 'superadmin']:
         return jsonify({'success': False, 'message': 'Access denied'}), 403
 
-    filepath = os.path.join(Config.CERTIFICATE_OUTPUT_DIR, cert.pdf_path)
-    if not os.path.exists(filepath):
-        return jsonify({'success': False, 'message': 'Certificate file not found'}), 404
+    if not cert.pdf_path:
+        return jsonify({'success': False, 'message': 'Certificate is still being generated'}), 409
 
-    return send_file(filepath, as_attachment=True, download_name=f"{cert.certificate_number}.pdf")
+    response = file_delivery.send('certificates', cert.pdf_path, mimetype='application/pdf',
+                                  download_name=f"{cert.certificate_number}.pdf", as_attachment=True)
+    if response is None:
+        return jsonify({'success': False, 'message': 'Certificate file not found'}), 404
+    return response
+
+
+def _verification_record(cert, holder_name):
+    return {
+        'certificate_number': cert.certificate_number,
+        'certificate_type': cert.certificate_type,
+        'holder_name': holder_name or 'N/A',
+        'issued_at': cert.issued_at.isoformat(),
+        'valid_until': cert.valid_until,
+        'revoked': cert.revoked_at is not None
+    }
+
+
+def _lookup_verification(cert_number):
+    """Cached verification record for a certificate number, or None if unknown."""
+    if revocations.changed():
+        verify_cache.clear()
+    record = verify_cache.get(cert_number)
+    if record is not MISSING:
+        return record
+
+    row = db.session.query(Certificate, User.full_name)\
+        .outerjoin(User, User.id == Certificate.user_id)\
+        .filter(Certificate.certificate_number == cert_number).first()
+    if not row:
+        verify_cache.set(cert_number, None, ttl=Config.VERIFY_NEGATIVE_TTL_SECONDS)
+        return None
+
+    record = _verification_record(*row)
+    verify_cache.set(cert_number, record)
+    return record
+
+
+def _lookup_verifications(cert_numbers):
+    """Resolve many numbers: cache first, then one IN (...) query joined to users for the rest."""
+    if revocations.changed():
+        verify_cache.clear()
+    records, misses = {}, []
+    for number in cert_numbers:
+        record = verify_cache.get(number)
+        if record is MISSING:
+            misses.append(number)
+        else:
+            records[number] = record
+
+    if misses:
+        rows = db.session.query(Certificate, User.full_name)\
+            .outerjoin(User, User.id == Certificate.user_id)\
+            .filter(Certificate.certificate_number.in_(misses)).all()
+        for cert, holder_name in rows:
+            records[cert.certificate_number] = _verification_record(cert, holder_name)
+            verify_cache.set(cert.certificate_number, records[cert.certificate_number])
+        for number in misses:
+            if number not in records:
+                records[number] = None
+                verify_cache.set(number, None, ttl=Config.VERIFY_NEGATIVE_TTL_SECONDS)
+    return records
+
+
+def _verification_result(record):
+    """(is_valid, certificate dict) for a verification record."""
+    valid_until = record['valid_until']
+    not_expired = valid_until >= date.today() if valid_until else True
+    is_valid = not_expired and not record['revoked']
+    return is_valid, {
+        'certificate_number': record['certificate_number'],
+        'certificate_type': record['certificate_type'],
+        'holder_name': record['holder_name'],
+        'issued_at': record['issued_at'],
+        'valid_until': valid_until.isoformat() if valid_until else None,
+        'status': 'Revoked' if record['revoked'] else ('Valid' if not_expired else 'Expired')
+    }
 
 
 @certificates_bp.route('/verify/<cert_number>', methods=['GET'])
 def verify_certificate(cert_number):
-    cert = Certificate.query.filter_by(certificate_number=cert_number).first()
-    if not cert:
+    record = _lookup_verification(cert_number)
+    if not record:
         return jsonify({'success': False, 'message': 'Certificate not found or invalid'}), 404
 
-    user = User.query.get(cert.user_id)
-    is_valid = cert.valid_until >= date.today() if cert.valid_until else True
-
-    return jsonify({
+    is_valid, certificate = _verification_result(record)
+    response = {
         'success': True,
         'valid': is_valid,
-        'certificate': {
-            'certificate_number': cert.certificate_number,
-            'certificate_type': cert.certificate_type,
-            'holder_name': user.full_name if user else 'N/A',
-            'issued_at': cert.issued_at.isoformat(),
-            'valid_until': cert.valid_until.isoformat() if cert.valid_until else None,
-            'status': 'Valid' if is_valid else 'Expired'
-        }
+        'certificate': certificate
+    }
+
+    token = request.args.get('sig')
+    if token:
+        checked = certificate_signing.verify_token(token, holder_name=record['holder_name'])
+        response['holder_match'] = checked.get('holder_match', False)
+        response['signature_valid'] = (checked['signature_valid'] and checked.get('certificate_number') == cert_number
+                                       and response['holder_match'])
+    return jsonify(response), 200
+
+
+@certificates_bp.route('/verify/batch', methods=['POST'])
+def verify_certificates_batch():
+    try:
+        client, quota = rate_limit.identify_client()
+    except PermissionError as e:
+        return jsonify({'success': False, 'message': str(e)}), 401
+
+    data = request.get_json(silent=True) or {}
+    numbers = data.get('certificate_numbers')
+    if not isinstance(numbers, list) or not numbers:
+        return jsonify({'success': False, 'message': 'certificate_numbers must be a non-empty list'}), 400
+    numbers = list(dict.fromkeys(str(n).strip() for n in numbers if str(n).strip()))
+    if len(numbers) > Config.VERIFY_BATCH_MAX:
+        return jsonify({'success': False,
+                        'message': f'At most {Config.VERIFY_BATCH_MAX} certificates per batch'}), 400
+
+    allowed, remaining, retry_after = verify_batch_limiter.consume(client, cost=len(numbers), capacity=quota)
+    if not allowed:
+        if retry_after is None:
+            return jsonify({'success': False,
+                            'message': f'Batch exceeds your quota of {quota} certificates per minute'}), 429
+        response = jsonify({'success': False, 'message': 'Rate limit exceeded'})
+        response.status_code = 429
+        response.headers['Retry-After'] = str(int(retry_after) + 1)
+        return response
+
+    records = _lookup_verifications(numbers)
+
+    def generate():
+        for number in numbers:
+            record = records.get(number)
+            if not record:
+                line = {'certificate_number': number, 'found': False, 'valid': False}
+            else:
+                is_valid, certificate = _verification_result(record)
+                line = {'certificate_number': number, 'found': True, 'valid': is_valid, 'certificate': certificate}
+            yield json.dumps(line, ensure_ascii=False) + '\n'
+
+    return Response(generate(), mimetype='application/x-ndjson', headers={
+        'X-RateLimit-Limit': str(quota),
+        'X-RateLimit-Remaining': str(remaining)
+    })
+
+
+@certificates_bp.route('/public-key', methods=['GET'])
+def signing_public_key():
+    return jsonify({
+        'success': True,
+        'algorithm': 'Ed25519',
+        'public_key': certificate_signing.public_key_b64(),
+        'token_format': 'GP1.<base64url(number|holder_hash|type|issued|valid_until)>.<base64url(signature)>'
     }), 200
 
 
+@certificates_bp.route('/<cert_id>/revoke', methods=['POST'])
+@jwt_required()
+def revoke_certificate(cert_id):
+    claims = get_jwt()
+    if claims.get('role') not in ['admin', 'superadmin']:
+        return jsonify({'success': False, 'message': 'Admin access required'}), 403
+
+    cert = Certificate.query.get(cert_id)
+    if not cert:
+        return jsonify({'success': False, 'message': 'Certificate not found'}), 404
+
+    data = request.get_json(silent=True) or {}
+    cert.revoked_at = datetime.utcnow()
+    cert.revocation_reason = data.get('reason', '')
+    revocations.bump()
+    db.session.commit()
+    verify_cache.pop(cert.certificate_number)
+
+    return jsonify({'success': True, 'message': 'Certificate revoked', 'certificate': cert.to_dict()}), 200
+
+
 @certificates_bp.route('/my-certificates', methods=['GET'])
 @jwt_required()
 def my_certificates():
@@ -1,61 +1,130 @@
-from flask import Blueprint, request, jsonify
-from flask_jwt_extended import jwt_required, get_jwt_identity, verify_jwt_in_request
-from extensions import db
+import re
+import json
+from flask import Blueprint, request, jsonify, Response, stream_with_context
+from flask_jwt_extended import jwt_required, get_jwt_identity, get_jwt, verify_jwt_in_request
 from models import ChatLog
 from config import Config
+from cache import TTLCache, MISSING
+import cohere_client
+import chat_logs
+import chat_sessions
+import service_index
 
 chatbot_bp = Blueprint('chatbot', __name__)
 
+# Upstream answers only; fallback answers are cheap and must not outlive an outage
+response_cache = TTLCache(maxsize=Config.CHATBOT_CACHE_SIZE, ttl=Config.CHATBOT_CACHE_TTL_SECONDS)
+
 SYSTEM_CONTEXT = """You are a helpful assistant for Gram Panchayat / Nagar Palika e-governance portal.
 Help citizens with services, applications, grievances, payments, and document requirements.
 Answer in the language the user writes in (Marathi, Hindi, or English).
-Common services: Birth Certificate ₹50/7days, Death Certificate ₹50/7days, Income Certificate ₹30/10days,
-Caste Certificate ₹30/15days, Marriage Certificate ₹100/7days, Water Connection ₹500/30days."""
+Take fees, processing times and required documents only from the provided documents."""
 
 
-def get_cohere_response(user_message, history=None):
-    api_key = Config.COHERE_API_KEY
-    if api_key:
-        try:
-            import cohere
-            co = cohere.Client(api_key)
-            chat_history = []
-            if history:
-                for msg in history[-6:]:
-                    chat_history.append({
-                        "role": "USER" if msg['role'] == 'user' else "CHATBOT",
-                        "message": msg['content']
-                    })
-            response = co.chat(
-                message=user_message,
-                preamble=SYSTEM_CONTEXT,
-                chat_history=chat_history,
-                model='command-r',
-                temperature=0.3
-            )
-            return response.text
-        except Exception as e:
-            print(f"Cohere error: {e}")
-    return fallback_response(user_message)
+def _normalize(text):
+    return ' '.join((text or '').casefold().split()).strip(' ?!.।')
 
 
-def fallback_response(message):
-    msg = message.lower()
+def _cache_key(user_message, history, language):
+    turns = Config.CHATBOT_CACHE_HISTORY_TURNS
+    recent = tuple((msg.get('role'), _normalize(msg.get('content'))) for msg in (history or [])[-turns:]) \
+        if turns else ()
+    # answers are grounded on catalogue fees and documents: a catalogue edit
+    # rebuilds the index, and answers cached before it are no longer found
+    return (service_index.index.version, language, recent, _normalize(user_message))
+
+
+def _chat_history(history):
+    chat_history = []
+    if history:
+        for msg in history[-Config.CHAT_SESSION_MAX_MESSAGES:]:
+            chat_history.append({
+                "role": "USER" if msg['role'] == 'user' else "CHATBOT",
+                "message": msg['content']
+            })
+    return chat_history
+
+
+def _grounding(user_message, history):
+    """Catalogue snippets for the message, plus the previous user turn for follow-up questions."""
+    previous = next((m.get('content', '') for m in reversed(history or []) if m.get('role') == 'user'), '')
+    return service_index.snippets(f"{user_message} {previous}")
+
+
+def get_cohere_response(user_message, history=None, language='en'):
+    local = service_index.answer(user_message, language)
+    if local is not None:
+        return local
+
+    client = cohere_client.get_client()
+    if client is None:
+        return fallback_response(user_message)
+
+    key = _cache_key(user_message, history, language)
+    cached = response_cache.get(key)
+    if cached is not MISSING:
+        return cached
+
+    try:
+        text = client.chat(user_message, preamble=SYSTEM_CONTEXT, chat_history=_chat_history(history),
+                           temperature=0.3, documents=_grounding(user_message, history))
+    except cohere_client.CircuitOpen:
+        return fallback_response(user_message)
+    except cohere_client.UpstreamError as e:
+        print(f"Cohere error: {e}")
+        return fallback_response(user_message)
+    response_cache.set(key, text)
+    return text
+
+
+def _chunks(text, words=3):
+    tokens = re.findall(r'\S+\s*', text)
+    for i in range(0, len(tokens), words):
+        yield ''.join(tokens[i:i + words])
+
 
-    if any(w in msg for w in ['birth', 'janm', 'जन्म']):
-        return "For Birth Certificate: Services → Apply → 'Birth Certificate'. Fee: ₹50, 7 days. Required: Hospital birth slip, parents Aadhar card."
+def stream_response(user_message, history=None, language='en'):
+    """
+    Yield the answer in pieces: text as Cohere's streaming chat produces
+    it, or the catalogue / cached / rule-based answer a few words at a
+    time.  If Cohere fails before sending any text the rule-based answer
+    is used; after that the UpstreamError propagates.
+    """
+    local = service_index.answer(user_message, language)
+    if local is not None:
+        yield from _chunks(local)
+        return
 
-    if any(w in msg for w in ['death', 'mrityu', 'मृत्यू']):
-        return "For Death Certificate: Services → Apply → 'Death Certificate'. Fee: ₹50, 7 days. Required: Hospital death record."
+    client = cohere_client.get_client()
+    if client is None:
+        yield from _chunks(fallback_response(user_message))
+        return
 
-    if any(w in msg for w in ['income', 'aay', 'उत्पन्न']):
-        return "For Income Certificate: Services → Apply → 'Income Certificate'. Fee: ₹30, 10 days. Required: Ration card, salary slip."
+    key = _cache_key(user_message, history, language)
+    cached = response_cache.get(key)
+    if cached is not MISSING:
+        yield from _chunks(cached)
+        return
+
+    parts = []
+    try:
+        for delta in client.chat_stream(user_message, preamble=SYSTEM_CONTEXT, chat_history=_chat_history(history),
+                                        temperature=0.3, documents=_grounding(user_message, history)):
+            parts.append(delta)
+            yield delta
+    except cohere_client.UpstreamError as e:
+        if parts:
+            raise
+        if not isinstance(e, cohere_client.CircuitOpen):
+            print(f"Cohere error: {e}")
+        yield from _chunks(fallback_response(user_message))
+        return
+    response_cache.set(key, ''.join(parts))
 
-    if any(w in msg for w in ['caste', 'jati', 'जात']):
-        return "For Caste Certificate: Services → Apply → 'Caste Certificate'. Fee: ₹30, 15 days."
 
-    if any(w in msg for w in ['marriage', 'vivah', 'विवाह']):
-        return "For Marriage Certificate: Services → Apply → 'Marriage Certificate'. Fee: ₹100, 7 days."
+def fallback_response(message):
+    """Rule-based answers for non-service questions (service questions are answered by service_index)."""
+    msg = message.lower()
 
     if any(w in msg for w in ['track', 'status', 'follow', 'application']):
         return "Track your application: Go to 'Track' menu → Enter your Request Number (REQ-XXXXXXXXXX)."
@@ -83,40 +152,48 @@ def fallback_response(message):
     return "I can help with certificates, tracking applications, grievances, and payments. What do you need help with?"
 
 
-@chatbot_bp.route('/message', methods=['POST'])
-def chat():
-    user_id = None
+def _optional_user_id():
     try:
         verify_jwt_in_request(optional=True)
-        user_id = get_jwt_identity()
+        return get_jwt_identity()
     except Exception:
-        pass
+        return None
+
+
+def _session(data, user_id):
+    """
+    (session_id, history) for a request.  A missing or malformed
+    session_id, or one that belongs to another user, gets a new one,
+    returned to the client with the answer.
+    A `history` array in the body is only used when the server has
+    nothing for the session (clients from before server-side sessions).
+    """
+    session_id, history = chat_sessions.open_session(data.get('session_id'), user_id)
+    if not history and isinstance(data.get('history'), list):
+        history = data['history']
+    return session_id, history
+
+
+def _sse(data, event=None):
+    head = f"event: {event}\n" if event else ''
+    return f"{head}data: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+@chatbot_bp.route('/message', methods=['POST'])
+def chat():
+    user_id = _optional_user_id()
 
     data = request.get_json(silent=True) or {}
     user_message = data.get('message', '').strip()
-    session_id = data.get('session_id', 'anonymous')
-    history = data.get('history', [])
     language = data.get('language', 'en')
 
     if not user_message:
         return jsonify({'success': False, 'message': 'Message required'}), 400
 
-    bot_response = get_cohere_response(user_message, history)
-
-    if user_id:
-        try:
-            log = ChatLog(
-                user_id=user_id,
-                session_id=session_id,
-                user_message=user_message,
-                bot_response=bot_response,
-                language=language
-            )
-            db.session.add(log)
-            db.session.commit()
-        except Exception as e:
-            print(f"Chat log error: {e}")
-            db.session.rollback()
+    session_id, history = _session(data, user_id)
+    service_index.refresh_if_stale()
+    bot_response = get_cohere_response(user_message, history, language)
+    chat_sessions.append(session_id, user_id, user_message, bot_response, language)
 
     return jsonify({
         'success': True,
@@ -125,6 +202,54 @@ def chat():
     }), 200
 
 
+@chatbot_bp.route('/stream', methods=['POST'])
+def chat_stream():
+    """
+    Same request body as /message; the answer comes back as Server-Sent
+    Events while it is generated: `event: session` with the session_id
+    first, `data: {"delta": ...}` per piece, then `event: done` with the
+    full response and session_id (or `event: error` first if Cohere failed
+    part-way).  The exchange is added to the session and queued for
+    chat_logs once the stream ends, including when the client disconnects
+    early, so the client must keep the session_id from the first event.
+    """
+    user_id = _optional_user_id()
+
+    data = request.get_json(silent=True) or {}
+    user_message = data.get('message', '').strip()
+    language = data.get('language', 'en')
+
+    if not user_message:
+        return jsonify({'success': False, 'message': 'Message required'}), 400
+
+    session_id, history = _session(data, user_id)
+    service_index.refresh_if_stale()
+
+    def events():
+        parts = []
+        try:
+            # flushes headers through proxies before the first token, and hands over the
+            # session id before anything can be appended to the session
+            yield _sse({'session_id': session_id}, event='session')
+            try:
+                for delta in stream_response(user_message, history, language):
+                    parts.append(delta)
+                    yield _sse({'delta': delta})
+            except cohere_client.UpstreamError as e:
+                print(f"Cohere stream error: {e}")
+                yield _sse({'message': 'The answer was interrupted. Please try again.'}, event='error')
+            yield _sse({'response': ''.join(parts), 'session_id': session_id}, event='done')
+        finally:
+            if parts:
+                chat_sessions.append(session_id, user_id, user_message, ''.join(parts), language)
+
+    # the app context stays up for the generator: the session store writes after the last event
+    return Response(stream_with_context(events()), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
+
 @chatbot_bp.route('/history', methods=['GET'])
 @jwt_required()
 def chat_history():
@@ -144,4 +269,19 @@ def chat_history():
             'bot_response': l.bot_response,
             'created_at': l.created_at.isoformat()
         } for l in logs]
-    }), 200
\ No newline at end of file
+    }), 200
+
+
+@chatbot_bp.route('/metrics', methods=['GET'])
+@jwt_required()
+def chat_metrics():
+    if get_jwt().get('role') not in ['admin', 'superadmin', 'officer']:
+        return jsonify({'success': False, 'message': 'Admin access required'}), 403
+    return jsonify({
+        'success': True,
+        'cache': response_cache.stats(),
+        'upstream': cohere_client.stats(),
+        'retrieval': service_index.stats(),
+        'sessions': chat_sessions.stats(),
+        'chat_logs': chat_logs.stats()
+    }), 200
@@ -1,37 +1,18 @@
-import random
-import string
-from datetime import datetime
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from extensions import db
-from models import Grievance, GrievanceUpdate, AnalyticsLog
+from models import Grievance, GrievanceUpdate
+import stats
+import analytics_events
+import grievance_classifier
+import grievance_clusters
+import reference_numbers
+from pagination import paginate
 
 grievances_bp = Blueprint('grievances', __name__)
 
-def ai_categorize_grievance(subject, description):
-    text = (subject + ' ' + description).lower()
-    keywords = {
-        'Water Supply': ['water', 'pipe', 'tap', 'pani', 'jal', 'leakage'],
-        'Roads & Infrastructure': ['road', 'pothole', 'bridge', 'rasta', 'street'],
-        'Sanitation & Waste': ['garbage', 'waste', 'toilet', 'sewage', 'clean'],
-        'Electricity': ['light', 'electricity', 'bijli', 'power', 'transformer'],
-        'Healthcare': ['hospital', 'doctor', 'health', 'medicine', 'clinic'],
-        'Education': ['school', 'teacher', 'education', 'student'],
-        'Land Records': ['land', 'record', 'property', 'jamin'],
-        'Corruption': ['bribe', 'corrupt', 'bhrashtachar', 'fraud'],
-        'Public Safety': ['crime', 'safety', 'police', 'accident']
-    }
-    scores = {cat: sum(1 for w in words if w in text) for cat, words in keywords.items()}
-    best = max(scores, key=scores.get)
-    category = best if scores[best] > 0 else 'Other'
-    high_priority = ['urgent', 'emergency', 'death', 'accident', 'serious', 'critical']
-    priority = 'high' if any(w in text for w in high_priority) else 'normal'
-    return {'category': category, 'priority': priority}
-
 def generate_grievance_number():
-    ts = datetime.utcnow().strftime('%Y%m%d')
-    suffix = ''.join(random.choices(string.digits, k=5))
-    return f"GRV-{ts}-{suffix}"
+    return reference_numbers.allocate('GRV')
 
 
 @grievances_bp.route('/submit', methods=['POST'])
@@ -46,7 +27,7 @@ def submit_grievance():
     if not subject or not description:
         return jsonify({'success': False, 'message': 'Subject and description required'}), 400
 
-    ai_result = ai_categorize_grievance(subject, description)
+    ai_result = grievance_classifier.classify(subject, description)
 
     grievance = Grievance(
         user_id=user_id,
@@ -55,21 +36,16 @@ def submit_grievance():
         description=description,
         ai_category=ai_result['category'],
         ai_priority=ai_result['priority'],
-        category=ai_result['category']
+        category=ai_result['category'],
+        status='open'
     )
     db.session.add(grievance)
+    grievance_clusters.assign(grievance)
+    stats.record_insert('grievances', 'open')
     db.session.commit()
 
-    try:
-        db.session.add(AnalyticsLog(
-            event_type='grievance_submitted',
-            user_id=user_id,
-            event_data={'grievance_number': grievance.grievance_number, 'ai_category': ai_result['category']}
-        ))
-        db.session.commit()
-    except Exception as e:
-        print(f"Analytics log error: {e}")
-        db.session.rollback()
+    analytics_events.emit('grievance_submitted', user_id=user_id,
+                          event_data={'grievance_number': grievance.grievance_number, 'ai_category': ai_result['category']})
 
     return jsonify({'success': True, 'message': 'Grievance submitted successfully', 'grievance': grievance.to_dict()}), 201
 
@@ -78,15 +54,15 @@ def submit_grievance():
 @jwt_required()
 def my_grievances():
     user_id = get_jwt_identity()
-    page = request.args.get('page', 1, type=int)
-    pagination = Grievance.query.filter_by(user_id=user_id)\
-        .order_by(Grievance.submitted_at.desc())\
-        .paginate(page=page, per_page=10, error_out=False)
+    query = Grievance.query.filter_by(user_id=user_id)
+    try:
+        items, page_meta = paginate(query, Grievance.submitted_at, Grievance.id, per_page=10)
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
     return jsonify({
         'success': True,
-        'grievances': [g.to_dict() for g in pagination.items],
-        'total': pagination.total,
-        'pages': pagination.pages
+        'grievances': [g.to_dict() for g in items],
+        **page_meta
     }), 200
 
 
@@ -1,17 +1,25 @@
 import random
-import string
 from datetime import datetime
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from extensions import db
-from models import Payment, ServiceRequest, AnalyticsLog
+from models import Payment, ServiceRequest
+import stats
+import analytics_events
+import reference_numbers
 
 payments_bp = Blueprint('payments', __name__)
 
 def generate_transaction_id():
-    ts = datetime.utcnow().strftime('%Y%m%d%H%M%S')
-    suffix = ''.join(random.choices(string.ascii_uppercase + string.digits, k=8))
-    return f"TXN-{ts}-{suffix}"
+    return reference_numbers.allocate('TXN')
+
+
+def receipt_number(payment):
+    if payment.receipt_number:
+        return payment.receipt_number
+    # Receipts issued before migration 008 keep the number derived from the id
+    day = payment.paid_at.strftime('%Y%m%d') if payment.paid_at else 'NA'
+    return f"RCP-{day}-{str(payment.id)[:8].upper()}"
 
 
 @payments_bp.route('/initiate', methods=['POST'])
@@ -45,6 +53,7 @@ def initiate_payment():
         status='pending'
     )
     db.session.add(payment)
+    stats.record_insert('payments', 'pending', amount)
     db.session.commit()
 
     return jsonify({
@@ -71,32 +80,32 @@ def verify_payment():
     if not payment:
         return jsonify({'success': False, 'message': 'Payment not found or already processed'}), 404
 
+    # Conditional transition: of two concurrent verifies only one moves the
+    # payment out of 'pending', so the counters are changed exactly once
+    new_status = 'success' if mock_reference else 'failed'
+    changes = {'status': new_status}
+    if mock_reference:
+        paid_at = datetime.utcnow()
+        changes.update(paid_at=paid_at, payment_method='mock',
+                       receipt_number=reference_numbers.allocate('RCP', paid_at))
+    claimed = Payment.query.filter_by(id=payment.id, status='pending').update(changes, synchronize_session=False)
+    if not claimed:
+        db.session.rollback()
+        return jsonify({'success': False, 'message': 'Payment not found or already processed'}), 404
+    stats.record_transition('payments', 'pending', new_status, payment.amount)
+    db.session.commit()
+
     if mock_reference:
-        payment.status = 'success'
-        payment.paid_at = datetime.utcnow()
-        payment.payment_method = 'mock'
-        db.session.commit()
-
-        try:
-            db.session.add(AnalyticsLog(
-                event_type='payment_success',
-                user_id=user_id,
-                event_data={'transaction_id': payment.transaction_id, 'amount': float(payment.amount)}
-            ))
-            db.session.commit()
-        except Exception as e:
-            print(f"Analytics log error: {e}")
-            db.session.rollback()
+        analytics_events.emit('payment_success', user_id=user_id,
+                              event_data={'transaction_id': payment.transaction_id, 'amount': float(payment.amount)})
 
         return jsonify({
             'success': True,
             'message': 'Payment successful!',
             'payment': payment.to_dict(),
-            'receipt_number': f"RCP-{datetime.utcnow().strftime('%Y%m%d')}-{str(payment.id)[:8].upper()}"
+            'receipt_number': receipt_number(payment)
         }), 200
     else:
-        payment.status = 'failed'
-        db.session.commit()
         return jsonify({'success': False, 'message': 'Payment failed'}), 400
 
 
@@ -120,7 +129,7 @@ def get_receipt(payment_id):
     return jsonify({
         'success': True,
         'receipt': {
-            'receipt_number': f"RCP-{payment.paid_at.strftime('%Y%m%d') if payment.paid_at else 'NA'}-{str(payment.id)[:8].upper()}",
+            'receipt_number': receipt_number(payment),
             'transaction_id': payment.transaction_id,
             'amount': float(payment.amount),
             'purpose': payment.purpose,
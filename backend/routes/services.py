@@ -1,13 +1,19 @@
-import os
-import random
-import string
-from datetime import datetime
-from flask import Blueprint, request, jsonify, send_from_directory
+from sqlalchemy.orm import joinedload
+from flask import Blueprint, request, jsonify, send_from_directory, Response
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from werkzeug.utils import secure_filename
 from extensions import db
-from models import ServiceCategory, ServiceRequest, Document, AnalyticsLog
+from models import ServiceCategory, ServiceRequest, Document, UploadSession
 from config import Config
+import stats
+import analytics_events
+import catalogue
+import upload_store
+import upload_sessions
+import document_images
+import file_delivery
+import reference_numbers
+from pagination import paginate
 
 services_bp = Blueprint('services', __name__)
 
@@ -15,19 +21,16 @@ def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in Config.ALLOWED_EXTENSIONS
 
 def generate_request_number():
-    ts = datetime.utcnow().strftime('%Y%m%d')
-    suffix = ''.join(random.choices(string.digits, k=6))
-    return f"REQ-{ts}-{suffix}"
+    return reference_numbers.allocate('REQ')
 
 
 @services_bp.route('/categories', methods=['GET'])
 def get_categories():
-    lang = request.args.get('lang', 'en')
-    categories = ServiceCategory.query.filter_by(is_active=True).all()
-    return jsonify({
-        'success': True,
-        'categories': [c.to_dict(lang) for c in categories]
-    }), 200
+    etag, body = catalogue.get(request.args.get('lang', 'en'))
+    response = Response(body, mimetype='application/json')
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = f'public, max-age={Config.CATALOGUE_MAX_AGE}'
+    return response.make_conditional(request)
 
 
 @services_bp.route('/apply', methods=['POST'])
@@ -55,18 +58,11 @@ def apply_service():
         status='pending'
     )
     db.session.add(service_req)
+    stats.record_insert('service_requests', 'pending')
     db.session.commit()
 
-    try:
-        db.session.add(AnalyticsLog(
-            event_type='service_applied',
-            user_id=user_id,
-            event_data={'category': category.name_en, 'request_number': req_number}
-        ))
-        db.session.commit()
-    except Exception as e:
-        print(f"Analytics log error: {e}")
-        db.session.rollback()
+    analytics_events.emit('service_applied', user_id=user_id,
+                          event_data={'category': category.name_en, 'request_number': req_number})
 
     return jsonify({
         'success': True,
@@ -95,22 +91,156 @@ def upload_document(request_id):
         return jsonify({'success': False, 'message': 'File type not allowed'}), 400
 
     filename = secure_filename(file.filename)
-    unique_name = f"{request_id}_{datetime.utcnow().strftime('%Y%m%d%H%M%S')}_{filename}"
-    file_path = os.path.join(Config.UPLOAD_FOLDER, unique_name)
-    file.save(file_path)
+    staged = upload_store.stage(file.stream)
+    try:
+        duplicate = upload_store.reference(staged)
+        doc = Document(
+            request_id=request_id,
+            user_id=user_id,
+            file_name=filename,
+            file_path=upload_store.relative_path(staged.sha256),
+            file_type=file.content_type,
+            file_size=staged.size,
+            sha256=staged.sha256
+        )
+        db.session.add(doc)
+        db.session.flush()
+        image_job = document_images.enqueue(doc)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        staged.discard()
+        raise
+    upload_store.place(staged)
+    if image_job:
+        document_images.ensure_inprocess_workers()
 
-    doc = Document(
-        request_id=request_id,
-        user_id=user_id,
-        file_name=filename,
-        file_path=unique_name,
-        file_type=file.content_type,
-        file_size=os.path.getsize(file_path)
-    )
-    db.session.add(doc)
+    return jsonify({'success': True, 'document': doc.to_dict(), 'deduplicated': duplicate}), 201
+
+
+@services_bp.route('/<request_id>/uploads', methods=['POST'])
+@jwt_required()
+def create_upload(request_id):
+    user_id = get_jwt_identity()
+
+    service_req = ServiceRequest.query.filter_by(id=request_id, user_id=user_id).first()
+    if not service_req:
+        return jsonify({'success': False, 'message': 'Request not found'}), 404
+
+    data = request.get_json(silent=True) or {}
+    filename = secure_filename(data.get('file_name') or '')
+    if not filename or not allowed_file(filename):
+        return jsonify({'success': False, 'message': 'File type not allowed'}), 400
+    try:
+        total_size = int(data.get('file_size'))
+    except (TypeError, ValueError):
+        return jsonify({'success': False, 'message': 'file_size is required'}), 400
+
+    try:
+        session = upload_sessions.create(service_req, user_id, filename, (data.get('file_type') or '')[:50],
+                                         total_size, data.get('sha256'))
+    except upload_sessions.UploadRejected as e:
+        return jsonify({'success': False, 'message': str(e)}), e.status
+
+    return jsonify({'success': True, 'upload': upload_sessions.status(session)}), 201
+
+
+def _upload_session(upload_id, user_id):
+    return UploadSession.query.filter_by(id=upload_id, user_id=user_id).first()
+
+
+@services_bp.route('/uploads/<upload_id>', methods=['GET'])
+@jwt_required()
+def upload_status(upload_id):
+    session = _upload_session(upload_id, get_jwt_identity())
+    if not session:
+        return jsonify({'success': False, 'message': 'Upload not found'}), 404
+    return jsonify({'success': True, 'upload': upload_sessions.status(session)}), 200
+
+
+@services_bp.route('/uploads/<upload_id>/chunks/<int:index>', methods=['PUT'])
+@jwt_required()
+def upload_chunk(upload_id, index):
+    session = _upload_session(upload_id, get_jwt_identity())
+    if not session:
+        return jsonify({'success': False, 'message': 'Upload not found'}), 404
+
+    try:
+        upload_sessions.write_chunk(session, index, request.stream, request.content_length)
+    except upload_sessions.UploadRejected as e:
+        return jsonify({'success': False, 'message': str(e), 'upload': upload_sessions.status(session)}), e.status
+
+    return jsonify({'success': True, 'upload': upload_sessions.status(session)}), 200
+
+
+@services_bp.route('/uploads/<upload_id>/complete', methods=['POST'])
+@jwt_required()
+def complete_upload(upload_id):
+    session = _upload_session(upload_id, get_jwt_identity())
+    if not session:
+        return jsonify({'success': False, 'message': 'Upload not found'}), 404
+
+    try:
+        doc, duplicate = upload_sessions.complete(session)
+    except upload_sessions.UploadRejected as e:
+        return jsonify({'success': False, 'message': str(e)}), e.status
+    if doc is None:
+        return jsonify({'success': False, 'message': 'Document not found'}), 404
+
+    code = 200 if duplicate is None else 201    # 200: a retried /complete gets the same document
+    return jsonify({'success': True, 'document': doc.to_dict(), 'deduplicated': duplicate}), code
+
+
+@services_bp.route('/uploads/<upload_id>', methods=['DELETE'])
+@jwt_required()
+def abort_upload(upload_id):
+    session = _upload_session(upload_id, get_jwt_identity())
+    if not session:
+        return jsonify({'success': False, 'message': 'Upload not found'}), 404
+    upload_sessions.abort(session)
+    return jsonify({'success': True, 'message': 'Upload cancelled'}), 200
+
+
+@services_bp.route('/<request_id>/documents/<document_id>', methods=['GET'])
+@jwt_required()
+def download_document(request_id, document_id):
+    user_id = get_jwt_identity()
+
+    service_req = ServiceRequest.query.filter_by(id=request_id, user_id=user_id).first()
+    if not service_req:
+        return jsonify({'success': False, 'message': 'Request not found'}), 404
+
+    doc = Document.query.filter_by(id=document_id, request_id=request_id).first()
+    if not doc or not doc.file_path:
+        return jsonify({'success': False, 'message': 'Document not found'}), 404
+
+    response = file_delivery.send('uploads', doc.file_path, mimetype=doc.file_type or None,
+                                  download_name=doc.file_name, as_attachment=True)
+    if response is None:
+        return jsonify({'success': False, 'message': 'File not found'}), 404
+    return response
+
+
+@services_bp.route('/<request_id>/documents/<document_id>', methods=['DELETE'])
+@jwt_required()
+def delete_document(request_id, document_id):
+    user_id = get_jwt_identity()
+
+    service_req = ServiceRequest.query.filter_by(id=request_id, user_id=user_id).first()
+    if not service_req:
+        return jsonify({'success': False, 'message': 'Request not found'}), 404
+    if service_req.status != 'pending':
+        return jsonify({'success': False, 'message': 'Documents can only be removed while the request is pending'}), 409
+
+    doc = Document.query.filter_by(id=document_id, request_id=request_id).first()
+    if not doc:
+        return jsonify({'success': False, 'message': 'Document not found'}), 404
+
+    upload_store.release(doc.sha256)
+    db.session.delete(doc)
     db.session.commit()
 
-    return jsonify({'success': True, 'document': doc.to_dict()}), 201
+    return jsonify({'success': True, 'message': 'Document removed'}), 200
 
 
 @services_bp.route('/my-requests', methods=['GET'])
@@ -122,19 +252,19 @@ def my_requests():
     per_page = request.args.get('per_page', 10, type=int)
     status = request.args.get('status')
 
-    query = ServiceRequest.query.filter_by(user_id=user_id)
+    query = ServiceRequest.query.options(joinedload(ServiceRequest.category)).filter_by(user_id=user_id)
     if status:
         query = query.filter_by(status=status)
 
-    pagination = query.order_by(ServiceRequest.submitted_at.desc()).paginate(
-        page=page, per_page=per_page, error_out=False
-    )
+    try:
+        items, page_meta = paginate(query, ServiceRequest.submitted_at, ServiceRequest.id, per_page=per_page)
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
 
     return jsonify({
         'success': True,
-        'requests': [r.to_dict() for r in pagination.items],
-        'total': pagination.total,
-        'pages': pagination.pages,
+        'requests': [r.to_dict() for r in items],
+        **page_meta,
         'current_page': page
     }), 200
 
@@ -0,0 +1,255 @@
+"""
+Local retrieval over the service catalogue for the chatbot.
+
+Every active ServiceCategory (names in English / Hindi / Marathi,
+description, fee, processing days, required documents, plus a few
+transliterated ALIASES) is tokenised with the grievance classifier's
+word definition, lightly stemmed, and scored with BM25.  The catalogue
+is small, so the index is a dense NumPy matrix of per-document BM25
+term weights; a query is a column gather and a row sum.
+
+refresh_if_stale() re-reads service_categories at most every
+SERVICE_INDEX_CHECK_SECONDS and only re-tokenises rows whose indexed
+fields changed; the weight matrix is then recomputed from the stored
+term counts.  invalidate() forces a check on the next call.
+
+answer() turns a confident match into a reply built from the row's own
+fee / days / documents, so most service questions are answered without
+Cohere; snippets() gives the top matches as grounding documents when
+Cohere is used.
+"""
+import re
+import time
+import hashlib
+import threading
+from collections import Counter
+import numpy as np
+from models import ServiceCategory
+from config import Config
+import grievance_classifier
+
+# Spellings people type that are not in the catalogue text, keyed by name_en
+ALIASES = {
+    'Birth Certificate': 'janm janma janam dakhla birth janm praman patra',
+    'Death Certificate': 'mrityu mrutyu death dakhla',
+    'Income Certificate': 'aay aay praman patra utpanna utpanacha dakhla income',
+    'Caste Certificate': 'jati jat caste praman patra',
+    'Domicile Certificate': 'rahivas adhivas domicile residence',
+    'Marriage Certificate': 'vivah vivaah shaadi shadi lagna लग्न शादी',
+    'No Objection Certificate': 'noc na harkat anapatti',
+    'Water Connection': 'pani paani nal tap connection पाणी नळ नल',
+    'Building Permission': 'bandhkam construction house ghar',
+    'Trade License': 'vyapar dukan shop business license licence',
+}
+
+STOPWORDS = frozenset('''
+a an the and or of to in on at for from by with is are was were be it this that i my me we our you your
+do does did can how what which when where who why please tell about get need want apply
+kaise kaisa kya hai kitna kitni milega chahiye kasa kase kashi kay ahe kiti milel pahije
+आहे आहेत काय कसा कसे कशी किती मला आम्हाला साठी व आणि ची चा चे
+है हैं क्या कैसे कितनी कितना कितने मुझे हमें के की का को में और लिए
+certificate certificates application applications form status track pending service services online
+dakhla praman patra pramanpatra दाखला प्रमाणपत्र प्रमाण पत्र
+'''.split())
+
+# Marathi / Hindi endings stripped before indexing and querying (longest first), then a final vowel sign
+_DEV_SUFFIXES = sorted(set(grievance_classifier.SUFFIXES) | {'ाचा', 'ाची', 'ाचे', 'ाच्या', 'ाला', 'ात'},
+                       key=len, reverse=True)
+_VOWEL_SIGNS = 'ािीुूेैोौ'
+_DEVANAGARI = re.compile('[ऀ-ॿ]')
+
+TEMPLATES = {
+    'en': "{name}{description}. Fee: ₹{fee}, processing time: {days} days. "
+          "Required documents: {docs}. Apply from Services → Apply → '{name_en}'.",
+    'hi': "{name} ({name_en}): शुल्क ₹{fee}, {days} दिनों में। आवश्यक दस्तावेज़: {docs}। "
+          "आवेदन: Services → Apply → '{name_en}'.",
+    'mr': "{name} ({name_en}): शुल्क ₹{fee}, {days} दिवसांत. आवश्यक कागदपत्रे: {docs}. "
+          "अर्ज: Services → Apply → '{name_en}'.",
+}
+
+# Words that only occur in one of the two Devanagari languages, to pick the reply language
+_MARATHI_MARKERS = frozenset('''
+आहे आहेत काय कसा कसे कशी किती मला साठी मिळवायचा मिळवायचे मिळेल दाखला लागतात करायचा कागदपत्रे कागदपत्र कुठे कधी
+'''.split())
+_HINDI_MARKERS = frozenset('''
+है हैं क्या कैसे कितनी कितना मुझे लिए चाहिए बनवाएं बनवाना मिलेगा प्रमाण दस्तावेज़ दस्तावेज कब कहाँ कहां फीस
+'''.split())
+
+
+def _stem(token):
+    if _DEVANAGARI.search(token):
+        for suffix in _DEV_SUFFIXES:
+            if token.endswith(suffix) and len(token) - len(suffix) >= 2:
+                token = token[:-len(suffix)]
+                break
+        if len(token) > 2 and token[-1] in _VOWEL_SIGNS:
+            token = token[:-1]
+        return token
+    if len(token) > 3 and token.endswith('s') and not token.endswith('ss'):
+        return token[:-1]
+    return token
+
+
+def terms(text):
+    return [_stem(t) for t in grievance_classifier.tokens(text or '') if t not in STOPWORDS]
+
+
+def detect_language(text, default='en'):
+    """'en' unless the text is in Devanagari, then 'mr' or 'hi' by marker words ('hi' on a tie)."""
+    if not _DEVANAGARI.search(text or ''):
+        return default if default in TEMPLATES else 'en'
+    words = set(grievance_classifier.tokens(text))
+    if default in ('hi', 'mr') and not (words & (_MARATHI_MARKERS | _HINDI_MARKERS)):
+        return default
+    return 'mr' if len(words & _MARATHI_MARKERS) > len(words & _HINDI_MARKERS) else 'hi'
+
+
+def _row(category):
+    return {
+        'id': category.id,
+        'name_en': category.name_en,
+        'name_hi': category.name_hi,
+        'name_mr': category.name_mr,
+        'description': category.description or '',
+        'fee': float(category.fee or 0),
+        'processing_days': category.processing_days,
+        'required_docs': category.required_docs or ''
+    }
+
+
+def _fingerprint(row):
+    raw = '\x1f'.join(str(row[k]) for k in sorted(row))
+    return hashlib.blake2b(raw.encode(), digest_size=8).digest()
+
+
+def _document_terms(row):
+    names = ' '.join(filter(None, [row['name_en'], row['name_hi'], row['name_mr'], ALIASES.get(row['name_en'], '')]))
+    # names count three times so "birth" beats a passing mention in another description
+    return Counter(terms(names) * 3 + terms(row['description']) + terms(row['required_docs']))
+
+
+class ServiceIndex:
+    def __init__(self, k1=1.2, b=0.75):
+        self.k1 = k1
+        self.b = b
+        self._lock = threading.Lock()
+        self._docs = {}          # id -> (fingerprint, row, Counter of terms)
+        # (vocabulary, weights, rows) swapped as one tuple so search() needs no lock
+        self._state = ({}, np.zeros((0, 0)), [])
+        self.version = 0
+        self.reindexed = 0
+
+    def refresh(self, rows):
+        """Bring the index in line with `rows`; re-tokenises only changed rows.  True if anything changed."""
+        with self._lock:
+            current = {row['id']: row for row in rows}
+            changed = False
+            for doc_id in list(self._docs):
+                if doc_id not in current:
+                    del self._docs[doc_id]
+                    changed = True
+            for doc_id, row in current.items():
+                fingerprint = _fingerprint(row)
+                existing = self._docs.get(doc_id)
+                if existing is None or existing[0] != fingerprint:
+                    self._docs[doc_id] = (fingerprint, row, _document_terms(row))
+                    self.reindexed += 1
+                    changed = True
+            if changed:
+                self._build()
+            return changed
+
+    def _build(self):
+        ids = sorted(self._docs)
+        vocab = {}
+        for doc_id in ids:
+            for term in self._docs[doc_id][2]:
+                vocab.setdefault(term, len(vocab))
+        tf = np.zeros((len(ids), len(vocab)))
+        for i, doc_id in enumerate(ids):
+            counts = self._docs[doc_id][2]
+            tf[i, [vocab[t] for t in counts]] = list(counts.values())
+        n = len(ids)
+        df = np.count_nonzero(tf, axis=0)
+        idf = np.log(1 + (n - df + 0.5) / (df + 0.5))
+        lengths = tf.sum(axis=1, keepdims=True)
+        norm = self.k1 * (1 - self.b + self.b * lengths / max(lengths.mean(), 1))
+        weights = idf * tf * (self.k1 + 1) / (tf + norm)
+        self._state = (vocab, weights, [self._docs[doc_id][1] for doc_id in ids])
+        self.version += 1
+
+    def search(self, text, k=3):
+        """[(score, row)] of the best `k` matches with a positive score, best first."""
+        vocab, weights, rows = self._state
+        columns = [vocab[t] for t in set(terms(text)) if t in vocab]
+        if not columns or not rows:
+            return []
+        scores = weights[:, columns].sum(axis=1)
+        best = np.argsort(-scores)[:k]
+        return [(float(scores[i]), rows[i]) for i in best if scores[i] > 0]
+
+    def stats(self):
+        vocab, _, rows = self._state
+        return {'documents': len(rows), 'terms': len(vocab), 'version': self.version, 'reindexed': self.reindexed}
+
+
+index = ServiceIndex()
+_last_check = float('-inf')
+_check_lock = threading.Lock()
+_answered = Counter()
+
+
+def refresh_if_stale():
+    """Re-read service_categories at most every SERVICE_INDEX_CHECK_SECONDS (needs an app context)."""
+    global _last_check
+    if time.monotonic() - _last_check < Config.SERVICE_INDEX_CHECK_SECONDS:
+        return
+    if not _check_lock.acquire(blocking=False):
+        return
+    try:
+        index.refresh([_row(c) for c in ServiceCategory.query.filter_by(is_active=True).all()])
+        _last_check = time.monotonic()
+    except Exception as e:
+        print(f"Service index refresh failed: {e}")
+    finally:
+        _check_lock.release()
+
+
+def invalidate():
+    global _last_check
+    _last_check = float('-inf')
+
+
+def _format(row, language):
+    name = row.get(f'name_{language}') or row['name_en']
+    description = row['description'].rstrip('.')
+    return TEMPLATES[language].format(
+        name=name, name_en=row['name_en'], description=f": {description}" if description else '',
+        fee=f"{row['fee']:g}", days=row['processing_days'], docs=row['required_docs']
+    )
+
+
+def answer(text, language='en', min_score=None):
+    """
+    Reply built from the best-matching service, or None when no service
+    matches clearly: the top score must reach SERVICE_INDEX_MIN_SCORE and
+    beat the runner-up by SERVICE_INDEX_MARGIN.
+    """
+    min_score = Config.SERVICE_INDEX_MIN_SCORE if min_score is None else min_score
+    hits = index.search(text, k=2)
+    if not hits or hits[0][0] < min_score or (len(hits) > 1 and hits[0][0] < hits[1][0] * Config.SERVICE_INDEX_MARGIN):
+        _answered['miss'] += 1
+        return None
+    _answered['hit'] += 1
+    return _format(hits[0][1], detect_language(text, language))
+
+
+def snippets(text, k=3):
+    """Top matches as Cohere chat `documents` (title + snippet) for grounding."""
+    return [{'title': row['name_en'], 'snippet': _format(row, 'en')} for _, row in index.search(text, k)]
+
+
+def stats():
+    total = _answered['hit'] + _answered['miss']
+    return {**index.stats(), 'answered_locally': _answered['hit'], 'not_answered': _answered['miss'],
+            'local_rate': round(_answered['hit'] / total, 4) if total else 0.0}
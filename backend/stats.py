@@ -0,0 +1,167 @@
+"""
+Incrementally maintained dashboard counters.
+
+Every insert / status change on a tracked table calls record_transition()
+inside the same transaction as the change itself, so the admin dashboard
+can read all of its numbers from stat_counters with one indexed SELECT
+instead of a COUNT(*) per status.  rebuild() recomputes everything from
+the source tables and is exposed as `flask rebuild-stats` to fix drift.
+"""
+from datetime import datetime
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import func, text
+from sqlalchemy.exc import IntegrityError
+from extensions import db
+from models import StatCounter, ServiceRequest, Grievance, User, Payment
+
+TOTAL = '_total'
+_ADVISORY_LOCK_ID = 74210313
+
+# entity name -> (model, column whose value is summed into `amount`)
+TRACKED = {
+    'service_requests': (ServiceRequest, None),
+    'grievances': (Grievance, None),
+    'users': (User, None),
+    'payments': (Payment, Payment.amount),
+}
+
+
+def _upsert(entity, status, delta, amount=0):
+    bind = db.session.get_bind()
+    table = StatCounter.__table__
+    values = dict(entity=entity, status=status, count=delta, amount=amount, updated_at=datetime.utcnow())
+
+    if bind.dialect.name in ('postgresql', 'sqlite'):
+        if bind.dialect.name == 'postgresql':
+            from sqlalchemy.dialects.postgresql import insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert
+        stmt = insert(table).values(**values)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.c.entity, table.c.status],
+            set_={
+                'count': table.c.count + stmt.excluded.count,
+                'amount': table.c.amount + stmt.excluded.amount,
+                'updated_at': stmt.excluded.updated_at,
+            }
+        )
+        db.session.execute(stmt)
+        return
+
+    result = db.session.execute(
+        table.update()
+        .where(table.c.entity == entity, table.c.status == status)
+        .values(count=table.c.count + delta, amount=table.c.amount + amount, updated_at=values['updated_at'])
+    )
+    if result.rowcount == 0:
+        db.session.execute(table.insert().values(**values))
+
+
+def record_transition(entity, old_status, new_status, amount=0, rows=1):
+    """
+    Record that `rows` rows of `entity` moved from old_status to new_status
+    (`amount` is their total).  old_status=None means they were just
+    inserted.  Does not commit; the caller's commit makes the counter
+    change atomic with the row change.
+    """
+    if old_status == new_status or not rows:
+        return
+    amount = amount or 0
+    if old_status is None:
+        _upsert(entity, TOTAL, rows, amount)
+    else:
+        _upsert(entity, old_status, -rows, -amount)
+    if new_status is not None:
+        _upsert(entity, new_status, rows, amount)
+
+
+def record_insert(entity, status=None, amount=0):
+    if status is None:
+        _upsert(entity, TOTAL, 1, amount or 0)
+    else:
+        record_transition(entity, None, status, amount)
+
+
+def snapshot():
+    """Return {entity: {status: {'count': n, 'amount': x}}} from a single query."""
+    result = {}
+    for row in db.session.query(StatCounter.entity, StatCounter.status,
+                                StatCounter.count, StatCounter.amount).all():
+        result.setdefault(row.entity, {})[row.status] = {
+            'count': int(row.count or 0),
+            'amount': float(row.amount or 0)
+        }
+    return result
+
+
+def count(snap, entity, status=TOTAL):
+    return snap.get(entity, {}).get(status, {}).get('count', 0)
+
+
+def amount(snap, entity, status=TOTAL):
+    return snap.get(entity, {}).get(status, {}).get('amount', 0.0)
+
+
+def get_count(entity, status=TOTAL):
+    """Single counter lookup; None if the counter row does not exist."""
+    row = db.session.get(StatCounter, (entity, status))
+    return int(row.count) if row is not None else None
+
+
+def rebuild():
+    """Recompute all counters from the source tables in one transaction."""
+    rows = []
+    for entity, (model, amount_col) in TRACKED.items():
+        total_cols = [func.count()]
+        if amount_col is not None:
+            total_cols.append(func.coalesce(func.sum(amount_col), 0))
+        total = db.session.query(*total_cols).select_from(model).one()
+        rows.append(StatCounter(entity=entity, status=TOTAL, count=total[0],
+                                amount=total[1] if amount_col is not None else 0))
+
+        if not hasattr(model, 'status'):
+            continue
+        group_cols = [model.status, func.count()]
+        if amount_col is not None:
+            group_cols.append(func.coalesce(func.sum(amount_col), 0))
+        for r in db.session.query(*group_cols).group_by(model.status).all():
+            if r[0] is None:
+                continue
+            rows.append(StatCounter(entity=entity, status=r[0], count=r[1],
+                                    amount=r[2] if amount_col is not None else 0))
+
+    StatCounter.query.delete()
+    db.session.add_all(rows)
+    db.session.commit()
+    return {f"{r.entity}.{r.status}": r.count for r in rows}
+
+
+def ensure_counters():
+    """
+    Seed the counters on first start against an existing database.
+
+    Every gunicorn worker runs this at startup; on PostgreSQL the first
+    one takes a transaction-level advisory lock and the others wait for
+    its commit and then find the counters filled in.  Elsewhere a worker
+    that loses the race gets a duplicate key and leaves it to the winner.
+    """
+    if db.session.get_bind().dialect.name == 'postgresql':
+        db.session.execute(text('SELECT pg_advisory_xact_lock(:id)'), {'id': _ADVISORY_LOCK_ID})
+    if StatCounter.query.first() is not None:
+        db.session.rollback()
+        return
+    try:
+        rebuild()
+    except IntegrityError:
+        db.session.rollback()
+
+
+@click.command('rebuild-stats')
+@with_appcontext
+def rebuild_stats_command():
+    """Recompute dashboard counters from the source tables."""
+    result = rebuild()
+    for key, value in sorted(result.items()):
+        click.echo(f"{key:40s} {value}")
+    click.echo(f"✅ {len(result)} counters rebuilt")
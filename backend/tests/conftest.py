@@ -0,0 +1,47 @@
+import os
+import sys
+import atexit
+import base64
+import shutil
+import tempfile
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+WORK = tempfile.mkdtemp()
+# registered before create_app() registers its writer flush, so it runs after it
+atexit.register(shutil.rmtree, WORK, True)
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(WORK, 'test.db')}"
+os.environ['CERTIFICATE_SIGNING_KEY'] = base64.b64encode(b'test-certificate-signing-seed-32').decode()
+
+from config import Config
+
+Config.UPLOAD_FOLDER = os.path.join(WORK, 'uploads')
+Config.CERTIFICATE_OUTPUT_DIR = os.path.join(WORK, 'certificates')
+Config.DOCUMENT_WORKER_THREADS = 0
+
+
+@pytest.fixture(scope='session')
+def app():
+    from app import create_app
+    app = create_app()
+    app.config['TESTING'] = True
+    return app
+
+
+@pytest.fixture(scope='session')
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture(scope='session')
+def admin_headers(client):
+    token = client.post('/api/auth/admin/login', json={'username': 'admin', 'password': 'Admin@123'}).get_json()['token']
+    return {'Authorization': f'Bearer {token}'}
+
+
+@pytest.fixture(scope='session')
+def user_headers(client):
+    client.post('/api/auth/send-otp', json={'mobile': '9876543210'})
+    token = client.post('/api/auth/verify-otp', json={'mobile': '9876543210', 'otp': '123456',
+                                                      'full_name': 'Test Citizen'}).get_json()['token']
+    return {'Authorization': f'Bearer {token}'}
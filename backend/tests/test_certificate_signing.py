@@ -0,0 +1,46 @@
+"""Signed QR tokens: round trip, tampering, holder name, expiry and separator escaping."""
+from datetime import date, datetime
+import certificate_signing
+
+
+def _token(cert_type='Income Certificate', valid_until=date(2027, 10, 17)):
+    return certificate_signing.sign_payload('CERT-2026-55038122', 'Asha  Patil', cert_type,
+                                            datetime(2026, 10, 17, 9, 30), valid_until)
+
+
+def test_round_trip():
+    result = certificate_signing.verify_token(_token(), holder_name='asha patil', today=date(2026, 11, 1))
+    assert result['signature_valid'] and result['valid'] and result['holder_match']
+    assert result['certificate_number'] == 'CERT-2026-55038122'
+    assert result['certificate_type'] == 'Income Certificate'
+    assert (result['issued'], result['valid_until']) == ('20261017', '20271017')
+
+
+def test_tampered_payload_fails_the_signature():
+    prefix, payload, signature = _token().split('.')
+    forged = certificate_signing._b64d(payload).replace(b'20271017', b'20371017')
+    result = certificate_signing.verify_token(f"{prefix}.{certificate_signing._b64e(forged)}.{signature}",
+                                              today=date(2026, 11, 1))
+    assert result['valid_until'] == '20371017'
+    assert not result['signature_valid'] and not result['valid']
+
+
+def test_holder_name_mismatch():
+    result = certificate_signing.verify_token(_token(), holder_name='Someone Else', today=date(2026, 11, 1))
+    assert result['signature_valid'] and not result['holder_match']
+
+
+def test_expired_certificate():
+    result = certificate_signing.verify_token(_token(), today=date(2027, 10, 18))
+    assert result['signature_valid'] and not result['valid']
+    assert certificate_signing.verify_token(_token(valid_until=None), today=date(2040, 1, 1))['valid']
+
+
+def test_separator_in_certificate_type():
+    result = certificate_signing.verify_token(_token(cert_type='NOC | Shop 100%'), today=date(2026, 11, 1))
+    assert result['signature_valid'] and result['valid']
+    assert result['certificate_type'] == 'NOC | Shop 100%'
+
+
+def test_malformed_token():
+    assert certificate_signing.verify_token('GP1.not-a-token')['reason'] == 'Malformed token'
@@ -0,0 +1,53 @@
+"""Chat session stores: sharing, trimming, ownership and the DEBUG guard."""
+import pytest
+from config import Config
+import chat_sessions
+
+
+def _exchange(n):
+    return {'role': 'user', 'content': f'q{n}'}, {'role': 'assistant', 'content': f'a{n}'}
+
+
+def test_database_store_is_shared_and_trimmed(app):
+    with app.app_context():
+        writer = chat_sessions.DatabaseChatSessionStore(max_messages=4, ttl_seconds=60)
+        reader = chat_sessions.DatabaseChatSessionStore(max_messages=4, ttl_seconds=60)
+        for n in range(3):
+            writer.append('sess_shared01', None, *_exchange(n))
+        assert [m['content'] for m in reader.history('sess_shared01')] == ['q1', 'a1', 'q2', 'a2']
+
+
+def test_expired_session_starts_empty(app):
+    with app.app_context():
+        store = chat_sessions.DatabaseChatSessionStore(max_messages=4, ttl_seconds=0)
+        store.append('sess_expired1', None, *_exchange(0))
+        assert store.history('sess_expired1') == []
+
+
+def test_foreign_session_is_not_overwritten(app):
+    with app.app_context():
+        store = chat_sessions.DatabaseChatSessionStore(max_messages=6, ttl_seconds=60)
+        store.append('sess_owned001', 'user-1', *_exchange(0))
+        assert store.history('sess_owned001', None) is None
+        assert store.append('sess_owned001', None, *_exchange(1)) is False
+        assert len(store.history('sess_owned001', 'user-1')) == 2
+
+
+def test_anonymous_caller_with_a_users_session_id_gets_a_new_session(app, client, user_headers):
+    session_id = client.post('/api/chatbot/message', json={'message': 'hello'},
+                             headers=user_headers).get_json()['session_id']
+    other = client.post('/api/chatbot/message', json={'message': 'hello', 'session_id': session_id})
+    assert other.get_json()['session_id'] != session_id
+    mine = client.post('/api/chatbot/message', json={'message': 'hello again', 'session_id': session_id},
+                       headers=user_headers)
+    assert mine.get_json()['session_id'] == session_id
+    with app.app_context():
+        owner, messages = chat_sessions.store._load(session_id)
+    assert owner and len(messages) == 4
+
+
+def test_memory_store_refused_without_debug(monkeypatch):
+    monkeypatch.setattr(Config, 'CHAT_SESSION_STORE_URL', 'memory://')
+    monkeypatch.setattr(Config, 'DEBUG', False)
+    with pytest.raises(RuntimeError):
+        chat_sessions._create_store()
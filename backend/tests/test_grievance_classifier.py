@@ -0,0 +1,40 @@
+"""Keyword classifier: word boundaries, plurals, Devanagari suffixes and '*' stems."""
+from grievance_classifier import classify
+
+
+def category(text):
+    return classify(text)['category']
+
+
+def test_terms_match_whole_words_only():
+    assert category('The drain near school is not clean') == 'Sanitation & Waste'
+    assert category('Unclean premises') == 'Other'
+    assert category('Roadside stall') == 'Other'
+
+
+def test_english_plurals():
+    assert category('Potholes everywhere') == 'Roads & Infrastructure'
+    assert category('Two leaks reported') == 'Water Supply'
+    assert category('Broken bridges') == 'Roads & Infrastructure'
+
+
+def test_devanagari_suffixes():
+    assert category('गटारात घाण साचली आहे') == 'Sanitation & Waste'
+    assert category('रस्त्याची दुरवस्था') == 'Roads & Infrastructure'
+    assert category('शाळेत शिक्षक येत नाहीत') == 'Education'
+
+
+def test_stems_match_any_continuation():
+    assert category('ग्रामसेवक भ्रष्टाचार करतात') == 'Corruption'
+    assert classify('तातडीने मदत हवी')['priority'] == 'high'
+
+
+def test_bare_well_is_not_water_supply():
+    assert category('Well, I need help with my application') == 'Other'
+    assert category('The village well has dried up') == 'Water Supply'
+    assert category('Borewell not working') == 'Water Supply'
+
+
+def test_priority():
+    assert classify('Urgent: live wire on the road')['priority'] == 'high'
+    assert classify('Please repair the road')['priority'] == 'normal'
@@ -0,0 +1,71 @@
+"""OTP stores: attempt limits, expiry, consume=False and sharing between instances."""
+import pytest
+from config import Config
+import otp_store
+
+
+@pytest.fixture(params=['memory', 'database'])
+def make_store(request, app):
+    if request.param == 'memory':
+        yield lambda: otp_store.MemoryOTPStore(max_attempts=3)
+        return
+    with app.app_context():
+        yield lambda: otp_store.DatabaseOTPStore(max_attempts=3)
+
+
+def test_code_is_single_use(make_store):
+    store = make_store()
+    store.issue('9000000001', '111111', 60)
+    assert store.verify('9000000001', '111111') == (otp_store.OK, 3)
+    assert store.verify('9000000001', '111111') == (otp_store.EXPIRED, 0)
+
+
+def test_consume_false_keeps_the_code(make_store):
+    store = make_store()
+    store.issue('9000000002', '222222', 60)
+    assert store.verify('9000000002', '222222', consume=False)[0] == otp_store.OK
+    assert store.verify('9000000002', '222222')[0] == otp_store.OK
+
+
+def test_wrong_codes_lock_the_otp(make_store):
+    store = make_store()
+    store.issue('9000000003', '333333', 60)
+    assert store.verify('9000000003', '000000') == (otp_store.INVALID, 2)
+    assert store.verify('9000000003', '000000') == (otp_store.INVALID, 1)
+    assert store.verify('9000000003', '000000') == (otp_store.LOCKED, 0)
+    assert store.verify('9000000003', '333333') == (otp_store.EXPIRED, 0)
+
+
+def test_reissue_resets_attempts(make_store):
+    store = make_store()
+    store.issue('9000000004', '444444', 60)
+    store.verify('9000000004', '000000')
+    store.issue('9000000004', '555555', 60)
+    assert store.verify('9000000004', '444444') == (otp_store.INVALID, 2)
+    assert store.verify('9000000004', '555555') == (otp_store.OK, 2)
+
+
+def test_expired_code(make_store):
+    store = make_store()
+    store.issue('9000000005', '666666', 0)
+    assert store.verify('9000000005', '666666') == (otp_store.EXPIRED, 0)
+
+
+def test_database_store_is_shared_between_instances(app):
+    with app.app_context():
+        otp_store.DatabaseOTPStore(max_attempts=3).issue('9000000006', '777777', 60)
+        assert otp_store.DatabaseOTPStore(max_attempts=3).verify('9000000006', '777777')[0] == otp_store.OK
+
+
+def test_memory_store_refused_without_debug(monkeypatch):
+    monkeypatch.setattr(Config, 'OTP_STORE_URL', 'memory://')
+    monkeypatch.setattr(Config, 'DEBUG', False)
+    with pytest.raises(RuntimeError):
+        otp_store._create_store()
+
+
+def test_login_with_the_default_store(client):
+    assert client.post('/api/auth/send-otp', json={'mobile': '9000000007'}).status_code == 200
+    response = client.post('/api/auth/verify-otp', json={'mobile': '9000000007', 'otp': '123456',
+                                                         'full_name': 'Second Worker'})
+    assert response.status_code == 200 and response.get_json()['token']
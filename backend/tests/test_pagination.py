@@ -0,0 +1,21 @@
+"""Keyset pagination must walk every row, including rows that share a timestamp."""
+from datetime import datetime
+from extensions import db
+from models import ServiceRequest
+
+
+def test_cursor_pages_cover_rows_with_equal_timestamps(app, client, user_headers):
+    ids = [client.post('/api/services/apply', json={'category_id': 1}, headers=user_headers)
+           .get_json()['request']['id'] for _ in range(25)]
+    with app.app_context():
+        ServiceRequest.query.filter(ServiceRequest.id.in_(ids))\
+            .update({'submitted_at': datetime(2026, 1, 1, 9, 30)}, synchronize_session=False)
+        db.session.commit()
+
+    seen, cursor = [], ''
+    while cursor is not None:
+        page = client.get(f'/api/services/my-requests?per_page=10&cursor={cursor}', headers=user_headers).get_json()
+        seen += [r['id'] for r in page['requests']]
+        cursor = page['next_cursor']
+    assert len(seen) == len(set(seen))
+    assert set(ids) <= set(seen)
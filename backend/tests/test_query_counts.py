@@ -0,0 +1,33 @@
+"""
+The list endpoints eager-load their relationships; the number of SQL
+statements per page must not depend on how many rows the page holds.
+"""
+import pytest
+from query_counter import count_queries
+
+# endpoint -> statements per page (page query + row-count estimate)
+LIST_ENDPOINTS = {
+    '/api/admin/requests': 2,
+    '/api/admin/grievances': 2,
+    '/api/services/my-requests': 2,
+}
+
+
+def _submit(client, user_headers, n):
+    for i in range(n):
+        client.post('/api/services/apply', json={'category_id': i % 3 + 1}, headers=user_headers)
+        client.post('/api/grievances/submit', json={'subject': f'Water pipe leak {i}',
+                                                    'description': 'No water since morning'}, headers=user_headers)
+
+
+@pytest.mark.parametrize('path', LIST_ENDPOINTS)
+def test_list_endpoint_statement_count_is_fixed(client, admin_headers, user_headers, path):
+    headers = user_headers if path.startswith('/api/services') else admin_headers
+    counts = []
+    for n in (2, 12):
+        _submit(client, user_headers, n)
+        with count_queries() as counter:
+            response = client.get(path, headers=headers)
+        assert response.status_code == 200
+        counts.append(counter['count'])
+    assert counts == [LIST_ENDPOINTS[path]] * 2
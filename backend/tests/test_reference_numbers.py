@@ -0,0 +1,41 @@
+"""Reference numbers stay unique across threads; the counters of past periods are pruned."""
+import threading
+from datetime import datetime
+from extensions import db
+from models import ReferenceCounter
+import reference_numbers
+
+
+def test_threads_never_share_a_number(app):
+    numbers, lock = [], threading.Lock()
+
+    def worker():
+        with app.app_context():
+            drawn = [reference_numbers.allocate('GRV') for _ in range(50)]
+            db.session.remove()
+        with lock:
+            numbers.extend(drawn)
+
+    pool = [threading.Thread(target=worker) for _ in range(8)]
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+    assert len(numbers) == len(set(numbers)) == 400
+
+
+def test_upcoming_periods_skip_the_period_about_to_start():
+    assert reference_numbers._upcoming_periods('%Y%m%d', datetime(2026, 10, 17, 12), 2) == ['20261018', '20261019']
+    assert reference_numbers._upcoming_periods('%Y%m%d', datetime(2026, 10, 17, 23, 30), 2) == ['20261019']
+    assert reference_numbers._upcoming_periods('%Y', datetime(2026, 12, 31, 23, 30), 30) == []
+
+
+def test_ensure_sequences_prunes_old_counters(app):
+    with app.app_context():
+        db.session.add_all([ReferenceCounter(name='ref_req_20300101', value=20),
+                            ReferenceCounter(name='ref_req_20300110', value=20)])
+        db.session.commit()
+        reference_numbers.ensure_sequences(now=datetime(2030, 1, 10, 12))
+        names = {c.name for c in ReferenceCounter.query.filter(ReferenceCounter.name.like('ref_req_%'))}
+    assert 'ref_req_20300101' not in names
+    assert 'ref_req_20300110' in names
@@ -0,0 +1,94 @@
+"""Resumable uploads: chunk order, retried chunks, cut-off chunks, sha256 and a retried /complete."""
+import hashlib
+import io
+import pytest
+from config import Config
+
+CHUNK = 8
+DATA = b'%PDF-1.4 resumable upload test\n'      # four chunks, the last one short
+
+
+@pytest.fixture
+def upload(client, user_headers, monkeypatch):
+    """Start an upload of DATA; returns (upload_id, chunk_url)."""
+    monkeypatch.setattr(Config, 'UPLOAD_SESSION_CHUNK_SIZE', CHUNK)
+
+    def start(sha256=None):
+        request_id = client.post('/api/services/apply', json={'category_id': 1},
+                                 headers=user_headers).get_json()['request']['id']
+        body = {'file_name': 'proof.pdf', 'file_size': len(DATA), 'file_type': 'application/pdf'}
+        if sha256:
+            body['sha256'] = sha256
+        response = client.post(f'/api/services/{request_id}/uploads', json=body, headers=user_headers)
+        assert response.status_code == 201
+        upload_id = response.get_json()['upload']['upload_id']
+        return upload_id, f'/api/services/uploads/{upload_id}/chunks/%d'
+    return start
+
+
+def _chunk(n):
+    return DATA[n * CHUNK:(n + 1) * CHUNK]
+
+
+def _send_all(client, headers, url):
+    for n in range((len(DATA) + CHUNK - 1) // CHUNK):
+        assert client.put(url % n, data=_chunk(n), headers=headers).status_code == 200
+
+
+def test_chunks_must_arrive_in_order(client, user_headers, upload):
+    upload_id, url = upload()
+    response = client.put(url % 1, data=_chunk(1), headers=user_headers)
+    assert response.status_code == 409
+    assert response.get_json()['upload']['next_chunk'] == 0
+
+
+def test_retried_chunk_is_a_no_op(client, user_headers, upload):
+    upload_id, url = upload()
+    assert client.put(url % 0, data=_chunk(0), headers=user_headers).status_code == 200
+    retry = client.put(url % 0, data=_chunk(0), headers=user_headers)
+    assert retry.status_code == 200
+    assert retry.get_json()['upload']['received'] == CHUNK
+    assert retry.get_json()['upload']['next_chunk'] == 1
+
+
+def test_chunk_of_the_wrong_size_is_rejected(client, user_headers, upload):
+    upload_id, url = upload()
+    response = client.put(url % 0, data=_chunk(0)[:5], headers=user_headers)
+    assert response.status_code == 400
+    assert f'must be {CHUNK} bytes' in response.get_json()['message']
+
+
+def test_cut_off_chunk_is_not_stored(client, user_headers, upload):
+    upload_id, url = upload()
+    # the client announces a full chunk but the connection drops after 5 bytes
+    response = client.put(url % 0, input_stream=io.BytesIO(_chunk(0)[:5]), headers=user_headers,
+                          environ_overrides={'CONTENT_LENGTH': str(CHUNK)})
+    assert response.status_code == 400
+    assert 'cut off' in response.get_json()['message']
+    assert response.get_json()['upload']['received'] == 0
+    assert client.put(url % 0, data=_chunk(0), headers=user_headers).status_code == 200
+
+
+def test_sha256_mismatch_discards_the_upload(client, user_headers, upload):
+    upload_id, url = upload(sha256=hashlib.sha256(b'something else').hexdigest())
+    _send_all(client, user_headers, url)
+    response = client.post(f'/api/services/uploads/{upload_id}/complete', headers=user_headers)
+    assert response.status_code == 422
+    assert client.get(f'/api/services/uploads/{upload_id}', headers=user_headers).status_code == 404
+
+
+def test_incomplete_upload_cannot_complete(client, user_headers, upload):
+    upload_id, url = upload()
+    client.put(url % 0, data=_chunk(0), headers=user_headers)
+    response = client.post(f'/api/services/uploads/{upload_id}/complete', headers=user_headers)
+    assert response.status_code == 409
+
+
+def test_retried_complete_returns_the_same_document(client, user_headers, upload):
+    upload_id, url = upload(sha256=hashlib.sha256(DATA).hexdigest())
+    _send_all(client, user_headers, url)
+    first = client.post(f'/api/services/uploads/{upload_id}/complete', headers=user_headers)
+    second = client.post(f'/api/services/uploads/{upload_id}/complete', headers=user_headers)
+    assert (first.status_code, second.status_code) == (201, 200)
+    assert first.get_json()['document']['id'] == second.get_json()['document']['id']
+    assert first.get_json()['document']['sha256'] == hashlib.sha256(DATA).hexdigest()
@@ -0,0 +1,229 @@
+"""
+Resumable, chunked document uploads.
+
+For connections that drop halfway through a large scan, a document can
+be sent as numbered chunks of UPLOAD_SESSION_CHUNK_SIZE bytes instead of
+one multipart request:
+
+    POST   /api/services/<request_id>/uploads      {file_name, file_size[, file_type, sha256]}
+    PUT    /api/services/uploads/<id>/chunks/<n>   raw bytes of chunk n
+    GET    /api/services/uploads/<id>              -> received bytes / next chunk
+    POST   /api/services/uploads/<id>/complete     -> Document
+    DELETE /api/services/uploads/<id>
+
+Each chunk is streamed straight to its offset in
+UPLOAD_FOLDER/sessions/<id>.part (never held in memory) and only then is
+`received` advanced with a conditional UPDATE, so no transaction stays
+open while a slow client sends its body.  Chunks must arrive in order;
+re-sending a chunk that was already stored is a no-op, so a client
+that lost the response simply retries.  complete() hashes the part
+file before taking the session's row lock and hands it to upload_store
+like a normal upload (deduplicated, refcounted, photos queued for a
+preview); a declared sha256 that does not match discards the session.
+The completed session records its document_id, so a /complete retried
+after a lost response returns the same document.
+
+A session expires UPLOAD_SESSION_TTL_HOURS after its last chunk (or
+its completion);
+collect_stale() (part of `flask gc-uploads`) deletes expired sessions
+and their part files.
+"""
+import os
+import time
+from datetime import datetime, timedelta
+from werkzeug.exceptions import ClientDisconnected
+from extensions import db
+from models import Document, UploadSession
+from config import Config
+import upload_store
+import document_images
+
+SESSION_DIR = 'sessions'
+COPY_BUFFER = 64 * 1024
+
+
+class UploadRejected(Exception):
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def part_path(session_id):
+    return os.path.join(Config.UPLOAD_FOLDER, SESSION_DIR, f"{session_id}.part")
+
+
+def _expiry():
+    return datetime.utcnow() + timedelta(hours=Config.UPLOAD_SESSION_TTL_HOURS)
+
+
+def create(service_req, user_id, file_name, file_type, total_size, sha256=None):
+    if total_size <= 0:
+        raise UploadRejected('file_size must be positive')
+    if total_size > Config.UPLOAD_SESSION_MAX_SIZE:
+        raise UploadRejected(f"File is larger than {Config.UPLOAD_SESSION_MAX_SIZE // (1024 * 1024)} MB", 413)
+    if sha256 is not None and (len(sha256) != 64 or any(ch not in '0123456789abcdef' for ch in sha256)):
+        raise UploadRejected('sha256 must be 64 lowercase hex digits')
+
+    session = UploadSession(
+        request_id=service_req.id,
+        user_id=user_id,
+        file_name=file_name,
+        file_type=file_type,
+        total_size=total_size,
+        chunk_size=Config.UPLOAD_SESSION_CHUNK_SIZE,
+        sha256=sha256,
+        expires_at=_expiry()
+    )
+    db.session.add(session)
+    db.session.flush()
+    os.makedirs(os.path.dirname(part_path(session.id)), exist_ok=True)
+    open(part_path(session.id), 'wb').close()
+    db.session.commit()
+    return session
+
+
+def status(session):
+    return {
+        'upload_id': session.id,
+        'file_name': session.file_name,
+        'file_size': session.total_size,
+        'chunk_size': session.chunk_size,
+        'received': session.received,
+        'next_chunk': session.received // session.chunk_size,
+        'chunks': -(-session.total_size // session.chunk_size),
+        'complete': session.received == session.total_size,
+        'document_id': session.document_id,
+        'expires_at': session.expires_at.isoformat()
+    }
+
+
+def write_chunk(session, index, stream, length):
+    """Store chunk `index` from `stream` (`length` bytes); returns the session's received offset."""
+    offset = index * session.chunk_size
+    if index < 0 or offset >= session.total_size:
+        raise UploadRejected(f"Chunk {index} is out of range")
+    expected = min(session.chunk_size, session.total_size - offset)
+    if length is not None and length != expected:
+        raise UploadRejected(f"Chunk {index} must be {expected} bytes, got {length}")
+    if offset + expected <= session.received:
+        return session.received           # already stored (retry after a lost response)
+    if offset > session.received:
+        raise UploadRejected(f"Expected chunk {session.received // session.chunk_size} next", 409)
+
+    written = 0
+    try:
+        with open(part_path(session.id), 'r+b') as out:
+            out.seek(offset)
+            while written < expected:
+                piece = stream.read(min(COPY_BUFFER, expected - written))
+                if not piece:
+                    break
+                out.write(piece)
+                written += len(piece)
+    except ClientDisconnected:
+        pass
+    except FileNotFoundError:
+        raise UploadRejected('Upload session has expired', 410)
+    if written != expected:
+        raise UploadRejected(f"Chunk {index} was cut off after {written} of {expected} bytes; send it again")
+
+    table = UploadSession.__table__
+    db.session.execute(
+        table.update()
+        .where(table.c.id == session.id, table.c.received == offset)
+        .values(received=offset + expected, updated_at=datetime.utcnow(), expires_at=_expiry())
+    )
+    db.session.commit()
+    db.session.refresh(session)
+    return session.received
+
+
+def complete(session):
+    """
+    Turn a fully received session into a Document.  Returns (document,
+    deduplicated); deduplicated is None when the session had already been
+    completed and the same document is returned again.
+    """
+    if session.document_id:
+        return db.session.get(Document, session.document_id), None
+    if session.received != session.total_size:
+        raise UploadRejected(f"Only {session.received} of {session.total_size} bytes received", 409)
+
+    # Hash with no transaction open and no lock held, then lock the row
+    # and check that no concurrent /complete got there first
+    session_id = session.id
+    db.session.rollback()
+    try:
+        staged = upload_store.adopt(part_path(session_id))
+    except FileNotFoundError:
+        staged = None               # placed by a concurrent /complete, or expired
+    session = UploadSession.query.filter_by(id=session_id).with_for_update().first()
+    if session is None:
+        raise UploadRejected('Upload not found', 404)
+    if session.document_id:
+        db.session.rollback()
+        return db.session.get(Document, session.document_id), None
+    if staged is None:
+        db.session.rollback()
+        raise UploadRejected('Upload session has expired', 410)
+
+    if session.sha256 and staged.sha256 != session.sha256:
+        staged.discard()
+        db.session.delete(session)
+        db.session.commit()
+        raise UploadRejected('Uploaded file does not match the declared sha256; upload it again', 422)
+
+    try:
+        duplicate = upload_store.reference(staged)
+        doc = Document(
+            request_id=session.request_id,
+            user_id=session.user_id,
+            file_name=session.file_name,
+            file_path=upload_store.relative_path(staged.sha256),
+            file_type=session.file_type,
+            file_size=staged.size,
+            sha256=staged.sha256
+        )
+        db.session.add(doc)
+        db.session.flush()
+        session.document_id = doc.id
+        session.updated_at = datetime.utcnow()
+        image_job = document_images.enqueue(doc)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    upload_store.place(staged)
+    if image_job:
+        document_images.ensure_inprocess_workers()
+    return doc, duplicate
+
+
+def abort(session):
+    path = part_path(session.id)
+    db.session.delete(session)
+    db.session.commit()
+    if os.path.exists(path):
+        os.remove(path)
+
+
+def collect_stale():
+    """Delete expired sessions and part files without a session.  Returns (sessions, bytes freed)."""
+    expired = [row[0] for row in db.session.query(UploadSession.id)
+               .filter(UploadSession.expires_at < datetime.utcnow())]
+    if expired:
+        UploadSession.query.filter(UploadSession.id.in_(expired)).delete(synchronize_session=False)
+        db.session.commit()
+
+    live = {row[0] for row in db.session.query(UploadSession.id)}
+    directory = os.path.join(Config.UPLOAD_FOLDER, SESSION_DIR)
+    freed = 0
+    if os.path.isdir(directory):
+        cutoff = time.time() - 3600     # a session created this instant may not be committed yet
+        for name in os.listdir(directory):
+            path = os.path.join(directory, name)
+            if name[:-len('.part')] in live or os.path.getmtime(path) > cutoff:
+                continue
+            freed += os.path.getsize(path)
+            os.remove(path)
+    return len(expired), freed
@@ -0,0 +1,253 @@
+"""
+Content-addressed storage for uploaded documents.
+
+An upload is streamed to a temporary file in UPLOAD_CHUNK_SIZE pieces
+and SHA-256 hashed on the way, then kept once under
+
+    UPLOAD_FOLDER/ab/cd/<sha256>
+
+(two levels of 256 shards, so no directory grows past a few thousand
+entries).  document_blobs holds one row per stored file with the number
+of Document rows pointing at it; identical scans uploaded for several
+applications share one file.
+
+Order of operations keeps the file and the row consistent without a
+distributed lock:
+
+  * stage()    - stream + hash into UPLOAD_FOLDER/tmp (same filesystem);
+                 adopt() hashes a finished resumable upload in place
+  * reference() - upsert ref_count + 1 in the caller's transaction
+  * place()    - after the commit: rename the temp file into place, or
+                 drop it when the blob already exists
+  * release()  - ref_count - 1 in the caller's transaction; the file
+                 stays until collect_garbage()
+
+Derivatives of a blob (the preview and thumbnail document_images.py
+makes of photos) live beside it under UPLOAD_FOLDER/derived/ab/cd/ and
+are keyed by the same hash, so they are shared like the blob itself.
+
+collect_garbage() deletes blobs whose ref_count reached 0, and their
+derivatives, while holding their row lock, so an upload that references the same hash at that
+moment waits, re-inserts the row and places its own copy.  It is run
+by `flask gc-uploads` (which also expires resumable upload sessions, see
+upload_sessions.py); `flask migrate-uploads` moves files stored flat
+by earlier versions into the sharded layout.
+"""
+import os
+import time
+import uuid
+import hashlib
+from datetime import datetime
+import click
+from flask.cli import with_appcontext
+from extensions import db
+from models import Document, DocumentBlob
+from config import Config
+
+TMP_DIR = 'tmp'
+DERIVED_DIR = 'derived'
+DERIVATIVES = ('preview', 'thumbnail')
+
+
+class StagedUpload:
+    def __init__(self, sha256, size, temp_path):
+        self.sha256 = sha256
+        self.size = size
+        self.temp_path = temp_path
+
+    def discard(self):
+        if self.temp_path and os.path.exists(self.temp_path):
+            os.remove(self.temp_path)
+        self.temp_path = None
+
+
+def relative_path(sha256):
+    return os.path.join(sha256[:2], sha256[2:4], sha256)
+
+
+def absolute_path(relative):
+    return os.path.join(Config.UPLOAD_FOLDER, relative)
+
+
+def derived_relative_path(sha256, variant):
+    """Path under UPLOAD_FOLDER of a derivative ('preview' / 'thumbnail', always JPEG) of blob `sha256`."""
+    return os.path.join(DERIVED_DIR, sha256[:2], sha256[2:4], f"{sha256}.{variant}.jpg")
+
+
+def derived_path(sha256, variant):
+    return absolute_path(derived_relative_path(sha256, variant))
+
+
+def _tmp_dir():
+    path = os.path.join(Config.UPLOAD_FOLDER, TMP_DIR)
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def stage(stream, chunk_size=None):
+    """Copy `stream` to a temporary file, hashing as it goes.  Returns a StagedUpload."""
+    chunk_size = chunk_size or Config.UPLOAD_CHUNK_SIZE
+    temp_path = os.path.join(_tmp_dir(), f"{uuid.uuid4().hex}.part")
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        with open(temp_path, 'wb') as out:
+            while True:
+                chunk = stream.read(chunk_size)
+                if not chunk:
+                    break
+                digest.update(chunk)
+                out.write(chunk)
+                size += len(chunk)
+    except BaseException:
+        os.remove(temp_path)
+        raise
+    return StagedUpload(digest.hexdigest(), size, temp_path)
+
+
+def adopt(path, chunk_size=None):
+    """Hash a file that is already on disk (a finished resumable upload) without copying it."""
+    chunk_size = chunk_size or Config.UPLOAD_CHUNK_SIZE
+    digest = hashlib.sha256()
+    size = 0
+    with open(path, 'rb') as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            digest.update(chunk)
+            size += len(chunk)
+    return StagedUpload(digest.hexdigest(), size, path)
+
+
+def _upsert_reference(sha256, size, delta):
+    table = DocumentBlob.__table__
+    now = datetime.utcnow()
+    dialect = db.session.get_bind().dialect.name
+    if dialect in ('postgresql', 'sqlite'):
+        if dialect == 'postgresql':
+            from sqlalchemy.dialects.postgresql import insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert
+        stmt = insert(table).values(sha256=sha256, size=size, ref_count=delta, created_at=now, updated_at=now)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.c.sha256],
+            set_={'ref_count': table.c.ref_count + delta, 'updated_at': now}
+        ).returning(table.c.ref_count)
+        return db.session.execute(stmt).scalar()
+
+    result = db.session.execute(table.update().where(table.c.sha256 == sha256)
+                                .values(ref_count=table.c.ref_count + delta, updated_at=now))
+    if result.rowcount == 0:
+        db.session.execute(table.insert().values(sha256=sha256, size=size, ref_count=delta,
+                                                 created_at=now, updated_at=now))
+        return delta
+    return db.session.query(DocumentBlob.ref_count).filter_by(sha256=sha256).scalar()
+
+
+def reference(staged):
+    """Count one more Document pointing at the staged blob (no commit).  True if it was already stored."""
+    return _upsert_reference(staged.sha256, staged.size, 1) > 1
+
+
+def place(staged):
+    """After the commit: move the staged file to its sharded path unless that blob is already on disk."""
+    final = absolute_path(relative_path(staged.sha256))
+    if os.path.exists(final):
+        staged.discard()
+        return final
+    os.makedirs(os.path.dirname(final), exist_ok=True)
+    os.replace(staged.temp_path, final)
+    staged.temp_path = None
+    return final
+
+
+def release(sha256):
+    """One Document less points at `sha256` (no commit); the file goes at the next collect_garbage()."""
+    if sha256:
+        db.session.execute(DocumentBlob.__table__.update()
+                           .where(DocumentBlob.sha256 == sha256)
+                           .values(ref_count=DocumentBlob.ref_count - 1, updated_at=datetime.utcnow()))
+
+
+def collect_garbage(tmp_age_seconds=3600):
+    """Delete unreferenced blobs and abandoned temp files.  Returns (blobs, bytes, temp files) removed."""
+    blobs = freed = 0
+    for sha256 in [row[0] for row in db.session.query(DocumentBlob.sha256).filter(DocumentBlob.ref_count <= 0)]:
+        blob = (DocumentBlob.query.filter_by(sha256=sha256).filter(DocumentBlob.ref_count <= 0)
+                .with_for_update().first())
+        if blob is None:
+            db.session.rollback()
+            continue
+        for path in [absolute_path(relative_path(sha256))] + [derived_path(sha256, v) for v in DERIVATIVES]:
+            if os.path.exists(path):
+                freed += os.path.getsize(path)
+                os.remove(path)
+        db.session.delete(blob)
+        db.session.commit()
+        blobs += 1
+
+    temps = 0
+    cutoff = time.time() - tmp_age_seconds
+    tmp = _tmp_dir()
+    for name in os.listdir(tmp):
+        path = os.path.join(tmp, name)
+        if os.path.getmtime(path) < cutoff:
+            os.remove(path)
+            temps += 1
+    return blobs, freed, temps
+
+
+def migrate_legacy(batch_size=500):
+    """Move flat `<request>_<ts>_<name>` files into the sharded store.  Returns (documents, deduplicated)."""
+    moved = deduplicated = 0
+    while True:
+        docs = Document.query.filter(Document.sha256.is_(None)).limit(batch_size).all()
+        if not docs:
+            break
+        placements = []
+        for doc in docs:
+            legacy = absolute_path(doc.file_path or '')
+            if not doc.file_path or not os.path.isfile(legacy):
+                doc.sha256 = ''          # file missing: mark as seen so the loop ends
+                continue
+            with open(legacy, 'rb') as f:
+                staged = stage(f)
+            deduplicated += reference(staged)
+            doc.sha256 = staged.sha256
+            doc.file_path = relative_path(staged.sha256)
+            doc.file_size = staged.size
+            placements.append((staged, legacy))
+        db.session.commit()
+        for staged, legacy in placements:
+            place(staged)
+            os.remove(legacy)
+        moved += len(placements)
+    return moved, deduplicated
+
+
+def stats():
+    row = db.session.query(db.func.count(DocumentBlob.sha256), db.func.coalesce(db.func.sum(DocumentBlob.size), 0),
+                           db.func.coalesce(db.func.sum(DocumentBlob.ref_count), 0)).one()
+    return {'blobs': row[0], 'stored_bytes': int(row[1]), 'references': int(row[2])}
+
+
+@click.command('gc-uploads')
+@click.option('--tmp-age', default=3600, show_default=True, help='Remove temp files older than this (seconds)')
+@with_appcontext
+def gc_uploads_command(tmp_age):
+    """Delete uploaded blobs no document refers to any more, and expired resumable uploads."""
+    from upload_sessions import collect_stale
+    sessions, session_bytes = collect_stale()
+    blobs, freed, temps = collect_garbage(tmp_age)
+    click.echo(f"✅ {blobs} unreferenced blobs removed ({freed / 1024 / 1024:.1f} MB), {temps} stale temp files")
+    click.echo(f"✅ {sessions} expired upload sessions removed ({session_bytes / 1024 / 1024:.1f} MB of partial files)")
+
+
+@click.command('migrate-uploads')
+@with_appcontext
+def migrate_uploads_command():
+    """Move documents stored flat in UPLOAD_FOLDER into the content-addressed layout."""
+    moved, deduplicated = migrate_legacy()
+    click.echo(f"✅ {moved} documents moved, {deduplicated} were duplicates of an existing blob")
+    click.echo(f"   {stats()}")
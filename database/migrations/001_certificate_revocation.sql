@@ -0,0 +1,9 @@
+-- ============================================================
+-- 001 - Certificate revocation
+-- Adds the columns behind POST /api/certificates/{id}/revoke.
+-- Apply to databases created before this change:
+--   psql -U postgres -d gram_panchayat -f database/migrations/001_certificate_revocation.sql
+-- ============================================================
+
+ALTER TABLE certificates ADD COLUMN IF NOT EXISTS revoked_at TIMESTAMP;
+ALTER TABLE certificates ADD COLUMN IF NOT EXISTS revocation_reason TEXT;
@@ -0,0 +1,11 @@
+-- ============================================================
+-- 002 - Analytics rollup indexes
+-- daily_rollups / rollup_watermarks are created on startup; the
+-- watermark scans need these indexes on the existing tables.
+-- Apply to databases created before this change:
+--   psql -U postgres -d gram_panchayat -f database/migrations/002_rollup_indexes.sql
+-- ============================================================
+
+CREATE INDEX IF NOT EXISTS idx_service_requests_updated ON service_requests(updated_at);
+CREATE INDEX IF NOT EXISTS idx_grievances_updated       ON grievances(updated_at);
+CREATE INDEX IF NOT EXISTS idx_payments_paid            ON payments(paid_at);
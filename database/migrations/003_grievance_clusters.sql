@@ -0,0 +1,25 @@
+-- ============================================================
+-- 003 - Near-duplicate grievance clusters
+-- grievance_signatures / grievance_lsh_buckets are created on startup;
+-- existing grievances need the cluster_id column (and the table it
+-- references).
+-- Apply to databases created before this change:
+--   psql -U postgres -d gram_panchayat -f database/migrations/003_grievance_clusters.sql
+-- Then index recent grievances:
+--   flask --app app:create_app index-grievance-clusters
+-- ============================================================
+
+CREATE TABLE IF NOT EXISTS grievance_clusters (
+    id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
+    category VARCHAR(100),
+    subject VARCHAR(255),
+    first_grievance_id UUID,
+    size INT NOT NULL DEFAULT 0,
+    first_seen TIMESTAMP DEFAULT NOW(),
+    last_seen TIMESTAMP DEFAULT NOW()
+);
+
+ALTER TABLE grievances ADD COLUMN IF NOT EXISTS cluster_id UUID REFERENCES grievance_clusters(id);
+
+CREATE INDEX IF NOT EXISTS idx_grievances_cluster               ON grievances(cluster_id);
+CREATE INDEX IF NOT EXISTS idx_grievance_clusters_last_seen_id  ON grievance_clusters(last_seen, id);
@@ -0,0 +1,13 @@
+-- ============================================================
+-- 004 - Content-addressed document storage
+-- document_blobs is created on startup; existing documents need the
+-- sha256 column.
+-- Apply to databases created before this change:
+--   psql -U postgres -d gram_panchayat -f database/migrations/004_document_blobs.sql
+-- Then move the flat upload files into the sharded layout:
+--   flask --app app:create_app migrate-uploads
+-- ============================================================
+
+ALTER TABLE documents ADD COLUMN IF NOT EXISTS sha256 VARCHAR(64);
+
+CREATE INDEX IF NOT EXISTS idx_documents_sha256 ON documents(sha256);
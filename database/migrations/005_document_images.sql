@@ -0,0 +1,12 @@
+-- ============================================================
+-- 005 - Document previews and thumbnails
+-- document_jobs is created on startup; existing documents need the
+-- size columns.
+-- Apply to databases created before this change:
+--   psql -U postgres -d gram_panchayat -f database/migrations/005_document_images.sql
+-- Then queue the photos uploaded so far:
+--   flask --app app:create_app image-worker --backfill
+-- ============================================================
+
+ALTER TABLE documents ADD COLUMN IF NOT EXISTS preview_size INT;
+ALTER TABLE documents ADD COLUMN IF NOT EXISTS thumbnail_size INT;
@@ -0,0 +1,90 @@
+-- ============================================================
+-- 006 - Native UUID keys, time-ordered (UUIDv7) defaults
+-- Databases created by db.create_all() before this change store every
+-- primary / foreign key as VARCHAR(36); this converts them to UUID
+-- (16 bytes) in place and rebuilds their indexes.  Databases created
+-- from schema.sql already use UUID and only get the new defaults.
+-- Existing rows keep their random (v4) ids; new ids are v7 and sort by
+-- creation time, so index inserts append instead of splitting pages.
+-- Rewrites the affected tables under an exclusive lock: run it in a
+-- maintenance window, then `VACUUM ANALYZE;`.
+-- Apply to databases created before this change:
+--   psql -U postgres -d gram_panchayat -f database/migrations/006_uuid_keys.sql
+-- ============================================================
+
+CREATE EXTENSION IF NOT EXISTS "uuid-ossp";
+
+-- RFC 9562 version 7: 48-bit Unix milliseconds + random bits (v4 with
+-- its first 6 bytes replaced and the version nibble set to 0111)
+CREATE OR REPLACE FUNCTION uuid_generate_v7() RETURNS uuid AS $$
+    SELECT encode(
+        set_bit(set_bit(
+            overlay(uuid_send(uuid_generate_v4())
+                    PLACING substring(int8send(floor(extract(epoch FROM clock_timestamp()) * 1000)::bigint) FROM 3)
+                    FROM 1 FOR 6),
+            52, 1), 53, 1),
+        'hex')::uuid;
+$$ LANGUAGE sql VOLATILE;
+
+DO $$
+DECLARE
+    key record;
+    fk record;
+BEGIN
+    CREATE TEMP TABLE uuid_key_columns (tbl text, col text) ON COMMIT DROP;
+    INSERT INTO uuid_key_columns VALUES
+        ('users', 'id'), ('otp_logs', 'id'), ('admins', 'id'),
+        ('service_requests', 'id'), ('service_requests', 'user_id'), ('service_requests', 'assigned_to'),
+        ('documents', 'id'), ('documents', 'request_id'), ('documents', 'user_id'),
+        ('document_jobs', 'id'), ('document_jobs', 'document_id'),
+        ('upload_sessions', 'id'), ('upload_sessions', 'request_id'), ('upload_sessions', 'user_id'),
+        ('grievances', 'id'), ('grievances', 'user_id'), ('grievances', 'assigned_to'), ('grievances', 'cluster_id'),
+        ('grievance_clusters', 'id'), ('grievance_clusters', 'first_grievance_id'),
+        ('grievance_signatures', 'grievance_id'), ('grievance_lsh_buckets', 'grievance_id'),
+        ('grievance_updates', 'id'), ('grievance_updates', 'grievance_id'), ('grievance_updates', 'updated_by'),
+        ('payments', 'id'), ('payments', 'request_id'), ('payments', 'user_id'),
+        ('certificates', 'id'), ('certificates', 'request_id'), ('certificates', 'user_id'),
+        ('certificates', 'issued_by'),
+        ('certificate_jobs', 'id'), ('certificate_jobs', 'certificate_id'),
+        ('chat_logs', 'id'), ('chat_logs', 'user_id'),
+        ('analytics_logs', 'id'), ('analytics_logs', 'user_id');
+
+    CREATE TEMP TABLE uuid_key_pending ON COMMIT DROP AS
+        SELECT k.tbl, k.col
+        FROM uuid_key_columns k
+        JOIN information_schema.columns c
+          ON c.table_schema = current_schema() AND c.table_name = k.tbl AND c.column_name = k.col
+        WHERE c.data_type <> 'uuid';
+
+    IF EXISTS (SELECT 1 FROM uuid_key_pending) THEN
+        -- foreign keys cannot span a VARCHAR and a UUID column: drop them while the types change
+        CREATE TEMP TABLE uuid_key_fks ON COMMIT DROP AS
+            SELECT conrelid::regclass::text AS tbl, conname, pg_get_constraintdef(oid) AS def
+            FROM pg_constraint
+            WHERE contype = 'f'
+              AND connamespace = current_schema()::regnamespace
+              AND conrelid::regclass::text IN (SELECT tbl FROM uuid_key_columns);
+
+        FOR fk IN SELECT * FROM uuid_key_fks LOOP
+            EXECUTE format('ALTER TABLE %s DROP CONSTRAINT %I', fk.tbl, fk.conname);
+        END LOOP;
+
+        FOR key IN SELECT * FROM uuid_key_pending LOOP
+            EXECUTE format('ALTER TABLE %I ALTER COLUMN %I TYPE uuid USING %I::uuid', key.tbl, key.col, key.col);
+        END LOOP;
+
+        FOR fk IN SELECT * FROM uuid_key_fks LOOP
+            EXECUTE format('ALTER TABLE %s ADD CONSTRAINT %I %s', fk.tbl, fk.conname, fk.def);
+        END LOOP;
+    END IF;
+
+    FOR key IN
+        SELECT k.tbl
+        FROM uuid_key_columns k
+        JOIN information_schema.columns c
+          ON c.table_schema = current_schema() AND c.table_name = k.tbl AND c.column_name = k.col
+        WHERE k.col = 'id'
+    LOOP
+        EXECUTE format('ALTER TABLE %I ALTER COLUMN id SET DEFAULT uuid_generate_v7()', key.tbl);
+    END LOOP;
+END $$;
@@ -0,0 +1,10 @@
+-- ============================================================
+-- 007 - Idempotent completion of resumable uploads
+-- A completed upload session now keeps the id of the document it
+-- created, so a retried /complete returns that document.
+-- Apply to databases created before this change (after 006):
+--   psql -U postgres -d gram_panchayat -f database/migrations/007_upload_session_document.sql
+-- ============================================================
+
+ALTER TABLE upload_sessions
+    ADD COLUMN IF NOT EXISTS document_id UUID REFERENCES documents(id) ON DELETE SET NULL;
@@ -0,0 +1,12 @@
+-- ============================================================
+-- 008 - Stored payment receipt numbers
+-- New receipts get an allocated number (RCP-YYYYMMDD-NNNNNNNN, see
+-- backend/reference_numbers.py) stored with the payment.  Receipts
+-- issued before this migration keep the number derived from the
+-- payment id, which the API still computes when the column is NULL.
+-- Apply to databases created before this change (after 007):
+--   psql -U postgres -d gram_panchayat -f database/migrations/008_payment_receipt_number.sql
+-- ============================================================
+
+ALTER TABLE payments
+    ADD COLUMN IF NOT EXISTS receipt_number VARCHAR(30) UNIQUE;
@@ -0,0 +1,16 @@
+-- ============================================================
+-- 009 - Database-backed OTP store
+-- OTP_STORE_URL now defaults to database://: the live OTP of each
+-- mobile is kept (hashed) in otp_codes, so every gunicorn worker sees
+-- it without Redis.
+-- Apply to databases created before this change (after 008):
+--   psql -U postgres -d gram_panchayat -f database/migrations/009_otp_codes.sql
+-- ============================================================
+
+CREATE TABLE IF NOT EXISTS otp_codes (
+    mobile VARCHAR(15) PRIMARY KEY,
+    code_hash VARCHAR(64) NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    expires_at TIMESTAMP NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_otp_codes_expires ON otp_codes(expires_at);
@@ -0,0 +1,16 @@
+-- ============================================================
+-- 010 - Database-backed chatbot sessions
+-- CHAT_SESSION_STORE_URL follows OTP_STORE_URL (database:// by
+-- default): the recent messages of each chatbot conversation are kept
+-- in chat_sessions, so every gunicorn worker sees them without Redis.
+-- Apply to databases created before this change (after 009):
+--   psql -U postgres -d gram_panchayat -f database/migrations/010_chat_sessions.sql
+-- ============================================================
+
+CREATE TABLE IF NOT EXISTS chat_sessions (
+    session_id VARCHAR(100) PRIMARY KEY,
+    owner VARCHAR(36) NOT NULL DEFAULT '',
+    messages TEXT NOT NULL DEFAULT '[]',
+    expires_at TIMESTAMP NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_chat_sessions_expires ON chat_sessions(expires_at);
@@ -6,9 +6,22 @@
 
 CREATE EXTENSION IF NOT EXISTS "uuid-ossp";
 
+-- Time-ordered keys (RFC 9562 version 7): 48-bit Unix milliseconds + random
+-- bits, so new rows append to the end of primary-key indexes.  The backend
+-- generates the same in Python (models.uuid7).
+CREATE OR REPLACE FUNCTION uuid_generate_v7() RETURNS uuid AS $$
+    SELECT encode(
+        set_bit(set_bit(
+            overlay(uuid_send(uuid_generate_v4())
+                    PLACING substring(int8send(floor(extract(epoch FROM clock_timestamp()) * 1000)::bigint) FROM 3)
+                    FROM 1 FOR 6),
+            52, 1), 53, 1),
+        'hex')::uuid;
+$$ LANGUAGE sql VOLATILE;
+
 -- USERS TABLE
 CREATE TABLE IF NOT EXISTS users (
-    id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
+    id UUID PRIMARY KEY DEFAULT uuid_generate_v7(),
     full_name VARCHAR(150) NOT NULL,
     mobile VARCHAR(15) UNIQUE NOT NULL,
     email VARCHAR(150) UNIQUE,
@@ -25,7 +38,7 @@ CREATE TABLE IF NOT EXISTS users (
 
 -- OTP TABLE
 CREATE TABLE IF NOT EXISTS otp_logs (
-    id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
+    id UUID PRIMARY KEY DEFAULT uuid_generate_v7(),
     mobile VARCHAR(15) NOT NULL,
     otp_code VARCHAR(6) NOT NULL,
     purpose VARCHAR(50) DEFAULT 'login',
@@ -34,9 +47,18 @@ CREATE TABLE IF NOT EXISTS otp_logs (
     created_at TIMESTAMP DEFAULT NOW()
 );
 
+-- LIVE OTPs (OTP_STORE_URL=database://, see backend/otp_store.py)
+CREATE TABLE IF NOT EXISTS otp_codes (
+    mobile VARCHAR(15) PRIMARY KEY,
+    code_hash VARCHAR(64) NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    expires_at TIMESTAMP NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_otp_codes_expires ON otp_codes(expires_at);
+
 -- ADMINS TABLE
 CREATE TABLE IF NOT EXISTS admins (
-    id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
+    id UUID PRIMARY KEY DEFAULT uuid_generate_v7(),
     username VARCHAR(100) UNIQUE NOT NULL,
     email VARCHAR(150) UNIQUE NOT NULL,
     password_hash TEXT NOT NULL,
@@ -63,7 +85,7 @@ CREATE TABLE IF NOT EXISTS service_categories (
 
 -- SERVICE REQUESTS
 CREATE TABLE IF NOT EXISTS service_requests (
-    id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
+    id UUID PRIMARY KEY DEFAULT uuid_generate_v7(),
     user_id UUID NOT NULL REFERENCES users(id),
     category_id INT REFERENCES service_categories(id),
     request_number VARCHAR(30) UNIQUE NOT NULL,
@@ -79,19 +101,80 @@ CREATE TABLE IF NOT EXISTS service_requests (
 
 -- DOCUMENTS
 CREATE TABLE IF NOT EXISTS documents (
-    id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
+    id UUID PRIMARY KEY DEFAULT uuid_generate_v7(),
     request_id UUID REFERENCES service_requests(id),
     user_id UUID REFERENCES users(id),
     file_name VARCHAR(255),
     file_path TEXT,
     file_type VARCHAR(50),
     file_size INT,
+    sha256 VARCHAR(64),
+    preview_size INT,
+    thumbnail_size INT,
     uploaded_at TIMESTAMP DEFAULT NOW()
 );
 
+-- DOCUMENT JOBS
+-- Preview / thumbnail rendering queue for photographed documents
+-- (backend/document_images.py)
+CREATE TABLE IF NOT EXISTS document_jobs (
+    id UUID PRIMARY KEY DEFAULT uuid_generate_v7(),
+    document_id UUID NOT NULL REFERENCES documents(id) ON DELETE CASCADE,
+    status VARCHAR(20) DEFAULT 'queued',
+    attempts INT DEFAULT 0,
+    max_attempts INT DEFAULT 3,
+    last_error TEXT,
+    run_after TIMESTAMP DEFAULT NOW(),
+    locked_by VARCHAR(100),
+    locked_at TIMESTAMP,
+    created_at TIMESTAMP DEFAULT NOW(),
+    finished_at TIMESTAMP
+);
+
+-- DOCUMENT BLOBS
+-- One row per stored upload (UPLOAD_FOLDER/ab/cd/<sha256>); identical files
+-- uploaded for several requests share it (backend/upload_store.py)
+CREATE TABLE IF NOT EXISTS document_blobs (
+    sha256 VARCHAR(64) PRIMARY KEY,
+    size BIGINT NOT NULL,
+    ref_count INT NOT NULL DEFAULT 0,
+    created_at TIMESTAMP DEFAULT NOW(),
+    updated_at TIMESTAMP DEFAULT NOW()
+);
+
+-- UPLOAD SESSIONS
+-- Resumable chunked uploads in progress (backend/upload_sessions.py)
+CREATE TABLE IF NOT EXISTS upload_sessions (
+    id UUID PRIMARY KEY DEFAULT uuid_generate_v7(),
+    request_id UUID NOT NULL REFERENCES service_requests(id),
+    user_id UUID NOT NULL REFERENCES users(id),
+    file_name VARCHAR(255),
+    file_type VARCHAR(50),
+    total_size BIGINT NOT NULL,
+    chunk_size INT NOT NULL,
+    received BIGINT NOT NULL DEFAULT 0,
+    sha256 VARCHAR(64),
+    document_id UUID REFERENCES documents(id) ON DELETE SET NULL,
+    created_at TIMESTAMP DEFAULT NOW(),
+    updated_at TIMESTAMP DEFAULT NOW(),
+    expires_at TIMESTAMP NOT NULL
+);
+
+-- GRIEVANCE CLUSTERS
+-- Near-duplicate grievances grouped by grievance_clusters.py
+CREATE TABLE IF NOT EXISTS grievance_clusters (
+    id UUID PRIMARY KEY DEFAULT uuid_generate_v7(),
+    category VARCHAR(100),
+    subject VARCHAR(255),
+    first_grievance_id UUID,
+    size INT NOT NULL DEFAULT 0,
+    first_seen TIMESTAMP DEFAULT NOW(),
+    last_seen TIMESTAMP DEFAULT NOW()
+);
+
 -- GRIEVANCES
 CREATE TABLE IF NOT EXISTS grievances (
-    id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
+    id UUID PRIMARY KEY DEFAULT uuid_generate_v7(),
     user_id UUID NOT NULL REFERENCES users(id),
     grievance_number VARCHAR(30) UNIQUE NOT NULL,
     category VARCHAR(100),
@@ -104,12 +187,13 @@ CREATE TABLE IF NOT EXISTS grievances (
     escalation_level INT DEFAULT 0,
     submitted_at TIMESTAMP DEFAULT NOW(),
     updated_at TIMESTAMP DEFAULT NOW(),
-    resolved_at TIMESTAMP
+    resolved_at TIMESTAMP,
+    cluster_id UUID REFERENCES grievance_clusters(id)
 );
 
 -- GRIEVANCE UPDATES
 CREATE TABLE IF NOT EXISTS grievance_updates (
-    id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
+    id UUID PRIMARY KEY DEFAULT uuid_generate_v7(),
     grievance_id UUID REFERENCES grievances(id),
     updated_by UUID REFERENCES admins(id),
     update_text TEXT,
@@ -119,7 +203,7 @@ CREATE TABLE IF NOT EXISTS grievance_updates (
 
 -- PAYMENTS
 CREATE TABLE IF NOT EXISTS payments (
-    id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
+    id UUID PRIMARY KEY DEFAULT uuid_generate_v7(),
     request_id UUID REFERENCES service_requests(id),
     user_id UUID REFERENCES users(id),
     amount NUMERIC(10,2) NOT NULL,
@@ -128,13 +212,14 @@ CREATE TABLE IF NOT EXISTS payments (
     status VARCHAR(30) DEFAULT 'pending',
     payment_method VARCHAR(50) DEFAULT 'mock',
     mock_reference VARCHAR(50),
+    receipt_number VARCHAR(30) UNIQUE,
     paid_at TIMESTAMP,
     created_at TIMESTAMP DEFAULT NOW()
 );
 
 -- CERTIFICATES
 CREATE TABLE IF NOT EXISTS certificates (
-    id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
+    id UUID PRIMARY KEY DEFAULT uuid_generate_v7(),
     request_id UUID REFERENCES service_requests(id),
     user_id UUID REFERENCES users(id),
     certificate_type VARCHAR(100),
@@ -143,12 +228,30 @@ CREATE TABLE IF NOT EXISTS certificates (
     pdf_path TEXT,
     issued_by UUID REFERENCES admins(id),
     valid_until DATE,
-    issued_at TIMESTAMP DEFAULT NOW()
+    issued_at TIMESTAMP DEFAULT NOW(),
+    revoked_at TIMESTAMP,
+    revocation_reason TEXT
+);
+
+-- CERTIFICATE JOBS
+-- Background PDF rendering queue (backend/jobs.py)
+CREATE TABLE IF NOT EXISTS certificate_jobs (
+    id UUID PRIMARY KEY DEFAULT uuid_generate_v7(),
+    certificate_id UUID NOT NULL REFERENCES certificates(id),
+    status VARCHAR(20) DEFAULT 'queued',
+    attempts INT DEFAULT 0,
+    max_attempts INT DEFAULT 5,
+    last_error TEXT,
+    run_after TIMESTAMP DEFAULT NOW(),
+    locked_by VARCHAR(100),
+    locked_at TIMESTAMP,
+    created_at TIMESTAMP DEFAULT NOW(),
+    finished_at TIMESTAMP
 );
 
 -- CHAT LOGS
 CREATE TABLE IF NOT EXISTS chat_logs (
-    id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
+    id UUID PRIMARY KEY DEFAULT uuid_generate_v7(),
     user_id UUID REFERENCES users(id),
     session_id VARCHAR(100),
     user_message TEXT,
@@ -157,10 +260,19 @@ CREATE TABLE IF NOT EXISTS chat_logs (
     created_at TIMESTAMP DEFAULT NOW()
 );
 
+-- CHATBOT CONVERSATIONS (CHAT_SESSION_STORE_URL=database://, see backend/chat_sessions.py)
+CREATE TABLE IF NOT EXISTS chat_sessions (
+    session_id VARCHAR(100) PRIMARY KEY,
+    owner VARCHAR(36) NOT NULL DEFAULT '',
+    messages TEXT NOT NULL DEFAULT '[]',
+    expires_at TIMESTAMP NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_chat_sessions_expires ON chat_sessions(expires_at);
+
 -- ANALYTICS LOGS
 -- IMPORTANT: Column is named 'event_data' NOT 'metadata' (metadata is reserved by SQLAlchemy)
 CREATE TABLE IF NOT EXISTS analytics_logs (
-    id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
+    id UUID PRIMARY KEY DEFAULT uuid_generate_v7(),
     event_type VARCHAR(100),
     user_id UUID REFERENCES users(id),
     event_data JSONB,
@@ -168,6 +280,83 @@ CREATE TABLE IF NOT EXISTS analytics_logs (
     created_at TIMESTAMP DEFAULT NOW()
 );
 
+-- STAT COUNTERS
+-- Incrementally maintained by the API on every insert / status change.
+-- status '_total' holds the row count of the whole entity table.
+-- Recompute with: flask --app app:create_app rebuild-stats
+CREATE TABLE IF NOT EXISTS stat_counters (
+    entity VARCHAR(50) NOT NULL,
+    status VARCHAR(30) NOT NULL,
+    count BIGINT NOT NULL DEFAULT 0,
+    amount NUMERIC(14,2) NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP DEFAULT NOW(),
+    PRIMARY KEY (entity, status)
+);
+
+-- CACHE VERSIONS
+-- Bumped in the same transaction as a change to a cached table; every
+-- worker compares the version to drop its copy (backend/catalogue.py)
+CREATE TABLE IF NOT EXISTS cache_versions (
+    name VARCHAR(50) PRIMARY KEY,
+    version BIGINT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP DEFAULT NOW()
+);
+
+-- DAILY ROLLUPS
+-- Per-day aggregates behind /api/analytics (backend/rollups.py), refreshed
+-- incrementally from rollup_watermarks: flask --app app:create_app rollup-analytics
+CREATE TABLE IF NOT EXISTS daily_rollups (
+    metric VARCHAR(30) NOT NULL,
+    day DATE NOT NULL,
+    dim1 VARCHAR(100) NOT NULL DEFAULT '',
+    dim2 VARCHAR(100) NOT NULL DEFAULT '',
+    count BIGINT NOT NULL DEFAULT 0,
+    amount NUMERIC(14,2) NOT NULL DEFAULT 0,
+    PRIMARY KEY (metric, day, dim1, dim2)
+);
+
+CREATE TABLE IF NOT EXISTS rollup_watermarks (
+    metric VARCHAR(30) PRIMARY KEY,
+    high_water TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT NOW()
+);
+
+-- JOB CHECKPOINTS
+-- Resume position of long-running maintenance passes (e.g. grievance re-classification)
+CREATE TABLE IF NOT EXISTS job_checkpoints (
+    name VARCHAR(100) PRIMARY KEY,
+    position VARCHAR(64),
+    processed BIGINT NOT NULL DEFAULT 0,
+    changed BIGINT NOT NULL DEFAULT 0,
+    started_at TIMESTAMP DEFAULT NOW(),
+    finished_at TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT NOW()
+);
+
+-- GRIEVANCE SIGNATURES / LSH BUCKETS (see grievance_clusters.py)
+CREATE TABLE IF NOT EXISTS grievance_signatures (
+    grievance_id UUID PRIMARY KEY REFERENCES grievances(id),
+    signature BYTEA NOT NULL,
+    created_at TIMESTAMP DEFAULT NOW()
+);
+
+CREATE TABLE IF NOT EXISTS grievance_lsh_buckets (
+    band SMALLINT NOT NULL,
+    bucket BIGINT NOT NULL,
+    grievance_id UUID NOT NULL REFERENCES grievances(id),
+    created_at TIMESTAMP DEFAULT NOW(),
+    PRIMARY KEY (band, bucket, grievance_id)
+);
+
+-- REFERENCE COUNTERS
+-- Stand-in for the per-day ref_<prefix>_<period> sequences on databases
+-- without sequences (SQLite in development); unused on PostgreSQL, where
+-- backend/reference_numbers.py creates the sequences on first use
+CREATE TABLE IF NOT EXISTS reference_counters (
+    name VARCHAR(60) PRIMARY KEY,
+    value BIGINT NOT NULL DEFAULT 0
+);
+
 -- INDEXES
 CREATE INDEX IF NOT EXISTS idx_service_requests_user   ON service_requests(user_id);
 CREATE INDEX IF NOT EXISTS idx_service_requests_status ON service_requests(status);
@@ -176,6 +365,30 @@ CREATE INDEX IF NOT EXISTS idx_grievances_status       ON grievances(status);
 CREATE INDEX IF NOT EXISTS idx_payments_user           ON payments(user_id);
 CREATE INDEX IF NOT EXISTS idx_analytics_event         ON analytics_logs(event_type);
 CREATE INDEX IF NOT EXISTS idx_otp_mobile              ON otp_logs(mobile);
+CREATE INDEX IF NOT EXISTS idx_certificate_jobs_claim  ON certificate_jobs(status, run_after);
+
+-- Keyset pagination: list endpoints seek on (submitted_at, id) / (created_at, id)
+CREATE INDEX IF NOT EXISTS idx_service_requests_submitted_id        ON service_requests(submitted_at, id);
+CREATE INDEX IF NOT EXISTS idx_service_requests_user_submitted_id   ON service_requests(user_id, submitted_at, id);
+CREATE INDEX IF NOT EXISTS idx_service_requests_status_submitted_id ON service_requests(status, submitted_at, id);
+CREATE INDEX IF NOT EXISTS idx_grievances_submitted_id              ON grievances(submitted_at, id);
+CREATE INDEX IF NOT EXISTS idx_grievances_user_submitted_id         ON grievances(user_id, submitted_at, id);
+CREATE INDEX IF NOT EXISTS idx_grievances_status_submitted_id       ON grievances(status, submitted_at, id);
+CREATE INDEX IF NOT EXISTS idx_users_created_id                     ON users(created_at, id);
+
+-- Rollup watermarks scan rows changed since the last refresh
+CREATE INDEX IF NOT EXISTS idx_service_requests_updated ON service_requests(updated_at);
+CREATE INDEX IF NOT EXISTS idx_grievances_updated       ON grievances(updated_at);
+CREATE INDEX IF NOT EXISTS idx_payments_paid            ON payments(paid_at);
+
+-- Grievance clusters
+CREATE INDEX IF NOT EXISTS idx_grievances_cluster               ON grievances(cluster_id);
+CREATE INDEX IF NOT EXISTS idx_grievance_clusters_last_seen_id  ON grievance_clusters(last_seen, id);
+
+-- Content-addressed uploads
+CREATE INDEX IF NOT EXISTS idx_documents_sha256 ON documents(sha256);
+CREATE INDEX IF NOT EXISTS idx_upload_sessions_expires ON upload_sessions(expires_at);
+CREATE INDEX IF NOT EXISTS idx_document_jobs_claim ON document_jobs(status, run_after);
 
 -- NOTE: Admin user and service categories are seeded by app.py on startup.
 --       This avoids hardcoding bcrypt hashes that may not match.
@@ -1,5 +1,5 @@
 import React, { useState, useRef, useEffect } from 'react';
-import api from '../utils/api';
+import { streamPost } from '../utils/api';
 
 const QUICK_QUESTIONS = [
   'How to get Birth Certificate?',
@@ -17,7 +17,7 @@ export default function Chatbot() {
   const [loading, setLoading] = useState(false);
   const [lang, setLang] = useState('en');
   const messagesEndRef = useRef(null);
-  const sessionId = useRef('sess_' + Date.now());
+  const sessionId = useRef(null);   // issued by the server in the first event of the first answer
 
   useEffect(() => { messagesEndRef.current?.scrollIntoView({ behavior: 'smooth' }); }, [messages]);
 
@@ -28,16 +28,31 @@ export default function Chatbot() {
     setMessages(prev => [...prev, { role: 'user', content: userMsg }]);
     setLoading(true);
 
+    // Append streamed text to the bot message being written, starting it on the first piece
+    const append = text => setMessages(prev => {
+      const last = prev[prev.length - 1];
+      if (last.streaming) return [...prev.slice(0, -1), { ...last, content: last.content + text }];
+      return [...prev, { role: 'bot', content: text, streaming: true }];
+    });
+    const finish = () => setMessages(prev => prev.map(m => (m.streaming ? { role: m.role, content: m.content } : m)));
+
     try {
-      const history = messages.slice(-6).map(m => ({ role: m.role === 'user' ? 'user' : 'assistant', content: m.content }));
-      const res = await api.post('/chatbot/message', { message: userMsg, session_id: sessionId.current, history, language: lang });
-      setMessages(prev => [...prev, { role: 'bot', content: res.data.response }]);
+      // The server keeps the conversation; only the new message and the session id are sent
+      await streamPost('/chatbot/stream', { message: userMsg, session_id: sessionId.current, language: lang }, (event, data) => {
+        if (event === 'session') sessionId.current = data.session_id;
+        else if (event === 'message' && data.delta) append(data.delta);
+        else if (event === 'error') append(`\n\n${data.message}`);
+        else if (event === 'done') sessionId.current = data.session_id;
+      });
     } catch (e) {
-      setMessages(prev => [...prev, { role: 'bot', content: 'Sorry, I could not process your request. Please try again.' }]);
+      append('Sorry, I could not process your request. Please try again.');
     }
+    finish();
     setLoading(false);
   };
 
+  const streaming = messages[messages.length - 1]?.streaming;
+
   return (
     <>
       {/* Floating Button */}
@@ -75,7 +90,7 @@ export default function Chatbot() {
                 </div>
               </div>
             ))}
-            {loading && (
+            {loading && !streaming && (
               <div className="flex justify-start">
                 <div className="bg-gray-100 px-3 py-2 rounded-lg text-sm text-gray-500">
                   <span className="animate-pulse">Typing...</span>
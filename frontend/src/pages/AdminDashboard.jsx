@@ -13,6 +13,42 @@ const StatCard = ({ label, value, icon, color }) => (
   </div>
 );
 
+// Documents are fetched with the officer's token, so they are loaded as blobs
+// rather than plain <img src>.  Photos show their thumbnail (a few kB);
+// clicking opens the recompressed preview, "original" the upload itself.
+const openDocument = async (doc, variant) => {
+  const tab = window.open('', '_blank');
+  try {
+    const res = await api.get(`/admin/documents/${doc.id}/file?variant=${variant}`, { responseType: 'blob' });
+    tab.location.href = URL.createObjectURL(res.data);
+  } catch (e) { tab.close(); toast.error('Could not open document'); }
+};
+
+const DocumentThumb = ({ doc }) => {
+  const [src, setSrc] = useState(null);
+  useEffect(() => {
+    if (doc.thumbnail_size == null) return;
+    let url;
+    api.get(`/admin/documents/${doc.id}/file`, { responseType: 'blob' })
+      .then(res => { url = URL.createObjectURL(res.data); setSrc(url); })
+      .catch(() => {});
+    return () => url && URL.revokeObjectURL(url);
+  }, [doc.id, doc.thumbnail_size]);
+
+  return (
+    <div className="w-40 text-xs">
+      <button onClick={() => openDocument(doc, 'preview')}
+        className="w-40 h-32 bg-gray-100 rounded border flex items-center justify-center overflow-hidden hover:border-blue-400">
+        {src ? <img src={src} alt={doc.file_name} className="max-w-full max-h-full" /> : <span className="text-3xl">📄</span>}
+      </button>
+      <div className="truncate mt-1" title={doc.file_name}>{doc.file_name}</div>
+      <button onClick={() => openDocument(doc, 'original')} className="text-blue-600 hover:underline">
+        original ({(doc.file_size / 1024 / 1024).toFixed(1)} MB)
+      </button>
+    </div>
+  );
+};
+
 export default function AdminDashboard() {
   const { user, logout } = useAuth();
   const navigate = useNavigate();
@@ -21,6 +57,7 @@ export default function AdminDashboard() {
   const [requests, setRequests] = useState([]);
   const [grievances, setGrievances] = useState([]);
   const [statusFilter, setStatusFilter] = useState('');
+  const [openDocs, setOpenDocs] = useState({ requestId: null, documents: [] });
   const [loading, setLoading] = useState(true);
 
   const loadData = async () => {
@@ -47,6 +84,14 @@ export default function AdminDashboard() {
     } catch (e) { toast.error('Update failed'); }
   };
 
+  const toggleDocuments = async (id) => {
+    if (openDocs.requestId === id) return setOpenDocs({ requestId: null, documents: [] });
+    try {
+      const res = await api.get(`/admin/requests/${id}/documents`);
+      setOpenDocs({ requestId: id, documents: res.data.documents || [] });
+    } catch (e) { toast.error('Failed to load documents'); }
+  };
+
   const updateGrievance = async (id, status, text = '') => {
     try {
       await api.put(`/admin/grievances/${id}/update`, { status, update_text: text });
@@ -150,7 +195,8 @@ export default function AdminDashboard() {
                   </thead>
                   <tbody className="divide-y divide-gray-100">
                     {requests.map(req => (
-                      <tr key={req.id} className="hover:bg-gray-50">
+                      <React.Fragment key={req.id}>
+                      <tr className="hover:bg-gray-50">
                         <td className="px-4 py-3 font-mono text-blue-600 text-xs">{req.request_number}</td>
                         <td className="px-4 py-3">{req.user?.full_name}<div className="text-xs text-gray-400">{req.user?.mobile}</div></td>
                         <td className="px-4 py-3">{req.category?.name_en || req.category?.name}</td>
@@ -164,9 +210,20 @@ export default function AdminDashboard() {
                             </>}
                             {req.status === 'approved' && <button onClick={() => updateRequest(req.id, 'completed')} className="bg-purple-100 text-purple-700 px-2 py-1 rounded text-xs hover:bg-purple-200">Complete</button>}
                             {req.status === 'pending' && <button onClick={() => updateRequest(req.id, 'processing')} className="bg-blue-100 text-blue-700 px-2 py-1 rounded text-xs hover:bg-blue-200">Process</button>}
+                            <button onClick={() => toggleDocuments(req.id)} className="bg-gray-100 text-gray-700 px-2 py-1 rounded text-xs hover:bg-gray-200">Documents</button>
                           </div>
                         </td>
                       </tr>
+                      {openDocs.requestId === req.id && (
+                        <tr>
+                          <td colSpan={6} className="px-4 py-3 bg-gray-50">
+                            {openDocs.documents.length === 0
+                              ? <span className="text-gray-500 text-xs">No documents uploaded</span>
+                              : <div className="flex flex-wrap gap-4">{openDocs.documents.map(d => <DocumentThumb key={d.id} doc={d} />)}</div>}
+                          </td>
+                        </tr>
+                      )}
+                      </React.Fragment>
                     ))}
                   </tbody>
                 </table>
@@ -1,6 +1,6 @@
 import React, { useState, useEffect } from 'react';
 import { useParams, useNavigate } from 'react-router-dom';
-import api from '../utils/api';
+import api, { resumableUpload } from '../utils/api';
 import toast from 'react-hot-toast';
 
 export default function ServiceRequest() {
@@ -12,6 +12,7 @@ export default function ServiceRequest() {
   const [submitting, setSubmitting] = useState(false);
   const [submitted, setSubmitted] = useState(null);
   const [uploading, setUploading] = useState(false);
+  const [progress, setProgress] = useState(0);
 
   useEffect(() => {
     api.get('/services/categories').then(r => {
@@ -31,12 +32,9 @@ export default function ServiceRequest() {
       // Upload files if any
       if (files.length > 0) {
         setUploading(true);
-        for (const file of files) {
-          const fd = new FormData();
-          fd.append('file', file);
-          await api.post(`/services/${res.data.request.id}/upload`, fd, {
-            headers: { 'Content-Type': 'multipart/form-data' }
-          });
+        for (const [i, file] of files.entries()) {
+          // Chunked and resumable, so a dropped connection does not restart the whole file
+          await resumableUpload(res.data.request.id, file, f => setProgress((i + f) / files.length));
         }
         setUploading(false);
         toast.success('Documents uploaded!');
@@ -60,7 +58,7 @@ export default function ServiceRequest() {
         </div>
         <p className="text-gray-500 text-sm mb-2">Processing Time: {category.processing_days} days</p>
         <p className="text-gray-500 text-sm mb-6">Fee: ₹{category.fee}</p>
-        {uploading && <p className="text-blue-600 text-sm mb-4">Uploading documents...</p>}
+        {uploading && <p className="text-blue-600 text-sm mb-4">Uploading documents... {Math.round(progress * 100)}%</p>}
         <div className="flex gap-3">
           <button onClick={() => navigate('/services')} className="flex-1 border border-gray-300 text-gray-700 py-2 rounded-lg text-sm hover:bg-gray-50">My Applications</button>
           <button onClick={() => navigate('/track')} className="flex-1 bg-blue-700 text-white py-2 rounded-lg text-sm hover:bg-blue-800">Track Status</button>
@@ -28,3 +28,88 @@ api.interceptors.response.use(
 );
 
 export default api;
+
+// POST `body` to an endpoint that answers with Server-Sent Events and call
+// onEvent(event, data) for each one as it arrives ('message' when unnamed).
+export async function streamPost(path, body, onEvent) {
+  const token = localStorage.getItem('token');
+  const res = await fetch(API_BASE + path, {
+    method: 'POST',
+    headers: {
+      'Content-Type': 'application/json',
+      Accept: 'text/event-stream',
+      ...(token ? { Authorization: `Bearer ${token}` } : {})
+    },
+    body: JSON.stringify(body)
+  });
+  if (!res.ok || !res.body) throw new Error(`Request failed with status ${res.status}`);
+
+  const reader = res.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = '';
+  for (;;) {
+    const { done, value } = await reader.read();
+    if (done) break;
+    buffer += decoder.decode(value, { stream: true });
+    let end;
+    while ((end = buffer.indexOf('\n\n')) !== -1) {
+      const block = buffer.slice(0, end);
+      buffer = buffer.slice(end + 2);
+      let event = 'message';
+      const data = [];
+      for (const line of block.split('\n')) {
+        if (line.startsWith('event:')) event = line.slice(6).trim();
+        else if (line.startsWith('data:')) data.push(line.slice(5).replace(/^ /, ''));
+      }
+      if (data.length) onEvent(event, JSON.parse(data.join('\n')));
+    }
+  }
+}
+
+const sleep = ms => new Promise(resolve => setTimeout(resolve, ms));
+
+// Upload `file` to a service request as numbered chunks (POST /services/{id}/uploads, PUT .../chunks/{n},
+// POST .../complete).  A failed chunk is retried with backoff after asking the server how much it has, so a
+// dropped connection resumes where it stopped; the upload id is kept in localStorage so a reload resumes too.
+// onProgress(fraction) is called after every chunk.  Resolves to the created document.
+export async function resumableUpload(requestId, file, onProgress = () => {}) {
+  const key = `upload:${requestId}:${file.name}:${file.size}:${file.lastModified}`;
+  let upload = null;
+  const saved = localStorage.getItem(key);
+  if (saved) {
+    upload = await api.get(`/services/uploads/${saved}`).then(r => r.data.upload).catch(() => null);
+  }
+  if (!upload) {
+    const res = await api.post(`/services/${requestId}/uploads`, {
+      file_name: file.name, file_size: file.size, file_type: file.type
+    });
+    upload = res.data.upload;
+    localStorage.setItem(key, upload.upload_id);
+  }
+
+  let failures = 0;
+  while (!upload.complete) {
+    const n = upload.next_chunk;
+    const chunk = file.slice(n * upload.chunk_size, Math.min(file.size, (n + 1) * upload.chunk_size));
+    try {
+      const res = await api.put(`/services/uploads/${upload.upload_id}/chunks/${n}`, chunk, {
+        headers: { 'Content-Type': 'application/octet-stream' }
+      });
+      upload = res.data.upload;
+      failures = 0;
+      onProgress(upload.received / upload.file_size);
+    } catch (e) {
+      const status = e.response?.status;
+      if (status === 404 || status === 410 || status === 413 || ++failures > 8) {
+        localStorage.removeItem(key);
+        throw e;
+      }
+      if (e.response?.data?.upload) upload = e.response.data.upload;
+      else await sleep(Math.min(30000, 1000 * 2 ** failures));
+    }
+  }
+
+  const res = await api.post(`/services/uploads/${upload.upload_id}/complete`);
+  localStorage.removeItem(key);
+  return res.data.document;
+}